@@ -0,0 +1,16 @@
+from typing import Optional
+
+from fastapi import Request
+
+from app.config import settings
+from app.utils.deadline import budget_for
+
+
+def request_budget(endpoint: str, request: Request) -> Optional[float]:
+    """End-to-end budget in seconds for a request to `endpoint` (see `request_deadlines`)."""
+    return budget_for(
+        endpoint,
+        request.headers,
+        settings.request_deadlines,
+        settings.request_deadline_max_seconds,
+    )
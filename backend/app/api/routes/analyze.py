@@ -1,11 +1,15 @@
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
-from app.models.request import AnalyzeRequest, CommonMistakesRequest
-from app.models.response import Layer3Response
+from app.api.deadlines import request_budget
+from app.config import settings
+from app.models.request import AnalyzeBatchRequest, AnalyzeRequest, CommonMistakesRequest
+from app.models.response import AnalyzeBatchResponse, Layer3Response
 from app.services.llm_orchestrator import llm_orchestrator
+from app.utils.deadline import deadline_scope
 from app.utils.error_handling import (
     APIConnectionError,
     OpenRouterError,
@@ -19,12 +23,20 @@ router = APIRouter()
 
 
 @router.post("/analyze")
-async def analyze_word(request: AnalyzeRequest):
+async def analyze_word(request: AnalyzeRequest, http_request: Request):
     logger.info(f"Analyzing word: '{request.word}' with context length: {len(request.context)}")
+    budget = request_budget("analyze", http_request)
 
     async def event_generator():
-        async for sse_data in stream_sse_events(llm_orchestrator.analyze_streaming(request)):
-            yield sse_data
+        events = llm_orchestrator.analyze_streaming(request, budget=budget)
+        try:
+            async for sse_data in stream_sse_events(events):
+                yield sse_data
+        finally:
+            # EventSourceResponse cancels this generator when the client
+            # disconnects; closing the orchestrator stream explicitly cancels
+            # its layer tasks and upstream calls instead of leaving that to GC.
+            await events.aclose()
 
     return EventSourceResponse(
         event_generator(),
@@ -36,9 +48,59 @@ async def analyze_word(request: AnalyzeRequest):
     )
 
 
+@router.post("/analyze/batch", response_model=AnalyzeBatchResponse)
+async def analyze_batch(request: AnalyzeBatchRequest, http_request: Request):
+    """
+    Pre-compute Layers 1–3 for several words of the same paragraph.
+
+    Returns all results in request order, or with `stream: true` one NDJSON
+    line per word in completion order, so the client can prefetch the rest
+    of a paragraph while the user reads the first word.
+    """
+    if len(request.words) > settings.analyze_batch_max_words:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.analyze_batch_max_words} words per batch",
+        )
+    logger.info(
+        "Batch analyzing %d words with context length: %d",
+        len(request.words),
+        len(request.context),
+    )
+
+    def run_batch():
+        return llm_orchestrator.analyze_batch(
+            request.words,
+            request.context,
+            english_level=request.english_level,
+            layers=request.layers,
+            budget=request_budget("analyze_batch", http_request),
+        )
+
+    if not request.stream:
+        results = [item async for item in run_batch()]
+        order: dict[str, int] = {}
+        for word in request.words:
+            order.setdefault(word.strip().lower(), len(order))
+        results.sort(key=lambda item: order[item.word.lower()])
+        return AnalyzeBatchResponse(results=results)
+
+    async def ndjson_lines():
+        events = run_batch()
+        try:
+            async for item in events:
+                yield item.model_dump_json() + "\n"
+        finally:
+            # Cancel the remaining words when the client goes away.
+            await events.aclose()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.post("/analyze/mistakes", response_model=Layer3Response)
 async def generate_common_mistakes(
     request: CommonMistakesRequest,
+    http_request: Request,
 ) -> Layer3Response:
     """
     Generate Common Mistakes (Layer 3) for a given word and context.
@@ -55,11 +117,12 @@ async def generate_common_mistakes(
     )
 
     try:
-        return await llm_orchestrator.generate_layer3(
-            word=request.word,
-            context=request.context,
-            english_level=request.english_level,
-        )
+        with deadline_scope(request_budget("mistakes", http_request)):
+            return await llm_orchestrator.generate_layer3(
+                word=request.word,
+                context=request.context,
+                english_level=request.english_level,
+            )
     except RateLimitError as e:
         logger.warning("Common mistakes generation rate limited: %s", e)
         raise HTTPException(
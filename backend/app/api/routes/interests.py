@@ -1,12 +1,14 @@
 import logging
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from app.api.deadlines import request_budget
 from app.models.interests import (
     InterestFromUsageRequest,
     InterestFromUsageResponse,
 )
 from app.services.llm_orchestrator import llm_orchestrator
+from app.utils.deadline import deadline_scope
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,7 @@ router = APIRouter()
 @router.post("/interests/from-usage", response_model=InterestFromUsageResponse)
 async def summarize_interests_from_usage(
     request: InterestFromUsageRequest,
+    http_request: Request,
 ) -> InterestFromUsageResponse:
     """
     Summarize or update interest topics based on the latest LexiLens usage.
@@ -30,14 +33,15 @@ async def summarize_interests_from_usage(
         request.page_type,
     )
 
-    topics = await llm_orchestrator.summarize_interests_from_usage(
-        word=request.word,
-        context=request.context,
-        page_type=request.page_type,
-        url=request.url,
-        existing_topics=request.existing_topics,
-        blocked_titles=request.blocked_titles,
-    )
+    with deadline_scope(request_budget("interests", http_request)):
+        topics = await llm_orchestrator.summarize_interests_from_usage(
+            word=request.word,
+            context=request.context,
+            page_type=request.page_type,
+            url=request.url,
+            existing_topics=request.existing_topics,
+            blocked_titles=request.blocked_titles,
+        )
 
     return InterestFromUsageResponse(topics=topics)
 
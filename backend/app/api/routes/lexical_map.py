@@ -1,18 +1,24 @@
 import logging
-import time
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
 
+from app.api.deadlines import request_budget
+from app.config import settings
 from app.models.request import LexicalImageRequest, LexicalMapTextRequest
 from app.models.response import LexicalImageResponse, Layer4Response
 from app.prompt_config import PROMPT_CONFIG
+from app.services.image_store import FILENAME_RE, MEDIA_TYPES, image_store
 from app.services.llm_orchestrator import llm_orchestrator
 from app.services.openrouter import openrouter_client
+from app.services.response_cache import prompt_version
+from app.utils.deadline import deadline_scope, run_bounded
 from app.utils.error_handling import (
     APIConnectionError,
     OpenRouterError,
     RateLimitError,
 )
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +28,38 @@ router = APIRouter()
 # a short period. This keeps the feature responsive while being gentle on
 # the image model quota. Cache keys are lower-cased so that different
 # capitalizations of the same word pair share a single cached image.
+# Responses can carry whole data-URL images, so the cache is bounded by
+# total bytes as well as entry count.
 CACHE_TTL_SECONDS = 60 * 60 * 6  # 6 hours
-_lexical_image_cache: dict[tuple[str, str], tuple[float, LexicalImageResponse]] = {}
+# Stored images are content-addressed and never change, so clients may keep
+# them for as long as they like.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _image_response_size(response: LexicalImageResponse) -> int:
+    return len(response.image_url) + len(response.prompt)
+
+
+_lexical_image_cache: TTLCache[tuple[str, str], LexicalImageResponse] = TTLCache(
+    max_entries=settings.lexical_image_cache_max_entries,
+    max_bytes=settings.lexical_image_cache_max_bytes,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    sizeof=_image_response_size,
+)
 
 
 @router.post("/lexical-map/image", response_model=LexicalImageResponse)
 async def generate_lexical_image(
     payload: LexicalImageRequest,
+    request: Request,
 ) -> LexicalImageResponse:
     """
     Generate an XKCD-style visual explanation for the difference between two
     related words in the lexical map.
+
+    When the image store is enabled, inline data-URL images are decoded once,
+    written to a content-addressed file and returned as a short path served
+    by `get_lexical_image` instead of a multi-hundred-KB base64 string.
     """
     base_word = (payload.base_word or "").strip()
     related_word = (payload.related_word or "").strip()
@@ -44,18 +71,36 @@ async def generate_lexical_image(
         )
 
     cache_key = (base_word.lower(), related_word.lower())
-    now = time.time()
 
     cached = _lexical_image_cache.get(cache_key)
-    if cached:
-        ts, cached_value = cached
-        if now - ts < CACHE_TTL_SECONDS:
-            return cached_value
+    if cached is not None:
+        return cached
+
     prompt_template = PROMPT_CONFIG["lexical_image"]["prompt_template"]
     prompt = prompt_template.format(base_word=base_word, related_word=related_word)
 
+    digest = None
+    if image_store is not None:
+        digest = image_store.digest_for(
+            base_word,
+            related_word,
+            model=openrouter_client.image_model_id,
+            prompt_version=prompt_version("lexical_image"),
+        )
+        stored = image_store.find(digest)
+        if stored:
+            response = LexicalImageResponse(
+                image_url=_image_url(request, stored),
+                prompt=prompt,
+            )
+            _lexical_image_cache.set(cache_key, response)
+            return response
+
     try:
-        image_url = await openrouter_client.generate_image(prompt=prompt)
+        with deadline_scope(request_budget("lexical_image", request)):
+            image_url = await run_bounded(
+                "Image generation", openrouter_client.generate_image(prompt=prompt)
+            )
     except RateLimitError as e:
         logger.warning("Lexical image generation rate limited: %s", e)
         raise HTTPException(
@@ -81,15 +126,59 @@ async def generate_lexical_image(
             detail="Unexpected error while generating image.",
         )
 
+    if image_store is not None and digest is not None:
+        try:
+            stored = await image_store.save_data_url(digest, image_url)
+        except OSError as e:
+            logger.error("Failed to store lexical image %s: %s", digest, e)
+            stored = None
+        if stored:
+            image_url = _image_url(request, stored)
+
     response = LexicalImageResponse(image_url=image_url, prompt=prompt)
-    _lexical_image_cache[cache_key] = (now, response)
+    _lexical_image_cache.set(cache_key, response)
 
     return response
 
 
+def _image_url(request: Request, filename: str) -> str:
+    # A path, not an absolute URL: the backend's own host is wrong behind the
+    # extension's proxy or a TLS terminator, so clients resolve it against
+    # the API base URL they called.
+    path = request.app.url_path_for("get_lexical_image", filename=filename)
+    return f"{request.scope.get('root_path', '')}{path}"
+
+
+@router.get("/lexical-map/images/{filename}", name="get_lexical_image")
+async def get_lexical_image(filename: str, request: Request) -> Response:
+    """
+    Serve a stored lexical map image.
+
+    The filename embeds the content digest, which doubles as a strong ETag.
+    """
+    match = FILENAME_RE.match(filename)
+    path = image_store.path_for(filename) if image_store is not None else None
+    if match is None or path is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+
+    etag = f'"{match.group("digest")}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match == "*":
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[match.group("ext")],
+        headers=headers,
+    )
+
+
 @router.post("/lexical-map/text", response_model=Layer4Response)
 async def generate_lexical_map_text(
     request: LexicalMapTextRequest,
+    http_request: Request,
 ) -> Layer4Response:
     """
     Generate Lexical Map text data (Layer 4) for a given word and context.
@@ -106,15 +195,16 @@ async def generate_lexical_map_text(
     )
 
     try:
-        return await llm_orchestrator.generate_layer4(
-            word=request.word,
-            context=request.context,
-            learning_history=request.learning_history,
-            english_level=request.english_level,
-            interests=request.interests,
-            blocked_titles=request.blocked_titles,
-            favorite_words=request.favorite_words,
-        )
+        with deadline_scope(request_budget("lexical_map", http_request)):
+            return await llm_orchestrator.generate_layer4(
+                word=request.word,
+                context=request.context,
+                learning_history=request.learning_history,
+                english_level=request.english_level,
+                interests=request.interests,
+                blocked_titles=request.blocked_titles,
+                favorite_words=request.favorite_words,
+            )
     except RateLimitError as e:
         logger.warning("Lexical map text generation rate limited: %s", e)
         raise HTTPException(
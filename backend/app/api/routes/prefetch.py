@@ -0,0 +1,58 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.api.deadlines import request_budget
+from app.config import settings
+from app.models.request import PrefetchRequest
+from app.models.response import PrefetchResponse
+from app.services.prefetch import pick_difficult_words, prefetcher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/prefetch", response_model=PrefetchResponse, status_code=202)
+async def prefetch_page(request: PrefetchRequest, http_request: Request) -> PrefetchResponse:
+    """
+    Start warming the response cache for the likely-difficult words of a page.
+
+    Returns immediately; Layers 1–3 are generated in the background at the
+    lowest admission priority, using the same contexts the side panel sends
+    on selection, so a later lookup of any of these words is a cache hit.
+    A new prefetch from the same user cancels the previous one.
+    """
+    if not settings.prefetch_enabled:
+        raise HTTPException(status_code=503, detail="Prefetching is disabled")
+
+    client = http_request.client.host if http_request.client else None
+    user = request.user_id or client or "anonymous"
+    words = pick_difficult_words(
+        request.text,
+        request.english_level,
+        request.learning_history or [],
+        limit=settings.prefetch_max_words,
+    )
+    job = prefetcher.start(
+        user,
+        request.text,
+        words,
+        request.english_level,
+        budget=request_budget("prefetch", http_request),
+        client=client,
+    )
+    logger.info("Prefetching %d words for %s", len(job.words), user)
+
+    return PrefetchResponse(
+        prefetch_id=job.id if job.task is not None else None,
+        words=job.words,
+        budget_remaining=prefetcher.remaining_budget(user, client),
+    )
+
+
+@router.delete("/prefetch/{prefetch_id}", status_code=204)
+async def cancel_prefetch(prefetch_id: str) -> Response:
+    if not prefetcher.cancel(prefetch_id):
+        raise HTTPException(status_code=404, detail="No running prefetch with this id")
+    return Response(status_code=204)
@@ -1,10 +1,22 @@
+import asyncio
 import logging
+import math
 import time
 
 import httpx
 from fastapi import APIRouter, HTTPException
 
-from app.models.response import PronunciationResponse
+from app.config import settings
+from app.models.request import PronunciationBatchRequest
+from app.models.response import (
+    PronunciationBatchItem,
+    PronunciationBatchResponse,
+    PronunciationResponse,
+)
+from app.services.pronunciation_lexicon import pronunciation_lexicon
+from app.utils.rate_limiter import parse_retry_after
+from app.utils.single_flight import SingleFlight
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -14,84 +26,214 @@ router = APIRouter()
 # This keeps pronunciation lookup "best-effort" and prevents rate limiting
 # from degrading the overall experience.
 CACHE_TTL_SECONDS = 60 * 60  # 1 hour
-_pronunciation_cache: dict[str, tuple[float, PronunciationResponse]] = {}
+_pronunciation_cache: TTLCache[str, PronunciationResponse] = TTLCache(
+    max_entries=settings.pronunciation_cache_max_entries,
+    ttl_seconds=CACHE_TTL_SECONDS,
+)
+
+# Words the dictionary API has no entry for (phrases, names, typos) are
+# remembered briefly so repeated lookups do not go upstream every time.
+_missing_cache: TTLCache[str, str] = TTLCache(
+    max_entries=settings.pronunciation_cache_max_entries,
+    ttl_seconds=settings.pronunciation_negative_cache_ttl,
+)
+
+# Concurrent lookups of the same lower-cased word share one upstream call.
+_in_flight = SingleFlight()
+
+# After a 429 from the dictionary API no word is fetched until this
+# `time.monotonic()` timestamp; lookups are answered from cache or fail fast.
+_backoff_until = 0.0
+
+DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
+
+# One pooled client for the fallback dictionary API, opened on first use and
+# closed by the app lifespan.
+_dictionary_client: httpx.AsyncClient | None = None
+
+
+def _get_dictionary_client() -> httpx.AsyncClient:
+    global _dictionary_client
+    if _dictionary_client is None or _dictionary_client.is_closed:
+        _dictionary_client = httpx.AsyncClient(timeout=10.0)
+    return _dictionary_client
+
+
+async def close_dictionary_client() -> None:
+    global _dictionary_client
+    if _dictionary_client is not None:
+        await _dictionary_client.aclose()
+        _dictionary_client = None
+
+
+def _local_pronunciation(word: str) -> PronunciationResponse | None:
+    """
+    Answer from the bundled lexicon or the cache, without any network call.
+
+    The lexicon only has IPA; a lexicon hit takes its audio URL from the
+    cached dictionary API entry, when there is one.
+    """
+    cached = _pronunciation_cache.get(word.lower())
+    ipa = pronunciation_lexicon.lookup(word)
+    if ipa is None:
+        return cached
+    return PronunciationResponse(
+        word=word,
+        ipa=ipa,
+        audio_url=cached.audio_url if cached is not None else None,
+    )
+
+
+@router.post("/pronunciation/batch")
+async def get_pronunciations(request: PronunciationBatchRequest) -> PronunciationBatchResponse:
+    """
+    Look up many words in one round-trip, e.g. for the wordbook.
+
+    Words are normalized and deduplicated. Lexicon and cache hits are
+    answered directly; the remaining misses go to the dictionary API
+    concurrently (bounded by `pronunciation_batch_concurrency`). Failures are
+    reported per word instead of failing the whole batch.
+    """
+    words = list(dict.fromkeys(w.strip().lower() for w in request.words if w.strip()))
+    if len(words) > settings.pronunciation_batch_max_words:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.pronunciation_batch_max_words} words per batch",
+        )
+    logger.info("Getting pronunciations for %d words", len(words))
+
+    semaphore = asyncio.Semaphore(max(1, settings.pronunciation_batch_concurrency))
+
+    async def lookup(word: str) -> PronunciationBatchItem:
+        local = _local_pronunciation(word)
+        if local is not None:
+            return PronunciationBatchItem(word=word, pronunciation=local)
+        async with semaphore:
+            try:
+                result = await _fetch_pronunciation(word)
+            except HTTPException as exc:
+                return PronunciationBatchItem(
+                    word=word,
+                    status_code=exc.status_code,
+                    error=str(exc.detail),
+                )
+        return PronunciationBatchItem(word=word, pronunciation=result)
+
+    return PronunciationBatchResponse(results=await asyncio.gather(*map(lookup, words)))
 
 
 @router.get("/pronunciation/{word}")
 async def get_pronunciation(word: str) -> PronunciationResponse:
     logger.info(f"Getting pronunciation for: '{word}'")
 
+    # The bundled lexicon answers most words without any network call;
+    # otherwise serve from cache when available and fresh.
+    local = _local_pronunciation(word)
+    if local is None:
+        return await _fetch_pronunciation(word)
+    if (
+        local.audio_url is not None
+        or not settings.pronunciation_lexicon_fetch_audio
+        or _pronunciation_cache.get(word.lower()) is not None
+    ):
+        return local
+
+    # A lexicon hit without audio: the play button needs the dictionary
+    # API's audio URL. Any failure there still leaves the lexicon IPA.
+    try:
+        remote = await _fetch_pronunciation(word)
+    except HTTPException:
+        return local
+    return local.model_copy(update={"audio_url": remote.audio_url})
+
+
+async def _fetch_pronunciation(word: str) -> PronunciationResponse:
+    """Fetch from the dictionary API, raising HTTPException on failure."""
     cache_key = word.lower()
-    now = time.time()
 
-    # Serve from cache when available and fresh
-    cached = _pronunciation_cache.get(cache_key)
-    if cached:
-        ts, cached_value = cached
-        if now - ts < CACHE_TTL_SECONDS:
-            return cached_value
+    missing = _missing_cache.get(cache_key)
+    if missing is not None:
+        raise HTTPException(status_code=404, detail=missing)
 
-    try:
-        # Call external dictionary API with a short timeout. We intentionally keep this
-        # separate from the core LLM flow so that rate limiting or failures here
-        # degrade gracefully instead of breaking the main experience.
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-            )
+    backoff = _backoff_until - time.monotonic()
+    if backoff > 0:
+        raise _rate_limited(backoff)
 
-            # Handle upstream errors explicitly so we can surface a meaningful
-            # status code without turning them into 500s.
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Pronunciation not found for word: {word}",
-                )
-            if response.status_code == 429:
-                raise HTTPException(
-                    status_code=429,
-                    detail="Pronunciation service is being rate limited. Please try again later.",
-                )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Pronunciation service unavailable",
-                )
+    return await _in_flight.do(cache_key, lambda: _request_pronunciation(word))
 
-            data = response.json()
 
-            if not data or not isinstance(data, list) or len(data) == 0:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No pronunciation data for word: {word}"
-                )
+def _rate_limited(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Pronunciation service is being rate limited. Please try again later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
 
-            entry = data[0]
-            phonetics = entry.get("phonetics", [])
 
-            ipa = None
-            audio_url = None
+def _not_found(cache_key: str, detail: str) -> HTTPException:
+    _missing_cache.set(cache_key, detail)
+    return HTTPException(status_code=404, detail=detail)
 
-            for phonetic in phonetics:
-                if not ipa and phonetic.get("text"):
-                    ipa = phonetic["text"]
-                if not audio_url and phonetic.get("audio"):
-                    audio_url = phonetic["audio"]
-                if ipa and audio_url:
-                    break
 
-            if not ipa:
-                ipa = entry.get("phonetic", "N/A")
+async def _request_pronunciation(word: str) -> PronunciationResponse:
+    global _backoff_until
+    cache_key = word.lower()
 
-            result = PronunciationResponse(
-                word=word,
-                ipa=ipa,
-                audio_url=audio_url
+    try:
+        # Fall back to the external dictionary API for out-of-vocabulary words.
+        # We intentionally keep this separate from the core LLM flow so that
+        # rate limiting or failures here degrade gracefully instead of
+        # breaking the main experience.
+        response = await _get_dictionary_client().get(DICTIONARY_API_URL.format(word=word))
+
+        # Handle upstream errors explicitly so we can surface a meaningful
+        # status code without turning them into 500s.
+        if response.status_code == 404:
+            raise _not_found(cache_key, f"Pronunciation not found for word: {word}")
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers)
+            if retry_after is None:
+                retry_after = settings.pronunciation_backoff_seconds
+            _backoff_until = max(_backoff_until, time.monotonic() + retry_after)
+            logger.warning("Pronunciation API rate limited; backing off for %.0fs", retry_after)
+            raise _rate_limited(retry_after)
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=503,
+                detail="Pronunciation service unavailable",
             )
 
-            # Store fresh result in cache
-            _pronunciation_cache[cache_key] = (now, result)
-            return result
+        data = response.json()
+
+        if not data or not isinstance(data, list) or len(data) == 0:
+            raise _not_found(cache_key, f"No pronunciation data for word: {word}")
+
+        entry = data[0]
+        phonetics = entry.get("phonetics", [])
+
+        ipa = None
+        audio_url = None
+
+        for phonetic in phonetics:
+            if not ipa and phonetic.get("text"):
+                ipa = phonetic["text"]
+            if not audio_url and phonetic.get("audio"):
+                audio_url = phonetic["audio"]
+            if ipa and audio_url:
+                break
+
+        if not ipa:
+            ipa = entry.get("phonetic", "N/A")
+
+        result = PronunciationResponse(
+            word=word,
+            ipa=ipa,
+            audio_url=audio_url
+        )
+
+        # Store fresh result in cache
+        _pronunciation_cache.set(cache_key, result)
+        return result
 
     except HTTPException:
         # Re-raise FastAPI HTTP exceptions so they are not wrapped as 500s.
@@ -1,5 +1,5 @@
 
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -24,12 +24,147 @@ class Settings(BaseSettings):
     openrouter_layer4_fast_model_id: Optional[str] = None
     openrouter_layer4_main_model_id: Optional[str] = None
 
+    # Optional per-layer fallback chains tried after the layer's primary model,
+    # e.g. {"layer2": ["openai/gpt-4o-mini", "anthropic/claude-3.5-sonnet"]}.
+    # Keys: layer1, layer2, layer3, layer4_fast, layer4. Layers without an
+    # entry fall back to `openrouter_model_id`; an empty list disables fallback.
+    openrouter_model_fallbacks: dict[str, list[str]] = {}
+    # Rolling model health used to reorder fallback chains: models whose
+    # error rate or p95 latency over the window exceed these limits are tried
+    # last until they recover.
+    model_health_window_seconds: float = 300.0
+    model_health_min_samples: int = 5
+    model_health_max_error_rate: float = 0.5
+    model_health_max_p95_latency: float = 20.0
+
+    # Optional hedged requests for JSON layers: when a call is slower than the
+    # layer's latency percentile, a duplicate is fired (optionally to the next
+    # model in the fallback chain) and the first valid response wins. Hedges
+    # are capped at `hedge_budget_ratio` of all hedgeable calls.
+    hedge_enabled: bool = False
+    hedge_layers: list[str] = ["layer2", "layer3", "layer4_fast"]
+    hedge_percentile: float = 0.95
+    hedge_initial_delay: float = 4.0
+    hedge_min_samples: int = 20
+    hedge_budget_ratio: float = 0.05
+    hedge_use_alternate_model: bool = True
+
     # Optional flags for vendor-specific reasoning / thinking modes.
     # These are wired through LLMOrchestrator and only applied to the
     # corresponding layer calls when explicitly enabled.
     openrouter_layer3_thinking_enabled: bool = False
     openrouter_layer4_thinking_enabled: bool = False
 
+    # Start layers 2–4 together with the Layer 1 stream in /api/analyze
+    # instead of after it finishes. `analyze_event_ordering` decides when their
+    # events reach the SSE stream: "buffer" holds them until layer1_complete,
+    # "interleave" sends them as soon as they are ready (after the first
+    # Layer 1 chunk).
+    analyze_parallel_layers: bool = True
+    analyze_event_ordering: Literal["buffer", "interleave"] = "buffer"
+    # Stream list-shaped layers from upstream and emit each element as a
+    # `<layer>_item` event as soon as it is complete (`layer2_item` per live
+    # context, `layer3_item` per common mistake, `layer4_item` per related
+    # word); the aggregated `<layer>` events are still sent at the end.
+    analyze_stream_items: bool = True
+    # POST /api/analyze/batch: words per request and words analyzed at once.
+    analyze_batch_max_words: int = 20
+    analyze_batch_concurrency: int = 3
+    # Ask for Layers 2/3 of up to `layer_batch_max_words` words sharing a
+    # context in one call (one keyed JSON object) instead of one call each.
+    analyze_batch_shared_prompts: bool = True
+    layer_batch_max_words: int = 8
+
+    # POST /api/prefetch warms the response cache with Layers 1–3 for the
+    # likely-difficult words of the page being read. A word qualifies when
+    # its rank in `word_frequency_path` is at or beyond the threshold for the
+    # learner's level band (unranked words always qualify).
+    prefetch_enabled: bool = True
+    prefetch_max_words: int = 10
+    # Words prefetched per hour and user (the client's `user_id`), and per
+    # client address so a fresh `user_id` does not reset the budget. Budgets
+    # of at most `prefetch_max_tracked_budgets` users/addresses are kept.
+    prefetch_words_per_user_per_hour: int = 60
+    prefetch_words_per_client_per_hour: int = 300
+    prefetch_max_tracked_budgets: int = 10_000
+    prefetch_rank_thresholds: dict[str, int] = {
+        "beginner": 300,
+        "intermediate": 600,
+        "advanced": 5000,
+        "unknown": 600,
+        "none": 600,
+    }
+    word_frequency_path: str = "data/word_frequency.txt"
+    # Pipeline the Lexical Map: stream Stage A (candidate recall) and start
+    # Stage B (enrichment) as soon as this many candidates have been parsed,
+    # cancelling the rest of Stage A. This trades answer size for latency:
+    # Stage B only ever sees these first candidates, so the map has at most
+    # this many related words (Stage A asks for up to 5). 0 (the default)
+    # runs the stages back to back with the full candidate list.
+    layer4_pipeline_min_candidates: int = 0
+
+    # Where Stage A candidates come from: "llm" asks the fast model; "index"
+    # ranks neighbours from the bundled lexical graph (built with
+    # `scripts/build_lexical_graph.py`) and only asks the model for words the
+    # index does not know.
+    layer4_candidate_source: Literal["llm", "index"] = "llm"
+    lexical_graph_path: str = "data/lexical_graph.bin"
+
+    # Two-tier cache for layer results (in-process LRU + SQLite on disk).
+    # Keys are normalized on word/context/level band and include a prompt
+    # version hash, so prompt edits invalidate stale entries automatically.
+    # Set `response_cache_disk_path` to an empty string to keep it in memory only.
+    response_cache_enabled: bool = True
+    response_cache_memory_max_entries: int = 2048
+    response_cache_disk_path: str = ".cache/response_cache.sqlite3"
+    response_cache_disk_max_entries: int = 50_000
+    response_cache_layer1_ttl: int = 60 * 60 * 24 * 7
+    response_cache_layer2_ttl: int = 60 * 60 * 24 * 7
+    response_cache_layer3_ttl: int = 60 * 60 * 24 * 7
+    # Layer 4 is personalized, so its entries are keyed on the learner inputs
+    # as well and kept for a shorter period.
+    response_cache_layer4_ttl: int = 60 * 60 * 24
+
+    # Stage A candidates (synonyms, broader terms, ...) hardly depend on the
+    # sentence, so they are cached by headword and optional sense label in a
+    # separate long-lived store, which `scripts/warm_layer4_candidates.py` can
+    # pre-populate. Only Stage B enrichment stays context-specific.
+    layer4_candidate_cache_enabled: bool = True
+    layer4_candidate_cache_memory_max_entries: int = 4096
+    layer4_candidate_cache_disk_path: str = ".cache/layer4_candidates.sqlite3"
+    layer4_candidate_cache_disk_max_entries: int = 200_000
+    layer4_candidate_cache_ttl: int = 60 * 60 * 24 * 30
+
+    # Bounded in-memory caches used by the pronunciation and lexical image
+    # routes. Image responses may embed data URLs, so that cache is also
+    # capped by total bytes.
+    pronunciation_cache_max_entries: int = 5000
+    # Bundled IPA lexicon answered before the remote dictionary API; empty
+    # (the default) disables it. The file is not shipped: build it with
+    # `scripts/build_pronunciation_lexicon.py`, then point this at it.
+    pronunciation_lexicon_path: str = ""
+    # The lexicon has IPA but no audio. When a word is not cached yet, GET
+    # /api/pronunciation/{word} still asks the dictionary API for the audio
+    # URL (serving the lexicon IPA alone if that fails). False answers
+    # lexicon words immediately, without audio until the word is cached.
+    # The batch route never waits for audio.
+    pronunciation_lexicon_fetch_audio: bool = True
+    # POST /api/pronunciation/batch: maximum words per request and concurrent
+    # dictionary API calls for the words neither the lexicon nor cache know.
+    pronunciation_batch_max_words: int = 100
+    pronunciation_batch_concurrency: int = 4
+    # Dictionary API misses (404 / no data) are cached for this long, and a
+    # 429 without Retry-After pauses all upstream lookups for the backoff.
+    pronunciation_negative_cache_ttl: int = 60 * 10
+    pronunciation_backoff_seconds: float = 30.0
+    lexical_image_cache_max_entries: int = 256
+    lexical_image_cache_max_bytes: int = 64 * 1024 * 1024
+    # Generated lexical map images are decoded once and stored here under a
+    # content hash, then returned as short URLs. Empty keeps inline data URLs.
+    # Least recently used images are evicted beyond the max bytes (0 = no cap).
+    lexical_image_store_dir: str = ".cache/lexical_images"
+    lexical_image_store_max_bytes: int = 256 * 1024 * 1024
+
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     cors_origins: list[str] = ["chrome-extension://*", "http://localhost:5173"]
@@ -39,5 +174,76 @@ class Settings(BaseSettings):
     retry_delay: float = 1.0
     request_timeout: int = 60
 
+    # Shared connection pool for upstream OpenRouter calls. One pooled client
+    # is opened at startup and reused by every layer so requests skip the
+    # per-call TCP/TLS handshake.
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 30.0
+    # HTTP/2 multiplexing requires the optional `h2` package (httpx[http2]);
+    # the client falls back to HTTP/1.1 keep-alive when it is missing.
+    http2_enabled: bool = True
+    # Collapse concurrent identical LLM calls (same model, messages and
+    # sampling params) into one upstream request; streams fan out to all
+    # subscribers.
+    llm_single_flight_enabled: bool = True
+    # Circuit breaker per (base_url, model): opens once the failure ratio of
+    # connection errors/timeouts/5xx within the window reaches the threshold,
+    # fails fast while open, then lets a single probe through.
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_failure_ratio: float = 0.5
+    circuit_breaker_min_requests: int = 10
+    circuit_breaker_window_seconds: float = 30.0
+    circuit_breaker_open_seconds: float = 30.0
+    # Admission control for upstream LLM calls: caps in-flight calls per
+    # process and per model, and queues the rest by priority
+    # (layer1 > interactive [Layer 2/4] > lazy [Layer 3] > background
+    # [interests] > image). Waiters past their priority's max wait, or pushed
+    # out of a full queue by more important work, are shed with a 429.
+    llm_admission_enabled: bool = True
+    llm_max_in_flight: int = 32
+    llm_max_in_flight_per_model: int = 16
+    llm_admission_max_queue: int = 100
+    llm_admission_max_wait_seconds: dict[str, float] = {
+        "layer1": 30.0,
+        "interactive": 20.0,
+        "lazy": 15.0,
+        "background": 10.0,
+        "image": 10.0,
+    }
+    # Shared token bucket per model that paces every upstream call. Quotas
+    # are requests per minute keyed by model id ("*" applies to all other
+    # models; empty means no fixed quota). Retry-After and x-ratelimit-*
+    # headers pause the bucket for every caller, not just the one that got
+    # the 429; a 429 without such a hint only delays that caller's retry by
+    # the default retry-after (capped at the max wait). Calls that would wait
+    # longer than the max wait fail fast with a 429. The "file" backend
+    # shares buckets between uvicorn workers on one host through a
+    # lock-protected state file.
+    rate_limit_enabled: bool = True
+    rate_limit_requests_per_minute: dict[str, float] = {}
+    rate_limit_burst: int = 10
+    rate_limit_max_wait_seconds: float = 20.0
+    rate_limit_default_retry_after: float = 2.0
+    rate_limit_backend: Literal["memory", "file"] = "memory"
+    rate_limit_state_path: str = ".cache/rate_limits.json"
+    # End-to-end budget per request, in seconds, keyed by endpoint. Every
+    # upstream call made for the request derives its timeout from what is
+    # left, retries are skipped once the budget cannot cover another
+    # attempt, and layers that miss it fail with a timeout. Clients can ask
+    # for a shorter (or longer, up to the max) budget via X-Request-Timeout.
+    # The prefetch budget applies to each prefetched word.
+    request_deadlines: dict[str, float] = {
+        "analyze": 45.0,
+        "analyze_batch": 90.0,
+        "mistakes": 30.0,
+        "lexical_map": 45.0,
+        "lexical_image": 90.0,
+        "interests": 60.0,
+        "prefetch": 45.0,
+    }
+    request_deadline_max_seconds: float = 120.0
+    retry_min_attempt_seconds: float = 2.0
+
 
 settings = Settings()
@@ -1,10 +1,25 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import analyze, pronunciation, lexical_map, interests
+from app.api.routes import analyze, pronunciation, lexical_map, interests, prefetch
 from app.config import settings
+from app.services.hedging import hedger
+from app.services.lexical_graph import lexical_graph
+from app.services.model_health import model_health
+from app.services.openrouter import (
+    admission,
+    cancelled_spend,
+    circuit_breakers,
+    openrouter_client,
+    rate_limiter,
+)
+from app.services.prefetch import prefetcher
+from app.services.pronunciation_lexicon import pronunciation_lexicon
+from app.services.response_cache import candidate_cache, response_cache
 
 logging.basicConfig(
     level=settings.log_level,
@@ -13,10 +28,29 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Open the pooled upstream HTTP client once per process and close it on
+    # shutdown so keep-alive connections are released cleanly.
+    await openrouter_client.startup()
+    try:
+        yield
+    finally:
+        await openrouter_client.aclose()
+        response_cache.close()
+        candidate_cache.close()
+        lexical_graph.close()
+        pronunciation_lexicon.close()
+        await pronunciation.close_dictionary_client()
+        await prefetcher.aclose()
+
+
 app = FastAPI(
     title="LexiLens API",
     description="AI Language Coach Backend - Contextual vocabulary analysis with 4-layer approach",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -32,6 +66,7 @@ app.include_router(analyze.router, prefix="/api", tags=["analyze"])
 app.include_router(pronunciation.router, prefix="/api", tags=["pronunciation"])
 app.include_router(lexical_map.router, prefix="/api", tags=["lexical-map"])
 app.include_router(interests.router, prefix="/api", tags=["interests"])
+app.include_router(prefetch.router, prefix="/api", tags=["prefetch"])
 
 
 @app.get("/")
@@ -46,4 +81,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "caches": {
+            "pronunciation": pronunciation._pronunciation_cache.stats(),
+            "pronunciation_missing": pronunciation._missing_cache.stats(),
+            "lexical_image": lexical_map._lexical_image_cache.stats(),
+            "response": response_cache.stats(),
+            "layer4_candidates": candidate_cache.stats(),
+        },
+        "models": model_health.snapshot(),
+        "hedging": hedger.stats(),
+        "lexical_graph": lexical_graph.stats(),
+        "pronunciation_lexicon": pronunciation_lexicon.stats(),
+        "prefetch": prefetcher.stats(),
+        "circuits": circuit_breakers.snapshot(),
+        "admission": admission.stats(),
+        "rate_limits": await rate_limiter.stats(),
+        "cancelled_spend": cancelled_spend.stats(),
+    }
@@ -5,6 +5,7 @@ from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
+from app.config import settings
 from app.models.interests import InterestTopicPayload
 
 
@@ -71,6 +72,15 @@ class PronunciationRequest(BaseModel):
     word: str = Field(..., description="Word to get pronunciation for")
 
 
+class PronunciationBatchRequest(BaseModel):
+    words: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.pronunciation_batch_max_words,
+        description="Words to get pronunciations for; duplicates are looked up once",
+    )
+
+
 class LearningHistoryRequest(BaseModel):
     words: list[str] = Field(..., description="List of words to add to learning history")
 
@@ -80,6 +90,25 @@ class LexicalImageRequest(BaseModel):
     related_word: str = Field(..., description="Selected related word from the lexical map")
 
 
+class AnalyzeBatchRequest(BaseModel):
+    context: str = Field(..., description="Sentence or paragraph shared by all words")
+    words: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.analyze_batch_max_words,
+        description="Words to analyze in that context",
+    )
+    english_level: Optional[str] = Field(None, description="Learner CEFR level, e.g. 'B1'")
+    layers: Optional[list[int]] = Field(
+        default=None,
+        description="Layers (1,2,3) to compute for every word; defaults to all three.",
+    )
+    stream: bool = Field(
+        False,
+        description="Stream one NDJSON line per word as it completes instead of one JSON body.",
+    )
+
+
 class CommonMistakesRequest(BaseModel):
     word: str = Field(..., description="Word or phrase to analyze common mistakes for")
     context: str = Field(
@@ -118,3 +147,16 @@ class LexicalMapTextRequest(BaseModel):
         default_factory=list,
         description="Subset of learning words explicitly marked as favorites.",
     )
+
+
+class PrefetchRequest(BaseModel):
+    text: str = Field(..., description="Visible page text (document.body.innerText)")
+    english_level: Optional[str] = Field(None, description="Learner CEFR level, e.g. 'B1'")
+    learning_history: Optional[List[str]] = Field(
+        default_factory=list,
+        description="Previously looked-up words; these are not prefetched",
+    )
+    user_id: Optional[str] = Field(
+        None,
+        description="Stable per-install id for the prefetch budget; defaults to the client address",
+    )
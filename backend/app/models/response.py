@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -56,12 +56,38 @@ class AnalyzeResponse(BaseModel):
     layer4: Layer4Response
 
 
+class AnalyzeBatchItem(BaseModel):
+    word: str
+    layer1: Optional[Layer1Response] = None
+    layer2: Optional[Layer2Response] = None
+    layer3: Optional[Layer3Response] = None
+    errors: dict[str, dict[str, Any]] = Field(
+        default_factory=dict,
+        description="Per-layer errors, e.g. {'layer3': {'error': '...', 'reason': 'timeout'}}",
+    )
+
+
+class AnalyzeBatchResponse(BaseModel):
+    results: list[AnalyzeBatchItem]
+
+
 class PronunciationResponse(BaseModel):
     word: str
     ipa: str = Field(..., description="IPA notation")
     audio_url: Optional[str] = Field(None, description="URL to audio pronunciation")
 
 
+class PronunciationBatchItem(BaseModel):
+    word: str = Field(..., description="Normalized word as looked up")
+    pronunciation: Optional[PronunciationResponse] = None
+    status_code: int = Field(200, description="Per-word status, as the single-word route")
+    error: Optional[str] = None
+
+
+class PronunciationBatchResponse(BaseModel):
+    results: list[PronunciationBatchItem]
+
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
@@ -77,3 +103,12 @@ class LexicalImageResponse(BaseModel):
         ...,
         description="Final prompt sent to OpenRouter for traceability/debugging",
     )
+
+
+class PrefetchResponse(BaseModel):
+    prefetch_id: Optional[str] = Field(
+        None,
+        description="Id for DELETE /api/prefetch/{prefetch_id}; None when nothing was started",
+    )
+    words: list[str] = Field(..., description="Words whose analyses are being prefetched")
+    budget_remaining: int = Field(..., description="Words left in this hour's prefetch budget")
@@ -213,6 +213,94 @@ Adjust the difficulty so it feels encouraging and not overwhelming for this lear
         },
     },
 
+    # Layer 2 (batched): live contexts for several words sharing one context.
+    # The shared context comes first so every batch for a paragraph starts
+    # with the same prompt prefix.
+    # 使用位置:
+    # - app.services.prompt_builder.PromptBuilder.build_layer2_batch_prompt
+    # - app.services.llm_orchestrator.LLMOrchestrator.generate_layer2_batch
+    # 模板变量:
+    # - {context}: 页面上选中的英文原句（所有单词共用）
+    # - {words}: JSON 数组形式的单词列表
+    "layer2_batch": {
+        "system_prompt": (
+            "You are a language coach creating realistic, current examples."
+        ),
+        "user_prompt_template": """Original context: {context}
+
+Task: For EACH of the words below, generate 3 distinct, authentic example sentences,
+each from a different source:
+
+1. **Twitter/Social Media**: Casual, conversational tone (max 280 chars)
+2. **News (BBC/NYT style)**: Formal, objective, journalistic
+3. **Academic/Professional**: Precise, technical, sophisticated
+
+Requirements:
+- Each example must feel natural and current (2024-2025)
+- Include enough context to understand the situation
+- Use each word naturally in its own examples, not forced
+- Do NOT include any decorative fields like icons; only return source and text.
+
+Words: {words}
+
+Return ONLY a JSON object with one key per word, spelled exactly as given:
+{{
+  "word": [
+    {{"source": "twitter", "text": "..."}},
+    {{"source": "news", "text": "..."}},
+    {{"source": "academic", "text": "..."}}
+  ]
+}}""",
+    },
+
+    # Layer 3 (batched): common mistakes for several words sharing one context.
+    # 使用位置:
+    # - app.services.prompt_builder.PromptBuilder.build_layer3_batch_prompt
+    # - app.services.llm_orchestrator.LLMOrchestrator.generate_layer3_batch
+    # 模板变量:
+    # - {context}: 页面上选中的英文原句（所有单词共用）
+    # - {words}: JSON 数组形式的单词列表
+    # - {level_note}: 复用 layer3 的 level_notes（只在传入 english_level 时非空）
+    "layer3_batch": {
+        "system_prompt": (
+            "You are an experienced ESL teacher identifying common errors."
+        ),
+        "user_prompt_template": """Context sentence: {context}{level_note}
+
+Task: For EACH of the words below, identify the 2 most important mistakes non-native
+speakers make with that word.
+
+Requirements:
+- Each mistake MUST use its target word in both the wrong and correct sentences.
+- The 2 mistakes for a word MUST focus on different typical problems (for example:
+  one about grammar/form, the other about collocation/meaning/context).
+- Keep each Chinese explanation ("why") very short: 1–2 sentences of concise
+  Simplified Chinese focusing only on the key reason.
+
+For each mistake, provide:
+1. wrong: [incorrect example sentence in English, using the word]
+2. why: [brief explanation in Simplified Chinese, 1–2 short sentences]
+3. correct: [corrected sentence in English, using the word]
+
+Words: {words}
+
+Return ONLY a JSON object with one key per word, spelled exactly as given:
+{{
+  "word": [
+    {{
+      "wrong": "incorrect example sentence in English",
+      "why": "简短的中文解释，说明错误出在哪里",
+      "correct": "corrected version of the sentence in English"
+    }},
+    {{
+      "wrong": "another incorrect example in English",
+      "why": "另一种典型错误的简短中文解释",
+      "correct": "corrected version in English"
+    }}
+  ]
+}}""",
+    },
+
     # Layer 4 (Stage A): Fast candidate recall for related words.
     # 使用位置:
     # - app.services.prompt_builder.PromptBuilder.build_layer4_candidates_prompt
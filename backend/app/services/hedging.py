@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Hedged requests for latency-sensitive JSON layers.
+
+    The primary call is started immediately. If it has not finished within
+    the layer's latency percentile threshold, a duplicate (hedge) call is
+    started and whichever returns a valid result first wins; the other one
+    is cancelled. Hedges are only fired while the global budget allows, i.e.
+    hedges stay below `budget_ratio` of all hedgeable calls.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        initial_delay: float = 4.0,
+        min_samples: int = 20,
+        budget_ratio: float = 0.05,
+        window: int = 200,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self._latencies: dict[str, deque[float]] = {}
+        self._window = window
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.primary_wins_after_hedge = 0
+        self.budget_denied = 0
+
+    def threshold(self, layer: str) -> float:
+        """Delay before a hedge is fired for `layer`."""
+        latencies = self._latencies.get(layer)
+        if not latencies or len(latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return ordered[index]
+
+    def _record_latency(self, layer: str, latency: float) -> None:
+        self._latencies.setdefault(layer, deque(maxlen=self._window)).append(latency)
+
+    def _budget_allows(self) -> bool:
+        return self.hedges + 1 <= self.budget_ratio * self.requests
+
+    async def run(
+        self,
+        layer: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+    ) -> T:
+        self.requests += 1
+        started = time.monotonic()
+        primary_task: asyncio.Task[T] = asyncio.ensure_future(primary())
+
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self.threshold(layer))
+            if done or not self._budget_allows():
+                if not done:
+                    self.budget_denied += 1
+                result = await primary_task
+                self._record_latency(layer, time.monotonic() - started)
+                return result
+
+            self.hedges += 1
+            logger.info("Hedging slow %s request after %.2fs", layer, time.monotonic() - started)
+            hedge_task: asyncio.Task[T] = asyncio.ensure_future(hedge())
+
+            result = await self._first_success(primary_task, hedge_task)
+            self._record_latency(layer, time.monotonic() - started)
+            return result
+        finally:
+            if not primary_task.done():
+                primary_task.cancel()
+
+    async def _first_success(
+        self,
+        primary_task: asyncio.Task[T],
+        hedge_task: asyncio.Task[T],
+    ) -> T:
+        pending: set[asyncio.Task[T]] = {primary_task, hedge_task}
+        first_error: BaseException | None = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if error is not None:
+                        first_error = first_error or error
+                        continue
+
+                    if task is hedge_task:
+                        self.hedge_wins += 1
+                    else:
+                        self.primary_wins_after_hedge += 1
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        assert first_error is not None
+        raise first_error
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins_after_hedge": self.primary_wins_after_hedge,
+            "budget_denied": self.budget_denied,
+            "thresholds": {layer: self.threshold(layer) for layer in self._latencies},
+        }
+
+
+hedger = Hedger(
+    percentile=settings.hedge_percentile,
+    initial_delay=settings.hedge_initial_delay,
+    min_samples=settings.hedge_min_samples,
+    budget_ratio=settings.hedge_budget_ratio,
+)
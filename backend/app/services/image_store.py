@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_DATA_URL_RE = re.compile(
+    r"^data:image/(?P<subtype>[a-z0-9.+-]+);base64,(?P<payload>.+)$",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+
+# Image subtypes we accept from the model, mapped to file extensions.
+_EXTENSIONS: dict[str, str] = {
+    "png": "png",
+    "jpeg": "jpg",
+    "jpg": "jpg",
+    "webp": "webp",
+    "gif": "gif",
+}
+
+MEDIA_TYPES: dict[str, str] = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+
+FILENAME_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})\.(?P<ext>png|jpg|webp|gif)$")
+
+
+class ImageStore:
+    """
+    Content-addressed directory of generated lexical map images.
+
+    Files are named `<digest>.<ext>` where the digest covers everything that
+    determines the image (word pair, model and prompt version), so a file
+    never changes once written and can be served with a strong ETag and a
+    long-lived Cache-Control header.
+
+    With `max_bytes` set, every write evicts the least recently used images
+    (by modification time, refreshed on each `find` hit) until the directory
+    fits again.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def digest_for(
+        base_word: str,
+        related_word: str,
+        model: str,
+        prompt_version: str,
+    ) -> str:
+        raw = "\x1f".join(
+            [base_word.strip().lower(), related_word.strip().lower(), model, prompt_version]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, filename: str) -> Optional[Path]:
+        """Resolve a public filename to a stored file, rejecting anything else."""
+        if not FILENAME_RE.match(filename):
+            return None
+        path = self.root / filename
+        return path if path.is_file() else None
+
+    def find(self, digest: str) -> Optional[str]:
+        """Return the stored filename for `digest`, if any."""
+        for ext in MEDIA_TYPES:
+            filename = f"{digest}.{ext}"
+            path = self.root / filename
+            if path.is_file():
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return filename
+        return None
+
+    async def save_data_url(self, digest: str, data_url: str) -> Optional[str]:
+        """
+        Decode a base64 `data:image/...` URL and store it under `digest`.
+
+        Returns the stored filename, or None when the URL is not an inline
+        image we can decode (e.g. a remote HTTP URL).
+        """
+        match = _DATA_URL_RE.match(data_url)
+        if not match:
+            return None
+
+        ext = _EXTENSIONS.get(match.group("subtype").lower())
+        if ext is None:
+            return None
+
+        try:
+            content = base64.b64decode(match.group("payload"), validate=False)
+        except (binascii.Error, ValueError) as exc:
+            logger.warning("Failed to decode generated image data URL: %s", exc)
+            return None
+
+        filename = f"{digest}.{ext}"
+        await asyncio.to_thread(self._write_atomic, filename, content)
+        return filename
+
+    def _write_atomic(self, filename: str, content: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(content)
+            os.replace(tmp_path, self.root / filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._evict(keep=filename)
+
+    def _evict(self, keep: str) -> None:
+        """Delete the least recently used images until the store fits `max_bytes`."""
+        if self.max_bytes <= 0:
+            return
+
+        entries: list[tuple[float, str, int]] = []
+        total = 0
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                if not FILENAME_RE.match(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+                total += stat.st_size
+
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.unlink(self.root / name)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+image_store: Optional[ImageStore] = (
+    ImageStore(
+        settings.lexical_image_store_dir,
+        max_bytes=settings.lexical_image_store_max_bytes,
+    )
+    if settings.lexical_image_store_dir
+    else None
+)
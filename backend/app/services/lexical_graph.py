@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+from app.config import settings
+from app.models.response import RelatedWord
+from app.services.response_cache import normalize_word
+
+logger = logging.getLogger(__name__)
+
+# File layout (little endian):
+#   header   MAGIC, version, word count, edge count, string table size
+#   words    one record per headword, sorted by its UTF-8 bytes:
+#            string offset, string length, first edge index, edge count
+#   edges    target word index, relationship id, weight (0-255)
+#   strings  UTF-8 headwords back to back
+# Targets are word indexes, so every related word is itself a headword and
+# the whole graph can be searched in place without decoding it up front.
+MAGIC = b"LXG1"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIII")
+_WORD = struct.Struct("<IIII")
+_EDGE = struct.Struct("<IBBxx")
+
+# Relationship labels of the Layer 4 contract, in the order the ranking
+# prefers them when it has to pick a diverse set.
+RELATIONSHIPS = ("synonym", "broader", "narrower", "antonym", "collocate")
+_RELATION_IDS = {name: index for index, name in enumerate(RELATIONSHIPS)}
+
+# WordNet-style relation names accepted by the index builder.
+RELATION_ALIASES = {
+    "similar": "synonym",
+    "hypernym": "broader",
+    "hyponym": "narrower",
+    "collocation": "collocate",
+}
+
+# Cheap inflection stripping used when the surface form is not a headword.
+# The index is keyed by lemma; there is no full lemmatizer in the backend.
+_SUFFIXES = (
+    ("ies", "y"),
+    ("ied", "y"),
+    ("es", ""),
+    ("s", ""),
+    ("ed", ""),
+    ("ed", "e"),
+    ("ing", ""),
+    ("ing", "e"),
+)
+
+
+def relation_id(name: str) -> Optional[int]:
+    name = name.strip().lower()
+    return _RELATION_IDS.get(RELATION_ALIASES.get(name, name))
+
+
+def lemma_candidates(word: str) -> list[str]:
+    """The normalized word followed by plausible base forms, most likely first."""
+    word = normalize_word(word)
+    forms = [word]
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            stem = word[: -len(suffix)]
+            forms.append(stem + replacement)
+            # running -> run, stopped -> stop
+            if not replacement and stem[-1] == stem[-2] and stem[-1] not in "aeiouls":
+                forms.append(stem[:-1])
+    return list(dict.fromkeys(forms))
+
+
+def write_lexical_graph(path: str, edges: Iterable[tuple[str, str, str, float]]) -> dict[str, int]:
+    """
+    Compile `(word, relationship, target, weight)` edges into an index file.
+
+    Weights are clamped to 0..1. Unknown relationships, self-loops and
+    duplicate edges are dropped; a duplicate keeps its highest weight.
+    """
+    best: dict[tuple[str, str, int], float] = {}
+    for word, relationship, target, weight in edges:
+        word, target = normalize_word(word), normalize_word(target)
+        rel = relation_id(relationship)
+        if not word or not target or word == target or rel is None:
+            continue
+        key = (word, target, rel)
+        best[key] = max(best.get(key, 0.0), min(1.0, max(0.0, weight)))
+
+    words = sorted(
+        {word for word, _, _ in best} | {target for _, target, _ in best},
+        key=lambda w: w.encode("utf-8"),
+    )
+    index = {word: position for position, word in enumerate(words)}
+    by_word: dict[str, list[tuple[int, int, int]]] = {}
+    for (word, target, rel), weight in best.items():
+        by_word.setdefault(word, []).append((index[target], rel, round(weight * 255)))
+
+    strings = bytearray()
+    word_records = bytearray()
+    edge_records = bytearray()
+    edge_count = 0
+    for word in words:
+        encoded = word.encode("utf-8")
+        word_edges = sorted(by_word.get(word, []), key=lambda edge: -edge[2])
+        word_records += _WORD.pack(len(strings), len(encoded), edge_count, len(word_edges))
+        strings += encoded
+        for edge in word_edges:
+            edge_records += _EDGE.pack(*edge)
+        edge_count += len(word_edges)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, len(words), edge_count, len(strings)))
+        handle.write(word_records)
+        handle.write(edge_records)
+        handle.write(strings)
+    os.replace(tmp_path, path)
+    return {"words": len(words), "edges": edge_count}
+
+
+class LexicalGraph:
+    """
+    Memory-mapped lexical relation index for Layer 4 Stage A.
+
+    The file is opened on first use; lookups binary-search the sorted word
+    table directly in the mapping, so memory use stays flat no matter how
+    large the graph is. A missing or corrupt file disables the index (every
+    lookup misses) and callers fall back to the LLM.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mmap: Optional[mmap.mmap] = None
+        self._word_count = 0
+        self._words_at = 0
+        self._edges_at = 0
+        self._strings_at = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path:
+                return
+            try:
+                with open(self.path, "rb") as handle:
+                    mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as exc:
+                logger.warning("Lexical graph %s unavailable: %s", self.path, exc)
+                return
+
+            header = (b"", 0, 0, 0, 0)
+            if len(mapping) >= _HEADER.size:
+                header = _HEADER.unpack_from(mapping, 0)
+            magic, version, words, edges, strings = header
+            expected = _HEADER.size + words * _WORD.size + edges * _EDGE.size + strings
+            if magic != MAGIC or version != VERSION or len(mapping) != expected:
+                logger.warning("Ignoring incompatible lexical graph file %s", self.path)
+                mapping.close()
+                return
+
+            self._mmap = mapping
+            self._word_count = words
+            self._words_at = _HEADER.size
+            self._edges_at = self._words_at + words * _WORD.size
+            self._strings_at = self._edges_at + edges * _EDGE.size
+            logger.info("Loaded lexical graph %s (%d words, %d edges)", self.path, words, edges)
+
+    @property
+    def available(self) -> bool:
+        self._load()
+        return self._mmap is not None
+
+    def _word_at(self, position: int) -> tuple[bytes, int, int]:
+        offset, length, first_edge, edge_count = _WORD.unpack_from(
+            self._mmap, self._words_at + position * _WORD.size
+        )
+        start = self._strings_at + offset
+        return self._mmap[start : start + length], first_edge, edge_count
+
+    def _find(self, word: str) -> Optional[int]:
+        target = word.encode("utf-8")
+        low, high = 0, self._word_count
+        while low < high:
+            mid = (low + high) // 2
+            current, _, _ = self._word_at(mid)
+            if current < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._word_count and self._word_at(low)[0] == target:
+            return low
+        return None
+
+    def neighbours(self, word: str) -> list[tuple[str, str, float]]:
+        """`(target, relationship, weight)` edges of the first matching lemma."""
+        if not self.available:
+            return []
+        for lemma in lemma_candidates(word):
+            position = self._find(lemma)
+            if position is None:
+                continue
+            _, first_edge, edge_count = self._word_at(position)
+            if not edge_count:
+                continue
+            result = []
+            for edge in range(first_edge, first_edge + edge_count):
+                target, rel, weight = _EDGE.unpack_from(
+                    self._mmap, self._edges_at + edge * _EDGE.size
+                )
+                result.append(
+                    (self._word_at(target)[0].decode("utf-8"), RELATIONSHIPS[rel], weight / 255)
+                )
+            return result
+        return []
+
+    def candidates(self, word: str, limit: int) -> list[RelatedWord]:
+        """
+        Rank the neighbours of `word` into Stage A candidates.
+
+        Picks round-robin across relationship types (in `RELATIONSHIPS`
+        order) and by weight within a type, so a handful of candidates covers
+        synonyms, broader and contrasting words instead of five synonyms.
+        Returns an empty list when the word is not in the index.
+        """
+        groups: dict[str, list[tuple[str, float]]] = {}
+        for target, relationship, weight in self.neighbours(word):
+            groups.setdefault(relationship, []).append((target, weight))
+
+        ranked: list[RelatedWord] = []
+        seen: set[str] = set()
+        queues = [
+            sorted(groups[rel], key=lambda item: -item[1]) for rel in RELATIONSHIPS if rel in groups
+        ]
+        relationships = [rel for rel in RELATIONSHIPS if rel in groups]
+        while len(ranked) < limit and any(queues):
+            for rel, queue in zip(relationships, queues):
+                if not queue or len(ranked) >= limit:
+                    continue
+                target, _ = queue.pop(0)
+                if target in seen:
+                    continue
+                seen.add(target)
+                ranked.append(
+                    RelatedWord(word=target, relationship=rel, difference="", when_to_use="")
+                )
+
+        if ranked:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return ranked
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "available": self._mmap is not None,
+            "words": self._word_count,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = None
+            self._loaded = False
+
+
+lexical_graph = LexicalGraph(settings.lexical_graph_path)
@@ -1,34 +1,105 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
 import json
 import logging
-from collections.abc import AsyncGenerator
-from typing import Any, List, Optional
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import aclosing
+from typing import Any, List, Optional, TypeVar
+
+from pydantic import BaseModel
 
 from app.config import settings
 from app.prompt_config import PROMPT_CONFIG
 from app.models.interests import InterestTopicPayload
 from app.models.request import AnalyzeRequest
 from app.models.response import (
+    AnalyzeBatchItem,
     CommonMistake,
+    Layer1Response,
     Layer2Response,
     Layer3Response,
     Layer4Response,
     LiveContext,
     RelatedWord,
 )
-from app.services.openrouter import openrouter_client
+from app.services.hedging import hedger
+from app.services.lexical_graph import lexical_graph
+from app.services.model_health import model_health
+from app.services.openrouter import openrouter_client, parse_json_response
 from app.services.prompt_builder import PromptBuilder
-from app.utils.error_handling import OpenRouterError
+from app.services.response_cache import (
+    candidate_cache,
+    level_band,
+    make_cache_key,
+    normalize_word,
+    response_cache,
+)
+from app.utils import deadline
+from app.utils.admission import Priority
+from app.utils.error_handling import (
+    AdmissionRejectedError,
+    DeadlineExceededError,
+    OpenRouterError,
+    QuotaExhaustedError,
+)
+from app.utils.json_stream import JSONArrayStreamParser
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+# Admission priority per logical layer: Layer 1 is on the user's critical
+# path, Layers 2/4 back interactive UI, Layer 3 is loaded lazily.
+LAYER_PRIORITIES: dict[str, Priority] = {
+    "layer1": Priority.LAYER1,
+    "layer2": Priority.INTERACTIVE,
+    "layer4_fast": Priority.INTERACTIVE,
+    "layer4": Priority.INTERACTIVE,
+    "layer3": Priority.LAZY,
+}
+
+# Lowest admission priority for upstream calls made in the current context.
+# Set for work nobody is waiting on yet (batch pre-computation, prefetching),
+# so those calls queue behind interactive lookups instead of competing.
+_priority_floor: contextvars.ContextVar[Priority | None] = contextvars.ContextVar(
+    "priority_floor", default=None
+)
+
+# Failures on our side: the request budget is spent, or the call was shed by
+# admission control or the shared quota. They say nothing about the model, so
+# they neither count against its health nor move on to a fallback model.
+_LOCAL_ERRORS = (DeadlineExceededError, AdmissionRejectedError, QuotaExhaustedError)
+
+# Layers the batch endpoint computes; Layer 4 is personalized per lookup.
+BATCH_LAYERS = (1, 2, 3)
+
+# Receives `<layer>_item` events (event name, data) from layer tasks started
+# by `analyze_streaming`. Unset for the JSON endpoints, which only return the
+# aggregated result and keep using non-streaming upstream calls.
+_item_sink: contextvars.ContextVar[Callable[[str, dict[str, Any]], None] | None] = (
+    contextvars.ContextVar("layer_item_sink", default=None)
+)
+
+# Upper bound on related words materialized for Layer 4, while allowing the
+# prompt to request up to 5.
+MAX_RELATED_WORDS = 5
+MAX_LAYER4_CANDIDATES = 5
+
 
 class LLMOrchestrator:
     def __init__(self):
         self.client = openrouter_client
         self.prompt_builder = PromptBuilder()
+        self.cache = response_cache
+        self.candidate_cache = candidate_cache
+        self.lexical_graph = lexical_graph
+        self.model_health = model_health
+        self.hedger = hedger
 
     def _model_for(self, layer: str) -> str:
         """
@@ -54,6 +125,225 @@ class LLMOrchestrator:
 
         return settings.openrouter_model_id
 
+    @staticmethod
+    def _priority_for(layer: str) -> Priority:
+        priority = LAYER_PRIORITIES.get(layer, Priority.INTERACTIVE)
+        floor = _priority_floor.get()
+        return priority if floor is None else max(priority, floor)
+
+    def _model_chain(self, layer: str) -> list[str]:
+        """
+        Ordered fallback chain of model ids for a layer.
+
+        The primary model from `_model_for` comes first, followed by any
+        configured `openrouter_model_fallbacks[layer]` entries (or the global
+        default model when none are configured). The chain is then reordered
+        by rolling model health so degraded models are tried last.
+        """
+        chain = [self._model_for(layer)]
+        fallbacks = settings.openrouter_model_fallbacks.get(layer)
+        if fallbacks is None:
+            fallbacks = [settings.openrouter_model_id]
+        for model in fallbacks:
+            if model and model not in chain:
+                chain.append(model)
+
+        return self.model_health.order(chain)
+
+    async def _complete_json(self, layer: str, **kwargs: Any) -> Any:
+        """
+        `complete_json` across the layer's fallback chain.
+
+        Every model but the last gets a single attempt, so an error moves on
+        to the next model immediately instead of sleeping between retries.
+        """
+        chain = self._model_chain(layer)
+        last_error: Exception | None = None
+
+        for index, model in enumerate(chain):
+            is_last = index == len(chain) - 1
+            started = time.monotonic()
+            try:
+                result = await self.client.complete_json(
+                    model=model,
+                    max_retries=None if is_last else 1,
+                    priority=self._priority_for(layer),
+                    **kwargs,
+                )
+            except _LOCAL_ERRORS:
+                raise
+            except OpenRouterError as exc:
+                self.model_health.record(model, time.monotonic() - started, ok=False)
+                last_error = exc
+                if not is_last:
+                    logger.warning(
+                        "%s call to %s failed (%s); falling back to %s",
+                        layer,
+                        model,
+                        exc,
+                        chain[index + 1],
+                    )
+                continue
+
+            self.model_health.record(model, time.monotonic() - started, ok=True)
+            return result
+
+        assert last_error is not None
+        raise last_error
+
+    async def _complete_json_hedged(
+        self,
+        layer: str,
+        parse: Callable[[Any], T],
+        **kwargs: Any,
+    ) -> T:
+        """
+        `_complete_json` + `parse`, optionally hedged against slow responses.
+
+        When hedging is enabled for the layer, a duplicate request is fired
+        once the primary call exceeds the layer's latency threshold (see
+        `Hedger`), and the first response that parses successfully wins. The
+        hedge goes to the next model in the fallback chain when
+        `hedge_use_alternate_model` is set, otherwise to the same model with
+        request de-duplication bypassed.
+        """
+
+        async def _primary() -> T:
+            return parse(await self._complete_json(layer, **kwargs))
+
+        if not settings.hedge_enabled or layer not in settings.hedge_layers:
+            return await _primary()
+
+        chain = self._model_chain(layer)
+        hedge_model = chain[0]
+        if settings.hedge_use_alternate_model and len(chain) > 1:
+            hedge_model = chain[1]
+
+        async def _hedge() -> T:
+            started = time.monotonic()
+            try:
+                response = await self.client.complete_json(
+                    model=hedge_model,
+                    max_retries=1,
+                    dedupe=False,
+                    priority=self._priority_for(layer),
+                    **kwargs,
+                )
+            except _LOCAL_ERRORS:
+                raise
+            except OpenRouterError:
+                self.model_health.record(hedge_model, time.monotonic() - started, ok=False)
+                raise
+            self.model_health.record(hedge_model, time.monotonic() - started, ok=True)
+            return parse(response)
+
+        return await self.hedger.run(layer, _primary, _hedge)
+
+    async def _stream(self, layer: str, **kwargs: Any) -> AsyncGenerator[str, None]:
+        """
+        `stream` across the layer's fallback chain.
+
+        A model is only abandoned if it fails before producing any output;
+        once chunks have been sent to the client, errors are propagated.
+        """
+        chain = self._model_chain(layer)
+
+        for index, model in enumerate(chain):
+            is_last = index == len(chain) - 1
+            started = time.monotonic()
+            produced = False
+            try:
+                async for chunk in self.client.stream(
+                    model=model,
+                    priority=self._priority_for(layer),
+                    **kwargs,
+                ):
+                    produced = True
+                    yield chunk
+            except _LOCAL_ERRORS:
+                raise
+            except OpenRouterError as exc:
+                self.model_health.record(model, time.monotonic() - started, ok=False)
+                if produced or is_last:
+                    raise
+                logger.warning(
+                    "%s stream from %s failed (%s); falling back to %s",
+                    layer,
+                    model,
+                    exc,
+                    chain[index + 1],
+                )
+                continue
+
+            self.model_health.record(model, time.monotonic() - started, ok=True)
+            return
+
+    async def _stream_json(
+        self,
+        layer: str,
+        on_item: Callable[[Any], None],
+        key: str | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Streaming counterpart of `_complete_json`.
+
+        Elements of the response's JSON array (top-level, or the array under
+        `key`) are passed to `on_item` as soon as each one is complete; the
+        whole document is parsed and returned once the stream ends.
+        """
+        parser = JSONArrayStreamParser(key=key)
+        async for chunk in self._stream(layer, **kwargs):
+            for item in parser.feed(chunk):
+                on_item(item)
+        return parse_json_response(parser.text)
+
+    @staticmethod
+    def _emit_item(event: str, data: dict[str, Any]) -> None:
+        sink = _item_sink.get()
+        if sink is not None:
+            sink(event, data)
+
+    def _emit_items(self, layer: str, items: list[Any]) -> None:
+        for index, item in enumerate(items):
+            self._emit_item(f"{layer}_item", {"index": index, "item": item.model_dump()})
+
+    async def _complete_json_items(
+        self,
+        layer: str,
+        parse: Callable[[Any], T],
+        make_item: Callable[[dict[str, Any]], Any],
+        limit: int,
+        key: str | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        `_complete_json_hedged` + `parse` for list-shaped layers, streamed
+        when an item sink is active.
+
+        Under `analyze_streaming` the response is streamed and the first
+        `limit` object elements of its array (top-level, or under `key`) are
+        emitted as `<layer>_item` events built with `make_item` as soon as
+        each one closes; `parse` still validates the whole response. Hedging
+        does not apply to the streamed path.
+        """
+        if _item_sink.get() is None:
+            return await self._complete_json_hedged(layer, parse, **kwargs)
+
+        emitted = 0
+
+        def _on_item(item: Any) -> None:
+            nonlocal emitted
+            if emitted >= limit or not isinstance(item, dict):
+                return
+            self._emit_item(
+                f"{layer}_item",
+                {"index": emitted, "item": make_item(item).model_dump()},
+            )
+            emitted += 1
+
+        return parse(await self._stream_json(layer, _on_item, key=key, **kwargs))
+
     def _reasoning_kwargs(self, layer: str) -> dict[str, Any]:
         """
         Optional vendor-specific reasoning / thinking parameters.
@@ -75,54 +365,128 @@ class LLMOrchestrator:
         context: str,
         english_level: str | None = None
     ) -> AsyncGenerator[str, None]:
+        cache_key = make_cache_key(
+            "layer1",
+            word,
+            context,
+            band=level_band(english_level),
+            model=self._model_for("layer1"),
+        )
+        cached = await self.cache.get(cache_key)
+        if cached:
+            # Replay the cached definition as a single chunk so callers keep
+            # the same streaming contract.
+            yield cached
+            return
+
         system_prompt, user_prompt = self.prompt_builder.build_layer1_prompt(
             word,
             context,
             english_level,
         )
 
-        full_content = ""
-        async for chunk in self.client.stream(
+        parts: list[str] = []
+        async for chunk in self._stream(
+            "layer1",
             prompt=user_prompt,
             system_prompt=system_prompt,
             temperature=0.7,
             max_tokens=300
         ):
-            full_content += chunk
+            parts.append(chunk)
             yield chunk
 
+        full_content = "".join(parts)
         if not full_content.strip():
             raise OpenRouterError("Layer 1 returned empty content")
+
+        await self.cache.set(cache_key, full_content, settings.response_cache_layer1_ttl)
+
+    async def generate_layer1(
+        self,
+        word: str,
+        context: str,
+        english_level: str | None = None,
+    ) -> Layer1Response:
+        """Layer 1 collected into one response, for callers that do not stream."""
+        parts = [chunk async for chunk in self.generate_layer1_stream(word, context, english_level)]
+        return Layer1Response(content="".join(parts))
+
+    def _layer2_cache_key(self, word: str, context: str, batched: bool = False) -> str:
+        # Answers from the multi-word prompt are versioned on both prompt
+        # blocks and never served for a single-word request.
+        return make_cache_key(
+            "layer2",
+            word,
+            context,
+            prompt_keys=("layer2", "layer2_batch") if batched else ("layer2",),
+            model=self._model_for("layer2"),
+        )
+
     async def generate_layer2(self, word: str, context: str) -> Layer2Response:
+        cache_key = self._layer2_cache_key(word, context)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            result = Layer2Response.model_validate(cached)
+            self._emit_items("layer2", result.contexts)
+            return result
+
         system_prompt, user_prompt = self.prompt_builder.build_layer2_prompt(
             word,
             context,
         )
 
-        response = await self.client.complete_json(
+        result = await self._complete_json_items(
+            "layer2",
+            self._parse_layer2,
+            self._live_context,
+            limit=3,
             prompt=user_prompt,
             system_prompt=system_prompt,
             temperature=0.8,
             max_tokens=600,
-            model=self._model_for("layer2"),
         )
 
+        await self.cache.set(cache_key, result.model_dump(), settings.response_cache_layer2_ttl)
+        return result
+
+    @classmethod
+    def _parse_layer2(cls, response: Any) -> Layer2Response:
         if not isinstance(response, list) or len(response) != 3:
             raise OpenRouterError("Layer 2 response must be a list of 3 contexts")
 
-        contexts = []
-        for item in response:
-            # Frontend derives icons from `source`, so we intentionally ignore
-            # any `icon` keys returned by the LLM to save tokens.
-            contexts.append(
-                LiveContext(
-                    source=item.get("source", "unknown"),
-                    text=item.get("text", ""),
-                )
-            )
+        contexts = [cls._live_context(item) for item in response]
 
         return Layer2Response(contexts=contexts)
 
+    @staticmethod
+    def _live_context(item: dict[str, Any]) -> LiveContext:
+        # Frontend derives icons from `source`, so we intentionally ignore
+        # any `icon` keys returned by the LLM to save tokens.
+        return LiveContext(
+            source=item.get("source", "unknown"),
+            text=item.get("text", ""),
+        )
+
+    def _layer3_cache_key(
+        self,
+        word: str,
+        context: str,
+        english_level: str | None,
+        max_items: int,
+        batched: bool = False,
+    ) -> str:
+        return make_cache_key(
+            "layer3",
+            word,
+            context,
+            band=level_band(english_level),
+            prompt_keys=("layer3", "layer3_batch") if batched else ("layer3",),
+            model=self._model_for("layer3"),
+            reasoning=self._reasoning_kwargs("layer3"),
+            max_items=max_items,
+        )
+
     async def generate_layer3(
         self,
         word: str,
@@ -130,21 +494,36 @@ class LLMOrchestrator:
         english_level: str | None = None,
         max_items: int = 2,
     ) -> Layer3Response:
+        cache_key = self._layer3_cache_key(word, context, english_level, max_items)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            result = Layer3Response.model_validate(cached)
+            self._emit_items("layer3", result.mistakes)
+            return result
+
         system_prompt, user_prompt = self.prompt_builder.build_layer3_prompt(
             word,
             context,
             english_level,
         )
 
-        response = await self.client.complete_json(
+        result = await self._complete_json_items(
+            "layer3",
+            lambda response: self._parse_layer3(response, max_items),
+            self._common_mistake,
+            limit=max(1, max_items),
             prompt=user_prompt,
             system_prompt=system_prompt,
             temperature=0.7,
             max_tokens=400,
-            model=self._model_for("layer3"),
             **self._reasoning_kwargs("layer3"),
         )
 
+        await self.cache.set(cache_key, result.model_dump(), settings.response_cache_layer3_ttl)
+        return result
+
+    @classmethod
+    def _parse_layer3(cls, response: Any, max_items: int) -> Layer3Response:
         if not isinstance(response, list) or len(response) < 1:
             raise OpenRouterError(
                 "Layer 3 response must be a list of at least 1 mistake"
@@ -153,18 +532,186 @@ class LLMOrchestrator:
         # Always keep at least one mistake for UX, but allow experiments with
         # fewer than the default 2 items when desired.
         limit = max(1, max_items)
-        mistakes = []
-        for item in response[:limit]:
-            mistakes.append(
-                CommonMistake(
-                    wrong=item.get("wrong", ""),
-                    why=item.get("why", ""),
-                    correct=item.get("correct", ""),
-                )
-            )
+        mistakes = [cls._common_mistake(item) for item in response[:limit]]
 
         return Layer3Response(mistakes=mistakes)
 
+    @staticmethod
+    def _common_mistake(item: dict[str, Any]) -> CommonMistake:
+        return CommonMistake(
+            wrong=item.get("wrong", ""),
+            why=item.get("why", ""),
+            correct=item.get("correct", ""),
+        )
+
+    @staticmethod
+    def _unique_words(words: list[str]) -> list[str]:
+        """Drop blanks and case-insensitive duplicates, keeping the first spelling."""
+        unique: dict[str, str] = {}
+        for word in words:
+            unique.setdefault(normalize_word(word), word.strip())
+        unique.pop("", None)
+        return list(unique.values())
+
+    async def _complete_layer_batch(
+        self,
+        layer: str,
+        words: list[str],
+        model: type[ModelT],
+        cache_key: Callable[[str, bool], str],
+        build_prompt: Callable[[list[str]], tuple[str, str]],
+        parse: Callable[[Any], ModelT],
+        ttl: int,
+        max_tokens_per_word: int,
+        **kwargs: Any,
+    ) -> dict[str, ModelT]:
+        """
+        Answer `words` from the per-word cache, then with one multi-word call
+        per chunk of `layer_batch_max_words` cache misses.
+
+        The batched prompt returns an object keyed by word; each value is
+        parsed like a single-word answer. Lookups accept single-word and
+        batched entries, but batched answers are cached under their own key
+        (`cache_key(word, True)`) so single-word requests never get them.
+        Words missing from the answer, with an invalid value, or in a failed
+        call are left out for the caller to fetch one by one.
+        """
+        results: dict[str, ModelT] = {}
+        misses: list[str] = []
+        for word in words:
+            for batched in (False, True):
+                cached = await self.cache.get(cache_key(word, batched))
+                if cached is not None:
+                    results[word] = model.model_validate(cached)
+                    break
+            else:
+                misses.append(word)
+
+        async def _chunk(chunk: list[str]) -> None:
+            system_prompt, user_prompt = build_prompt(chunk)
+            try:
+                response = await self._complete_json(
+                    layer,
+                    prompt=user_prompt,
+                    system_prompt=system_prompt,
+                    max_tokens=max_tokens_per_word * len(chunk),
+                    **kwargs,
+                )
+            except _LOCAL_ERRORS:
+                # Per-word calls would hit the same budget or capacity limit.
+                raise
+            except OpenRouterError as exc:
+                logger.warning("Batched %s call for %d words failed: %s", layer, len(chunk), exc)
+                return
+            if not isinstance(response, dict):
+                logger.warning("Batched %s response is not a JSON object", layer)
+                return
+
+            answers = {
+                normalize_word(key): value
+                for key, value in response.items()
+                if isinstance(key, str)
+            }
+            for word in chunk:
+                try:
+                    result = parse(answers.get(normalize_word(word)))
+                except OpenRouterError as exc:
+                    logger.info("Batched %s answer unusable for '%s': %s", layer, word, exc)
+                    continue
+                results[word] = result
+                await self.cache.set(cache_key(word, True), result.model_dump(), ttl)
+
+        # A single miss gains nothing from the batched prompt; leave it to the
+        # caller's per-word call.
+        size = max(2, settings.layer_batch_max_words)
+        chunks = [misses[i : i + size] for i in range(0, len(misses), size)]
+        await asyncio.gather(*(_chunk(chunk) for chunk in chunks if len(chunk) > 1))
+        return results
+
+    def _layer2_batch(self, words: list[str], context: str) -> Awaitable[dict[str, Layer2Response]]:
+        return self._complete_layer_batch(
+            "layer2",
+            words,
+            Layer2Response,
+            lambda word, batched: self._layer2_cache_key(word, context, batched),
+            lambda chunk: self.prompt_builder.build_layer2_batch_prompt(chunk, context),
+            self._parse_layer2,
+            settings.response_cache_layer2_ttl,
+            max_tokens_per_word=600,
+            temperature=0.8,
+        )
+
+    def _layer3_batch(
+        self,
+        words: list[str],
+        context: str,
+        english_level: str | None,
+        max_items: int,
+    ) -> Awaitable[dict[str, Layer3Response]]:
+        return self._complete_layer_batch(
+            "layer3",
+            words,
+            Layer3Response,
+            lambda word, batched: self._layer3_cache_key(
+                word, context, english_level, max_items, batched
+            ),
+            lambda chunk: self.prompt_builder.build_layer3_batch_prompt(
+                chunk, context, english_level
+            ),
+            lambda response: self._parse_layer3(response, max_items),
+            settings.response_cache_layer3_ttl,
+            max_tokens_per_word=400,
+            temperature=0.7,
+            **self._reasoning_kwargs("layer3"),
+        )
+
+    async def _with_fallback(
+        self,
+        words: list[str],
+        results: dict[str, ModelT],
+        fetch: Callable[[str], Awaitable[ModelT]],
+    ) -> dict[str, ModelT]:
+        missing = [word for word in words if word not in results]
+        if missing:
+            logger.info("Fetching %d words missing from the batched answer", len(missing))
+            for word, result in zip(missing, await asyncio.gather(*map(fetch, missing))):
+                results[word] = result
+        return {word: results[word] for word in words}
+
+    async def generate_layer2_batch(
+        self,
+        words: list[str],
+        context: str,
+    ) -> dict[str, Layer2Response]:
+        """
+        Layer 2 for several words sharing `context`, keyed by word.
+
+        Cache misses are answered by one multi-word call (per chunk of
+        `layer_batch_max_words`) instead of one call per word; any word the
+        batched answer lacks falls back to `generate_layer2`.
+        """
+        words = self._unique_words(words)
+        results = await self._layer2_batch(words, context)
+        return await self._with_fallback(
+            words, results, lambda word: self.generate_layer2(word, context)
+        )
+
+    async def generate_layer3_batch(
+        self,
+        words: list[str],
+        context: str,
+        english_level: str | None = None,
+        max_items: int = 2,
+    ) -> dict[str, Layer3Response]:
+        """Layer 3 counterpart of `generate_layer2_batch`."""
+        words = self._unique_words(words)
+        results = await self._layer3_batch(words, context, english_level, max_items)
+        return await self._with_fallback(
+            words,
+            results,
+            lambda word: self.generate_layer3(word, context, english_level, max_items),
+        )
+
     async def generate_layer4_candidates(
         self,
         word: str,
@@ -177,39 +724,163 @@ class LLMOrchestrator:
         `relationship` are populated; `difference` and `when_to_use` are left
         empty for the enrichment stage.
         """
-        system_prompt, user_prompt = self.prompt_builder.build_layer4_candidates_prompt(
-            word,
-            context,
+        return await self._complete_json_hedged(
+            "layer4_fast",
+            self._parse_layer4_candidates,
+            **self._layer4_candidates_kwargs(word, context),
         )
 
-        response = await self.client.complete_json(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            temperature=0.7,
-            max_tokens=200,
+    async def stream_layer4_candidates(
+        self,
+        word: str,
+        context: str,
+        enough: int,
+    ) -> tuple[list[RelatedWord], bool]:
+        """
+        Pipelined Stage A: stream the candidate recall and return as soon as
+        `enough` candidates have been parsed, together with whether the whole
+        Stage A response was read.
+
+        The rest of the upstream stream is cancelled, so Stage B can start
+        while Stage A would still be generating, at the cost of dropping any
+        later candidates. Falls back to parsing the whole response when the
+        stream ends before `enough` candidates.
+        """
+        parser = JSONArrayStreamParser()
+        candidates: list[RelatedWord] = []
+
+        async with aclosing(
+            self._stream("layer4_fast", **self._layer4_candidates_kwargs(word, context))
+        ) as chunks:
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    if not isinstance(item, dict) or len(candidates) >= MAX_LAYER4_CANDIDATES:
+                        continue
+                    candidates.append(self._layer4_candidate(item))
+                if len(candidates) >= enough:
+                    return candidates, False
+
+        if candidates:
+            return candidates, True
+        return self._parse_layer4_candidates(parse_json_response(parser.text)), True
+
+    def _candidate_cache_key(self, word: str, sense: str | None = None) -> str:
+        # Deliberately context-free: the sentence only matters to Stage B.
+        return make_cache_key(
+            "layer4_candidates",
+            word,
             model=self._model_for("layer4_fast"),
+            sense=sense,
+        )
+
+    async def recall_layer4_candidates(
+        self,
+        word: str,
+        context: str,
+        sense: str | None = None,
+    ) -> list[RelatedWord]:
+        """
+        Stage A behind the lexical graph and the candidate cache.
+
+        With `layer4_candidate_source="index"` words found in the local graph
+        never reach the model. Cache hits skip the fast-model call as well.
+        On a miss the candidates are recalled with the current sentence
+        (pipelined when `layer4_pipeline_min_candidates` is set) and stored
+        for every later context of the same headword and sense. A pipelined
+        recall that stopped reading Stage A early is not stored, so a cut
+        list never stands in for the full one.
+        """
+        if settings.layer4_candidate_source == "index":
+            candidates = self.lexical_graph.candidates(word, MAX_LAYER4_CANDIDATES)
+            if candidates:
+                return candidates
+
+        cache_key = self._candidate_cache_key(word, sense)
+        cached = await self.candidate_cache.get(cache_key)
+        if cached:
+            return [RelatedWord.model_validate(item) for item in cached]
+
+        enough = settings.layer4_pipeline_min_candidates
+        complete = True
+        if enough > 0:
+            candidates, complete = await self.stream_layer4_candidates(word, context, enough)
+        else:
+            candidates = await self.generate_layer4_candidates(
+                word=word,
+                context=context,
+            )
+
+        if not complete:
+            return candidates
+        await self.candidate_cache.set(
+            cache_key,
+            [candidate.model_dump() for candidate in candidates],
+            settings.layer4_candidate_cache_ttl,
         )
+        return candidates
+
+    async def warm_layer4_candidates(
+        self,
+        words: list[str],
+        concurrency: int = 4,
+    ) -> dict[str, int]:
+        """
+        Pre-populate the candidate cache for `words`.
+
+        Already cached words are skipped; failures are logged and counted so
+        one bad word does not stop the run.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        counts = {"cached": 0, "recalled": 0, "failed": 0}
+
+        async def warm(word: str) -> None:
+            async with semaphore:
+                if await self.candidate_cache.get(self._candidate_cache_key(word)):
+                    counts["cached"] += 1
+                    return
+                try:
+                    candidates = await self.generate_layer4_candidates(word=word, context=word)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Candidate warm-up failed for '%s': %s", word, exc)
+                    counts["failed"] += 1
+                    return
+                await self.candidate_cache.set(
+                    self._candidate_cache_key(word),
+                    [candidate.model_dump() for candidate in candidates],
+                    settings.layer4_candidate_cache_ttl,
+                )
+                counts["recalled"] += 1
 
+        unique = [word for word in dict.fromkeys(map(normalize_word, words)) if word]
+        await asyncio.gather(*(warm(word) for word in unique))
+        return counts
+
+    def _layer4_candidates_kwargs(self, word: str, context: str) -> dict[str, Any]:
+        system_prompt, user_prompt = self.prompt_builder.build_layer4_candidates_prompt(
+            word,
+            context,
+        )
+        return {
+            "prompt": user_prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.7,
+            "max_tokens": 200,
+        }
+
+    @classmethod
+    def _parse_layer4_candidates(cls, response: Any) -> list[RelatedWord]:
         if not isinstance(response, list) or len(response) < 1:
             raise OpenRouterError(
                 "Layer 4 candidate response must be a non-empty JSON array"
             )
 
-        max_candidates = 5
         candidates: list[RelatedWord] = []
-        for item in response[:max_candidates]:
+        for item in response[:MAX_LAYER4_CANDIDATES]:
             if not isinstance(item, dict):
                 logger.warning("Skipping non-dict layer4 candidate: %s", item)
                 continue
 
-            candidates.append(
-                RelatedWord(
-                    word=item.get("word", "") or "",
-                    relationship=item.get("relationship", "") or "",
-                    difference="",
-                    when_to_use="",
-                )
-            )
+            candidates.append(cls._layer4_candidate(item))
 
         if not candidates:
             raise OpenRouterError(
@@ -218,6 +889,15 @@ class LLMOrchestrator:
 
         return candidates
 
+    @staticmethod
+    def _layer4_candidate(item: dict[str, Any]) -> RelatedWord:
+        return RelatedWord(
+            word=item.get("word", "") or "",
+            relationship=item.get("relationship", "") or "",
+            difference="",
+            when_to_use="",
+        )
+
     async def generate_layer4_personalized_stream(
         self,
         word: str,
@@ -248,12 +928,12 @@ class LLMOrchestrator:
             favorite_words=favorite_words,
         )
 
-        async for chunk in self.client.stream(
+        async for chunk in self._stream(
+            "layer4",
             prompt=user_prompt,
             system_prompt=system_prompt,
             temperature=0.7,
             max_tokens=400,
-            model=self._model_for("layer4"),
             **self._reasoning_kwargs("layer4"),
         ):
             yield chunk
@@ -318,15 +998,36 @@ class LLMOrchestrator:
             candidates_for_prompt=candidates_for_prompt,
         )
 
-        response = await self.client.complete_json(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-            temperature=0.7,
-            max_tokens=600,
-            model=self._model_for("layer4"),
+        request_kwargs: dict[str, Any] = {
+            "prompt": user_prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.7,
+            "max_tokens": 600,
             **self._reasoning_kwargs("layer4"),
+        }
+
+        # Under analyze_streaming each related word reaches the client as a
+        # `layer4_item` event as soon as its object closes.
+        return await self._complete_json_items(
+            "layer4",
+            self._parse_layer4,
+            self._related_word,
+            limit=MAX_RELATED_WORDS,
+            key="related_words",
+            **request_kwargs,
         )
 
+    @staticmethod
+    def _related_word(item: dict[str, Any]) -> RelatedWord:
+        return RelatedWord(
+            word=item.get("word", "") or "",
+            relationship=item.get("relationship", "") or "",
+            difference=item.get("difference", "") or "",
+            when_to_use=item.get("when_to_use", "") or "",
+        )
+
+    @classmethod
+    def _parse_layer4(cls, response: Any) -> Layer4Response:
         if not isinstance(response, dict) or "related_words" not in response:
             raise OpenRouterError("Layer 4 response must contain 'related_words' key")
 
@@ -334,23 +1035,13 @@ class LLMOrchestrator:
         if not isinstance(related_words_data, list) or len(related_words_data) < 1:
             raise OpenRouterError("Layer 4 must contain at least 1 related word")
 
-        # Cap the number of related words we materialize for performance while
-        # allowing the prompt to request up to 5.
-        max_related = 5
         related_words: list[RelatedWord] = []
-        for item in related_words_data[:max_related]:
+        for item in related_words_data[:MAX_RELATED_WORDS]:
             if not isinstance(item, dict):
                 logger.warning("Skipping non-dict related word item: %s", item)
                 continue
 
-            related_words.append(
-                RelatedWord(
-                    word=item.get("word", "") or "",
-                    relationship=item.get("relationship", "") or "",
-                    difference=item.get("difference", "") or "",
-                    when_to_use=item.get("when_to_use", "") or "",
-                )
-            )
+            related_words.append(cls._related_word(item))
 
         if not related_words:
             raise OpenRouterError(
@@ -377,13 +1068,38 @@ class LLMOrchestrator:
         """
         Orchestrate the two-stage Lexical Map pipeline while preserving the
         existing Layer4Response contract.
+
+        With `layer4_pipeline_min_candidates` set, Stage B starts as soon as
+        that many Stage A candidates have streamed in instead of after the
+        full candidate response, and only those candidates are enriched.
         """
-        candidates = await self.generate_layer4_candidates(
-            word=word,
-            context=context,
+        # Layer 4 is personalized, so every learner input that reaches the
+        # prompt is part of the cache key.
+        cache_key = make_cache_key(
+            "layer4",
+            word,
+            context,
+            band=level_band(english_level),
+            prompt_keys=("layer4_candidates", "layer4"),
+            models=[self._model_for("layer4_fast"), self._model_for("layer4")],
+            reasoning=self._reasoning_kwargs("layer4"),
+            learning_history=learning_history or [],
+            favorite_words=(favorite_words or [])[:10],
+            interests=[
+                [topic.title.strip(), topic.summary.strip()]
+                for topic in (interests or [])[:5]
+            ],
+            blocked_titles=(blocked_titles or [])[:5],
         )
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            result = Layer4Response.model_validate(cached)
+            self._emit_items("layer4", result.related_words)
+            return result
 
-        return await self.enrich_layer4_from_candidates(
+        candidates = await self.recall_layer4_candidates(word, context)
+
+        result = await self.enrich_layer4_from_candidates(
             word=word,
             context=context,
             candidates=candidates,
@@ -393,6 +1109,8 @@ class LLMOrchestrator:
             blocked_titles=blocked_titles,
             favorite_words=favorite_words,
         )
+        await self.cache.set(cache_key, result.model_dump(), settings.response_cache_layer4_ttl)
+        return result
 
     async def summarize_interests_from_usage(
         self,
@@ -442,6 +1160,7 @@ class LLMOrchestrator:
             system_prompt=system_prompt,
             temperature=0.6,
             max_tokens=800,
+            priority=Priority.BACKGROUND,
         )
 
         if not isinstance(response, list):
@@ -474,10 +1193,143 @@ class LLMOrchestrator:
 
         return topics
 
+    async def analyze_batch(
+        self,
+        words: list[str],
+        context: str,
+        english_level: str | None = None,
+        layers: list[int] | None = None,
+        budget: Optional[float] = None,
+        priority: Priority = Priority.LAZY,
+        shared_prompts: bool | None = None,
+        budget_per_word: bool = False,
+    ) -> AsyncGenerator[AnalyzeBatchItem, None]:
+        """
+        Pre-compute the non-personalized layers for several words that share
+        one context, yielding each word's result as soon as it is complete.
+
+        Words run `analyze_batch_concurrency` at a time with their layers in
+        parallel, at no more than `priority` (LAZY by default) for admission,
+        so interactive lookups go first. Results land in the response cache.
+
+        With `shared_prompts` (default: `analyze_batch_shared_prompts`) Layers
+        2 and 3 come from multi-word prompts, whose answers are cached under
+        their own keys and only reused by later batches; with
+        `shared_prompts=False` every layer is warmed under the keys a later
+        `/api/analyze` reads. A layer that fails is reported in the word's
+        `errors` instead of failing the batch. Closing the generator cancels
+        the remaining work.
+
+        `budget` (seconds) bounds the whole batch, or with `budget_per_word`
+        each word from the moment its turn comes, so one slow word cannot
+        time out the words queued behind it.
+        """
+        if shared_prompts is None:
+            shared_prompts = settings.analyze_batch_shared_prompts
+        requested = {layer for layer in (layers or BATCH_LAYERS) if layer in BATCH_LAYERS}
+        requested = requested or set(BATCH_LAYERS)
+        unique = self._unique_words(words)
+        semaphore = asyncio.Semaphore(max(1, settings.analyze_batch_concurrency))
+
+        task_context = contextvars.copy_context()
+        if not budget_per_word:
+            task_context.run(deadline.set_deadline, budget)
+        task_context.run(_priority_floor.set, priority)
+
+        def _spawn(coro: Any, budgeted: bool = False) -> asyncio.Task[Any]:
+            context = task_context.copy()
+            if budgeted:
+                context.run(deadline.set_deadline, budget)
+            return asyncio.create_task(coro, context=context)
+
+        # Layers 2 and 3 of all words are requested up front with multi-word
+        # prompts; each word then falls back to its own call if needed.
+        shared: dict[str, asyncio.Task[Any]] = {}
+        if shared_prompts and len(unique) > 1:
+            if 2 in requested:
+                shared["layer2"] = _spawn(
+                    self._layer2_batch(unique, context), budgeted=budget_per_word
+                )
+            if 3 in requested:
+                shared["layer3"] = _spawn(
+                    self._layer3_batch(unique, context, english_level, 2),
+                    budgeted=budget_per_word,
+                )
+
+        async def _from_shared(layer: str, word: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+            task = shared.get(layer)
+            if task is not None:
+                # Shielded: one word hitting its deadline must not cancel the
+                # batched call the other words are waiting for.
+                batched = await asyncio.shield(task)
+                if word in batched:
+                    return batched[word]
+            return await fetch()
+
+        async def _analyze(word: str) -> AnalyzeBatchItem:
+            async with semaphore:
+                if budget_per_word:
+                    deadline.set_deadline(budget)
+                calls: dict[str, Any] = {}
+                if 1 in requested:
+                    calls["layer1"] = self.generate_layer1(word, context, english_level)
+                if 2 in requested:
+                    calls["layer2"] = _from_shared(
+                        "layer2", word, lambda: self.generate_layer2(word, context)
+                    )
+                if 3 in requested:
+                    calls["layer3"] = _from_shared(
+                        "layer3",
+                        word,
+                        lambda: self.generate_layer3(word, context, english_level),
+                    )
+                results = await asyncio.gather(
+                    *(
+                        deadline.run_bounded(f"{layer.title()} for '{word}'", call)
+                        for layer, call in calls.items()
+                    ),
+                    return_exceptions=True,
+                )
+
+            item = AnalyzeBatchItem(word=word)
+            for layer, result in zip(calls, results):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                if isinstance(result, Exception):
+                    logger.warning("Batch %s failed for '%s': %s", layer, word, result)
+                    item.errors[layer] = self._error_data(result)
+                else:
+                    setattr(item, layer, result)
+            return item
+
+        tasks = [_spawn(_analyze(word)) for word in unique]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in [*tasks, *shared.values()]:
+                task.cancel()
+
+    @staticmethod
+    def _error_data(error: Exception) -> dict[str, Any]:
+        data: dict[str, Any] = {"error": str(error)}
+        if isinstance(error, DeadlineExceededError):
+            data["reason"] = "timeout"
+        return data
+
     async def analyze_streaming(
         self,
-        request: AnalyzeRequest
+        request: AnalyzeRequest,
+        budget: Optional[float] = None,
     ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        Stream all requested layers as SSE-style event dicts.
+
+        `budget` is the request's end-to-end deadline in seconds. Every task
+        started here inherits it, so upstream calls derive their timeouts
+        from what is left, and a layer that misses it emits `<layer>_error`
+        with `reason: "timeout"` instead of holding the stream open.
+        """
         word = request.word
         context = request.context
         learning_history = request.learning_history or []
@@ -491,76 +1343,102 @@ class LLMOrchestrator:
             # Fallback to the default when the client sends an empty/invalid list.
             requested_layers = {2, 3, 4}
 
-        try:
-            full_layer1_content = ""
-            async for chunk in self.generate_layer1_stream(word, context, english_level):
-                full_layer1_content += chunk
-                yield {
-                    "event": "layer1_chunk",
-                    "data": {"content": chunk}
-                }
-
-            yield {
-                "event": "layer1_complete",
-                "data": {"content": full_layer1_content}
-            }
+        # None of layers 2–4 depend on the Layer 1 text, so by default they are
+        # started together with the Layer 1 stream. The ordering policy only
+        # controls when their events are released onto the SSE stream:
+        # - "buffer": hold them until `layer1_complete` has been sent;
+        # - "interleave": release them as soon as the first Layer 1 chunk is out.
+        parallel = settings.analyze_parallel_layers
+        interleave = parallel and settings.analyze_event_ordering == "interleave"
+
+        # Item events (`layer4_item`, ...) pushed by layer tasks while they
+        # are still running; released under the same ordering policy as the
+        # aggregated layer events, and always ahead of them.
+        item_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        item_future: asyncio.Task[dict[str, Any]] | None = None
+
+        def _push_item(event: str, data: dict[str, Any]) -> None:
+            item_queue.put_nowait({"event": event, "data": data})
+
+        # Every child task runs in its own copy of a context carrying the
+        # request deadline and the item sink (contextvars are copied into
+        # tasks at creation).
+        task_context = contextvars.copy_context()
+        task_context.run(deadline.set_deadline, budget)
+        if settings.analyze_stream_items:
+            task_context.run(_item_sink.set, _push_item)
+
+        def _spawn(coro: Any) -> asyncio.Task[Any]:
+            return asyncio.create_task(coro, context=task_context.copy())
+
+        pending: dict[str, asyncio.Task[Any]] = {}
+        # Names of finished layer tasks in the order they finished; several
+        # tasks can be done by the time the merge loop wakes up (or while
+        # their events are buffered behind Layer 1).
+        finished_order: list[str] = []
+
+        # Optional streaming task for the 解读 (personalized coaching) text.
+        personalized_queue: asyncio.Queue[dict[str, Any] | None] | None = None
+        personalized_future: asyncio.Task[dict[str, Any] | None] | None = None
+        personalized_done = True
+        background_tasks: list[asyncio.Task[Any]] = []
+
+        def _start_layer_tasks() -> None:
+            nonlocal personalized_queue, personalized_done
 
-            logger.info(f"Layer 1 completed for '{word}'")
-
-            tasks: dict[str, asyncio.Task[Any]] = {}
             if 2 in requested_layers:
-                tasks["layer2"] = asyncio.create_task(
-                    self.generate_layer2(word, context)
+                pending["layer2"] = _spawn(
+                    deadline.run_bounded("Layer 2", self.generate_layer2(word, context))
                 )
             if 3 in requested_layers:
-                tasks["layer3"] = asyncio.create_task(
-                    self.generate_layer3(
-                        word,
-                        context,
-                        english_level,
+                pending["layer3"] = _spawn(
+                    deadline.run_bounded(
+                        "Layer 3",
+                        self.generate_layer3(
+                            word,
+                            context,
+                            english_level,
+                        ),
                     )
                 )
             if 4 in requested_layers:
-                tasks["layer4"] = asyncio.create_task(
-                    self.generate_layer4(
-                        word,
-                        context,
-                        learning_history,
-                        english_level,
-                        interests,
-                        blocked_titles,
-                        favorite_words,
+                pending["layer4"] = _spawn(
+                    deadline.run_bounded(
+                        "Layer 4",
+                        self.generate_layer4(
+                            word,
+                            context,
+                            learning_history,
+                            english_level,
+                            interests,
+                            blocked_titles,
+                            favorite_words,
+                        ),
                     )
                 )
 
-            pending: dict[str, asyncio.Task[Any]] = dict(tasks)
-
-            # Optional streaming task for the 解读 (personalized coaching) text.
-            personalized_queue: asyncio.Queue[dict[str, Any] | None] | None = None
-            personalized_future: asyncio.Task[dict[str, Any] | None] | None = None
-            personalized_done = True
-
-            if 4 in requested_layers:
-                personalized_queue = asyncio.Queue()
+                queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+                personalized_queue = queue
                 personalized_done = False
 
                 async def _stream_personalized() -> None:
                     try:
-                        async for chunk in self.generate_layer4_personalized_stream(
-                            word=word,
-                            context=context,
-                            learning_history=learning_history,
-                            english_level=english_level,
-                            interests=interests,
-                            blocked_titles=blocked_titles,
-                            favorite_words=favorite_words,
-                        ):
-                            await personalized_queue.put(
-                                {
-                                    "event": "layer4_personalized_chunk",
-                                    "data": {"content": chunk},
-                                }
-                            )
+                        async with deadline.bounded("Layer 4 coaching"):
+                            async for chunk in self.generate_layer4_personalized_stream(
+                                word=word,
+                                context=context,
+                                learning_history=learning_history,
+                                english_level=english_level,
+                                interests=interests,
+                                blocked_titles=blocked_titles,
+                                favorite_words=favorite_words,
+                            ):
+                                await queue.put(
+                                    {
+                                        "event": "layer4_personalized_chunk",
+                                        "data": {"content": chunk},
+                                    }
+                                )
                     except Exception as exc:  # noqa: BLE001
                         logger.error(
                             "Error streaming personalized coaching for '%s': %s",
@@ -571,23 +1449,65 @@ class LLMOrchestrator:
                         # Sentinel to signal completion; the outer loop will
                         # stop waiting on further personalized chunks once it
                         # receives this marker.
-                        await personalized_queue.put(None)
+                        await queue.put(None)
 
                 # Fire-and-forget streaming task; events are funneled through
                 # the queue so they can be merged with layer completion events.
-                asyncio.create_task(_stream_personalized())
+                background_tasks.append(_spawn(_stream_personalized()))
+
+            for event_name, task in pending.items():
+                task.add_done_callback(lambda _task, name=event_name: finished_order.append(name))
+
+        # Layer 1 is pumped through a queue as well so that its chunks can be
+        # merged with layer completion events in a single wait loop. Errors are
+        # forwarded as exception objects and re-raised by the consumer.
+        layer1_queue: asyncio.Queue[str | BaseException | None] = asyncio.Queue()
+
+        async def _stream_layer1() -> None:
+            try:
+                async with deadline.bounded("Layer 1"):
+                    async for chunk in self.generate_layer1_stream(word, context, english_level):
+                        await layer1_queue.put(chunk)
+            except Exception as exc:  # noqa: BLE001
+                await layer1_queue.put(exc)
+            finally:
+                await layer1_queue.put(None)
+
+        layer1_parts: list[str] = []
+        layer1_future: asyncio.Task[str | BaseException | None] | None = None
+        layer1_done = False
+
+        try:
+            if parallel:
+                _start_layer_tasks()
+
+            background_tasks.append(_spawn(_stream_layer1()))
 
-            while pending or not personalized_done:
+            while not layer1_done or pending or not personalized_done:
                 wait_tasks: set[asyncio.Task[Any]] = set()
-                if pending:
-                    wait_tasks.update(pending.values())
 
-                if not personalized_done and personalized_queue is not None:
-                    if personalized_future is None:
-                        personalized_future = asyncio.create_task(
-                            personalized_queue.get()
-                        )
-                    wait_tasks.add(personalized_future)
+                if not layer1_done:
+                    if layer1_future is None:
+                        layer1_future = asyncio.create_task(layer1_queue.get())
+                    wait_tasks.add(layer1_future)
+
+                # Layer 1 chunks always lead the stream; other layers only
+                # become visible once the ordering policy allows it.
+                others_visible = layer1_done or (interleave and bool(layer1_parts))
+
+                if others_visible:
+                    if pending:
+                        wait_tasks.update(pending.values())
+                        if item_future is None:
+                            item_future = asyncio.create_task(item_queue.get())
+                        wait_tasks.add(item_future)
+
+                    if not personalized_done and personalized_queue is not None:
+                        if personalized_future is None:
+                            personalized_future = asyncio.create_task(
+                                personalized_queue.get()
+                            )
+                        wait_tasks.add(personalized_future)
 
                 if not wait_tasks:
                     # Nothing left to wait on; break to avoid a dead-loop.
@@ -598,6 +1518,31 @@ class LLMOrchestrator:
                     return_when=asyncio.FIRST_COMPLETED,
                 )
 
+                if layer1_future is not None and layer1_future in done:
+                    layer1_item = layer1_future.result()
+                    layer1_future = None
+
+                    if isinstance(layer1_item, BaseException):
+                        raise layer1_item
+
+                    if layer1_item is None:
+                        layer1_done = True
+                        yield {
+                            "event": "layer1_complete",
+                            "data": {"content": "".join(layer1_parts)}
+                        }
+
+                        logger.info(f"Layer 1 completed for '{word}'")
+
+                        if not parallel:
+                            _start_layer_tasks()
+                    else:
+                        layer1_parts.append(layer1_item)
+                        yield {
+                            "event": "layer1_chunk",
+                            "data": {"content": layer1_item}
+                        }
+
                 # Handle personalized streaming chunks first, if any.
                 if (
                     not personalized_done
@@ -623,13 +1568,23 @@ class LLMOrchestrator:
                     else:
                         yield personalized_event
 
-                # Handle layer completion events.
-                for event_name, task in list(pending.items()):
-                    if task not in done:
+                if item_future is not None and item_future.done():
+                    yield item_future.result()
+                    item_future = None
+
+                # Handle layer completion events in the order they finished.
+                for event_name in list(finished_order):
+                    task = pending.get(event_name)
+                    if task is None or task not in done:
                         continue
 
                     pending.pop(event_name, None)
 
+                    # A finished layer has pushed all of its items; send the
+                    # ones not yet released before its aggregated event.
+                    while not item_queue.empty():
+                        yield item_queue.get_nowait()
+
                     try:
                         result = await task
                         yield {
@@ -641,7 +1596,7 @@ class LLMOrchestrator:
                         logger.error("Error in %s: %s", event_name, e)
                         yield {
                             "event": f"{event_name}_error",
-                            "data": {"error": str(e)},
+                            "data": self._error_data(e),
                         }
 
             yield {
@@ -653,8 +1608,31 @@ class LLMOrchestrator:
             logger.error(f"Error in analyze_streaming: {e}")
             yield {
                 "event": "error",
-                "data": {"error": str(e)}
+                "data": self._error_data(e),
             }
+        finally:
+            # Runs on completion, on error, and when the SSE client goes away
+            # (the response task is cancelled or this generator is closed).
+            # Nothing started here may outlive the stream: cancelling the
+            # tasks also aborts their in-flight upstream requests. This block
+            # must not await, so it completes even inside a cancelled scope.
+            leftovers = [
+                task
+                for task in [
+                    *pending.values(),
+                    *background_tasks,
+                    layer1_future,
+                    personalized_future,
+                    item_future,
+                ]
+                if task is not None and not task.done()
+            ]
+            for task in leftovers:
+                task.cancel()
+            if leftovers:
+                logger.info(
+                    "Cancelled %d unfinished task(s) for '%s'", len(leftovers), word
+                )
 
 
 llm_orchestrator = LLMOrchestrator()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Any
+
+from app.config import settings
+
+
+class ModelHealth:
+    """
+    Rolling per-model latency / error statistics used to order fallback chains.
+
+    Samples older than `window_seconds` are forgotten, so a model that was
+    demoted during a provider incident is promoted again once the window has
+    passed without new failures.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        max_samples: int = 200,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        max_p95_latency: float = 20.0,
+    ):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_p95_latency = max_p95_latency
+        # model -> deque of (timestamp, latency_seconds, ok)
+        self._samples: dict[str, deque[tuple[float, float, bool]]] = {}
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        samples = self._samples.setdefault(model, deque(maxlen=self.max_samples))
+        samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self, model: str) -> list[tuple[float, float, bool]]:
+        samples = self._samples.get(model)
+        if not samples:
+            return []
+        cutoff = time.monotonic() - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return list(samples)
+
+    def stats(self, model: str) -> dict[str, Any]:
+        recent = self._recent(model)
+        if not recent:
+            return {"samples": 0, "error_rate": 0.0, "p95_latency": 0.0}
+
+        errors = sum(1 for _, _, ok in recent if not ok)
+        latencies = sorted(latency for _, latency, ok in recent if ok)
+        p95 = 0.0
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+
+        return {
+            "samples": len(recent),
+            "error_rate": errors / len(recent),
+            "p95_latency": p95,
+        }
+
+    def score(self, model: str) -> float:
+        """Lower is better: p95 latency inflated by the error rate."""
+        stats = self.stats(model)
+        return stats["p95_latency"] * (1.0 + 4.0 * stats["error_rate"])
+
+    def is_degraded(self, model: str) -> bool:
+        stats = self.stats(model)
+        if stats["samples"] < self.min_samples:
+            return False
+        return (
+            stats["error_rate"] > self.max_error_rate
+            or stats["p95_latency"] > self.max_p95_latency
+        )
+
+    def order(self, models: list[str]) -> list[str]:
+        """
+        Order a configured fallback chain for the next attempt.
+
+        Healthy models keep their configured preference; degraded ones are
+        moved to the back, best score first.
+        """
+        healthy = [model for model in models if not self.is_degraded(model)]
+        degraded = sorted(
+            (model for model in models if self.is_degraded(model)),
+            key=self.score,
+        )
+        return healthy + degraded
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {
+            model: {**self.stats(model), "degraded": self.is_degraded(model)}
+            for model in list(self._samples)
+        }
+
+
+model_health = ModelHealth(
+    window_seconds=settings.model_health_window_seconds,
+    min_samples=settings.model_health_min_samples,
+    max_error_rate=settings.model_health_max_error_rate,
+    max_p95_latency=settings.model_health_max_p95_latency,
+)
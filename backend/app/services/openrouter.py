@@ -1,18 +1,29 @@
+import asyncio
 import json
 import logging
+import math
 import re
 from collections.abc import AsyncGenerator
+from contextlib import AbstractAsyncContextManager, AbstractContextManager, nullcontext
 from typing import Any, Optional
 
 import httpx
 
 from app.config import settings
+from app.utils import deadline
+from app.utils.admission import AdmissionController, Priority
+from app.utils.circuit_breaker import CircuitBreakerRegistry
 from app.utils.error_handling import (
     APIConnectionError,
+    DeadlineExceededError,
     OpenRouterError,
     RateLimitError,
     async_retry,
+    retry_with_exponential_backoff,
 )
+from app.utils.rate_limiter import RateLimiter, build_bucket_store, parse_retry_hint
+from app.utils.single_flight import SingleFlight, payload_key
+from app.utils.sse_parser import SSEDeltaParser
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +72,96 @@ def _extract_json_from_text(text: str) -> str:
     return candidate.strip()
 
 
+def parse_json_response(response: str) -> Any:
+    """Parse the JSON document in an LLM response (see `_extract_json_from_text`)."""
+    try:
+        json_text = _extract_json_from_text(response)
+        return json.loads(json_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response: {response}")
+        raise OpenRouterError(f"Invalid JSON response: {str(e)}", detail=response)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# One breaker per (base_url, model); shared by every client instance so the
+# state reflects the whole process and can be reported on /health.
+circuit_breakers = CircuitBreakerRegistry(
+    failure_ratio=settings.circuit_breaker_failure_ratio,
+    min_requests=settings.circuit_breaker_min_requests,
+    window_seconds=settings.circuit_breaker_window_seconds,
+    open_seconds=settings.circuit_breaker_open_seconds,
+)
+
+# Process-wide cap on in-flight upstream calls with priority queueing, so a
+# traffic spike cannot starve the Layer 1 stream behind background work.
+admission = AdmissionController(
+    max_in_flight=settings.llm_max_in_flight,
+    max_in_flight_per_model=settings.llm_max_in_flight_per_model,
+    max_queue=settings.llm_admission_max_queue,
+    max_wait={
+        Priority[name.upper()]: seconds
+        for name, seconds in settings.llm_admission_max_wait_seconds.items()
+    },
+)
+
+# Shared token bucket per model; every call is paced through it and 429s /
+# x-ratelimit headers pause it for all callers at once.
+rate_limiter = RateLimiter(
+    store=build_bucket_store(settings.rate_limit_backend, settings.rate_limit_state_path),
+    requests_per_minute=settings.rate_limit_requests_per_minute,
+    burst=settings.rate_limit_burst,
+    max_wait=settings.rate_limit_max_wait_seconds,
+)
+
+
+class CancelledSpend:
+    """
+    Estimated token spend of upstream calls cancelled mid-flight, e.g. when
+    the SSE client disconnects. Token counts use a rough 4-chars-per-token
+    estimate: prompt tokens are billed once the request is sent, completion
+    tokens as far as the stream got, and `avoided_completion_tokens` is the
+    unused `max_tokens` budget saved by cancelling.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.avoided_completion_tokens = 0
+
+    @staticmethod
+    def _estimate_tokens(chars: int) -> int:
+        return (chars + 3) // 4
+
+    def record(self, payload: dict[str, Any], completion_chars: int = 0) -> None:
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        completion_tokens = self._estimate_tokens(completion_chars)
+        self.requests += 1
+        self.prompt_tokens += self._estimate_tokens(prompt_chars)
+        self.completion_tokens += completion_tokens
+        self.avoided_completion_tokens += max(
+            0, int(payload.get("max_tokens") or 0) - completion_tokens
+        )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avoided_completion_tokens": self.avoided_completion_tokens,
+        }
+
+
+cancelled_spend = CancelledSpend()
+
+
 class OpenRouterClient:
     def __init__(
         self,
@@ -75,9 +176,115 @@ class OpenRouterClient:
         # Use a dedicated image model when provided; otherwise fall back to the main model.
         self.image_model_id = settings.openrouter_image_model_id or self.model_id
 
+        # A single pooled HTTP client is shared by every call on this instance so
+        # that layer requests reuse warm TCP/TLS connections (and multiplex over
+        # HTTP/2 when available) instead of handshaking per call.
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._inflight = SingleFlight()
+
         if not self.api_key:
             raise ValueError("OpenRouter API key is required")
 
+    def _build_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+
+        http2 = settings.http2_enabled
+        if http2 and not _http2_available():
+            logger.warning(
+                "HTTP/2 requested for OpenRouter but the 'h2' package is not installed; "
+                "falling back to HTTP/1.1 keep-alive."
+            )
+            http2 = False
+
+        return httpx.AsyncClient(timeout=self.timeout, limits=limits, http2=http2)
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """
+        Return the shared pooled HTTP client, creating it lazily.
+
+        The client is normally opened at application startup, but creating it
+        on first use keeps scripts and tests that never run the FastAPI
+        lifespan working.
+        """
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+        return self._http_client
+
+    async def startup(self) -> None:
+        """Open the shared HTTP client ahead of the first request."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and release pooled connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    @staticmethod
+    def _flight_key(payload: dict[str, Any], priority: Priority) -> str:
+        # A shared flight is admitted at its first caller's priority, so only
+        # callers of the same priority share one: an interactive request must
+        # not ride on a background call that may be shed.
+        return f"{priority.name}:{payload_key(payload)}"
+
+    def _guard(self, model: str) -> AbstractContextManager[None]:
+        """Circuit breaker guard for one upstream call to `model`."""
+        if not settings.circuit_breaker_enabled:
+            return nullcontext()
+        return circuit_breakers.get(self.base_url, model).call()
+
+    def _admit(self, model: str, priority: Priority) -> AbstractAsyncContextManager[None]:
+        """Admission slot for one upstream call to `model`."""
+        if not settings.llm_admission_enabled:
+            return nullcontext()
+        return admission.slot(model, priority)
+
+    async def _pace(self, model: str) -> None:
+        """Wait for the shared rate limit of `model` before calling upstream."""
+        if settings.rate_limit_enabled:
+            await rate_limiter.acquire(model)
+
+    async def _observe_rate_limits(self, model: str, response: httpx.Response) -> None:
+        if settings.rate_limit_enabled:
+            await rate_limiter.observe(model, response.headers)
+
+    async def _rate_limit_error(
+        self,
+        model: str,
+        response: httpx.Response,
+        message: str,
+    ) -> RateLimitError:
+        """
+        Build the error for a 429. When upstream says how long to hold off,
+        `model` is paused for every caller; a bare 429 only delays this
+        caller's retry by the short default.
+        """
+        retry_after = parse_retry_hint(response.headers)
+        if retry_after is None:
+            retry_after = min(
+                settings.rate_limit_default_retry_after,
+                settings.rate_limit_max_wait_seconds,
+            )
+        elif settings.rate_limit_enabled:
+            await rate_limiter.block(model, retry_after)
+        return RateLimitError(message, retry_after=max(1, math.ceil(retry_after)))
+
+    def _attempt_timeout(self) -> float:
+        """Per-attempt timeout, shortened to the request's remaining budget."""
+        return deadline.attempt_timeout(self.timeout)
+
+    @staticmethod
+    def _timeout_error() -> OpenRouterError:
+        if deadline.expired():
+            return DeadlineExceededError()
+        return APIConnectionError("Request timeout")
+
     def _get_headers(self) -> dict[str, str]:
         return {
             "Authorization": f"Bearer {self.api_key}",
@@ -86,7 +293,7 @@ class OpenRouterClient:
             "X-Title": "LexiLens"
         }
 
-    async def _handle_error_response(self, response: httpx.Response) -> None:
+    async def _handle_error_response(self, response: httpx.Response, model: str) -> None:
         try:
             error_data = response.json()
             error_message = error_data.get("error", {}).get("message", "Unknown error")
@@ -94,8 +301,7 @@ class OpenRouterClient:
             error_message = response.text or "Unknown error"
 
         if response.status_code == 429:
-            retry_after = int(response.headers.get("Retry-After", 60))
-            raise RateLimitError(error_message, retry_after=retry_after)
+            raise await self._rate_limit_error(model, response, error_message)
         elif response.status_code >= 500:
             raise APIConnectionError(f"Server error: {error_message}")
         else:
@@ -105,7 +311,7 @@ class OpenRouterClient:
                 detail=error_data if 'error_data' in locals() else None
             )
 
-    @async_retry(max_retries=3, initial_delay=1.0)
+    @async_retry(max_retries=3, initial_delay=1.0, time_left=deadline.remaining)
     async def generate_image(
         self,
         prompt: str,
@@ -132,60 +338,79 @@ class OpenRouterClient:
             "stream": False,
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        await self._pace(payload["model"])
+        async with self._admit(payload["model"], Priority.IMAGE):
+            with self._guard(payload["model"]):
+                return await self._generate_image_payload(payload)
+
+    async def _generate_image_payload(self, payload: dict[str, Any]) -> str:
+        client = self.http_client
+        try:
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._get_headers(),
+                json=payload,
+                timeout=self._attempt_timeout(),
+            )
+
+            if response.status_code != 200:
+                await self._handle_error_response(response, payload["model"])
+            await self._observe_rate_limits(payload["model"], response)
+
+            data = response.json()
+
             try:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self._get_headers(),
-                    json=payload,
+                choices = data.get("choices") or []
+                if not choices:
+                    raise KeyError("No choices in response")
+
+                message = choices[0].get("message") or {}
+                images = message.get("images") or []
+                if not images:
+                    raise KeyError("No images in response")
+
+                first_image = images[0]
+                image_url_obj = first_image.get("image_url") or {}
+                image_url = image_url_obj.get("url")
+
+                if not image_url:
+                    raise KeyError("Missing image_url.url in response")
+
+                return image_url
+            except Exception as e:  # noqa: BLE001
+                # Log a concise summary of the unexpected response shape to aid debugging
+                logger.error(
+                    "Failed to parse image response from OpenRouter: %s | top-level keys=%s",
+                    e,
+                    list(data.keys()) if isinstance(data, dict) else type(data),
                 )
+                raise OpenRouterError("No image received from OpenRouter")
 
-                if response.status_code != 200:
-                    await self._handle_error_response(response)
-
-                data = response.json()
+        except httpx.TimeoutException:
+            raise self._timeout_error()
+        except httpx.RequestError as e:
+            raise APIConnectionError(f"Connection error: {str(e)}")
 
-                try:
-                    choices = data.get("choices") or []
-                    if not choices:
-                        raise KeyError("No choices in response")
-
-                    message = choices[0].get("message") or {}
-                    images = message.get("images") or []
-                    if not images:
-                        raise KeyError("No images in response")
-
-                    first_image = images[0]
-                    image_url_obj = first_image.get("image_url") or {}
-                    image_url = image_url_obj.get("url")
-
-                    if not image_url:
-                        raise KeyError("Missing image_url.url in response")
-
-                    return image_url
-                except Exception as e:  # noqa: BLE001
-                    # Log a concise summary of the unexpected response shape to aid debugging
-                    logger.error(
-                        "Failed to parse image response from OpenRouter: %s | top-level keys=%s",
-                        e,
-                        list(data.keys()) if isinstance(data, dict) else type(data),
-                    )
-                    raise OpenRouterError("No image received from OpenRouter")
-
-            except httpx.TimeoutException:
-                raise APIConnectionError("Request timeout")
-            except httpx.RequestError as e:
-                raise APIConnectionError(f"Connection error: {str(e)}")
-
-    @async_retry(max_retries=3, initial_delay=1.0)
     async def complete(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        max_retries: Optional[int] = None,
+        dedupe: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
         **kwargs: Any
     ) -> str:
+        """
+        Run a non-streaming chat completion and return the message content.
+
+        `max_retries` overrides the configured retry budget for this call;
+        fallback chains pass 1 so a failure moves on to the next model
+        instead of sleeping and retrying the same one. `dedupe=False` skips
+        single-flight sharing, which hedged duplicates need to reach upstream.
+        `priority` decides the call's place in the admission queue.
+        """
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
@@ -199,25 +424,69 @@ class OpenRouterClient:
             **kwargs
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async def _call() -> str:
+            return await retry_with_exponential_backoff(
+                self._complete_payload,
+                payload,
+                priority,
+                max_retries=max_retries or settings.max_retries,
+                initial_delay=settings.retry_delay,
+                min_attempt_seconds=settings.retry_min_attempt_seconds,
+                time_left=deadline.remaining,
+            )
+
+        # The whole call, including queueing, pacing and retries, is bounded
+        # by the request deadline (if any).
+        if not dedupe or not settings.llm_single_flight_enabled:
+            return await deadline.run_bounded("Completion", _call())
+
+        async def _shared_call() -> str:
+            # The flight may be joined by requests with other budgets, so it
+            # runs unbounded; every caller bounds its own wait below.
+            deadline.clear_deadline()
+            return await _call()
+
+        # Concurrent identical requests (same model, messages, sampling
+        # params and priority) share one upstream call.
+        return await deadline.run_bounded(
+            "Completion", self._inflight.do(self._flight_key(payload, priority), _shared_call)
+        )
+
+    async def _complete_payload(self, payload: dict[str, Any], priority: Priority) -> str:
+        await self._pace(payload["model"])
+        # Queue for a slot before taking the breaker's verdict, so a local
+        # shed is never counted as an upstream outcome and a queued call
+        # does not hold the half-open probe.
+        async with self._admit(payload["model"], priority):
+            with self._guard(payload["model"]):
+                return await self._post_completion(payload)
+
+    async def _post_completion(self, payload: dict[str, Any]) -> str:
+        client = self.http_client
+        try:
             try:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=self._get_headers(),
-                    json=payload
+                    json=payload,
+                    timeout=self._attempt_timeout(),
                 )
+            except asyncio.CancelledError:
+                cancelled_spend.record(payload)
+                raise
 
-                if response.status_code != 200:
-                    await self._handle_error_response(response)
+            if response.status_code != 200:
+                await self._handle_error_response(response, payload["model"])
+            await self._observe_rate_limits(payload["model"], response)
 
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
-                return content
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            return content
 
-            except httpx.TimeoutException:
-                raise APIConnectionError("Request timeout")
-            except httpx.RequestError as e:
-                raise APIConnectionError(f"Connection error: {str(e)}")
+        except httpx.TimeoutException:
+            raise self._timeout_error()
+        except httpx.RequestError as e:
+            raise APIConnectionError(f"Connection error: {str(e)}")
 
     async def stream(
         self,
@@ -225,6 +494,7 @@ class OpenRouterClient:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        priority: Priority = Priority.INTERACTIVE,
         **kwargs: Any
     ) -> AsyncGenerator[str, None]:
         messages = []
@@ -241,68 +511,101 @@ class OpenRouterClient:
             **kwargs
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/chat/completions",
-                    headers=self._get_headers(),
-                    json=payload
-                ) as response:
-                    if response.status_code != 200:
-                        error_text = await response.aread()
-                        try:
-                            error_data = json.loads(error_text)
-                            error_message = error_data.get("error", {}).get(
-                                "message", "Unknown error"
-                            )
-                        except Exception:
-                            if isinstance(error_text, bytes):
-                                error_message = error_text.decode()
-                            else:
-                                error_message = str(error_text)
-
-                        if response.status_code == 429:
-                            retry_after = int(response.headers.get("Retry-After", 60))
-                            raise RateLimitError(error_message, retry_after=retry_after)
-                        elif response.status_code >= 500:
-                            raise APIConnectionError(f"Server error: {error_message}")
-                        else:
-                            raise OpenRouterError(
-                                error_message, status_code=response.status_code
-                            )
-
-                    full_content = ""
-                    async for line in response.aiter_lines():
-                        if not line.strip():
-                            continue
-
-                        if line.startswith("data: "):
-                            data_str = line[6:]
-
-                            if data_str == "[DONE]":
-                                break
-
-                            try:
-                                data = json.loads(data_str)
-                                delta = data["choices"][0].get("delta", {})
-                                content = delta.get("content", "")
-
-                                if content:
-                                    full_content += content
-                                    yield content
+        if not settings.llm_single_flight_enabled:
+            async for chunk in self._stream_payload(payload, priority):
+                yield chunk
+            return
 
-                            except json.JSONDecodeError:
-                                logger.warning(f"Failed to parse streaming data: {data_str}")
-                                continue
+        # One upstream stream fans out to every concurrent identical request;
+        # late joiners get the chunks produced so far replayed first.
+        async for chunk in self._inflight.stream(
+            self._flight_key(payload, priority),
+            lambda: self._shared_stream_payload(payload, priority),
+        ):
+            yield chunk
 
-                    if not full_content:
-                        raise OpenRouterError("No content received from stream")
-
-            except httpx.TimeoutException:
-                raise APIConnectionError("Request timeout")
-            except httpx.RequestError as e:
-                raise APIConnectionError(f"Connection error: {str(e)}")
+    async def _shared_stream_payload(
+        self,
+        payload: dict[str, Any],
+        priority: Priority,
+    ) -> AsyncGenerator[str, None]:
+        # Runs in the broadcast's own task, which any number of requests may
+        # subscribe to; each subscriber's consumer is bounded by its own
+        # deadline, so the shared stream is not bound by its first caller's.
+        deadline.clear_deadline()
+        async for chunk in self._stream_payload(payload, priority):
+            yield chunk
+
+    async def _stream_payload(
+        self,
+        payload: dict[str, Any],
+        priority: Priority,
+    ) -> AsyncGenerator[str, None]:
+        await self._pace(payload["model"])
+        async with self._admit(payload["model"], priority):
+            with self._guard(payload["model"]):
+                async for chunk in self._stream_completion(payload):
+                    yield chunk
+
+    async def _stream_completion(self, payload: dict[str, Any]) -> AsyncGenerator[str, None]:
+        client = self.http_client
+        try:
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=self._get_headers(),
+                json=payload,
+                timeout=self._attempt_timeout(),
+            ) as response:
+                if response.status_code != 200:
+                    error_text = await response.aread()
+                    try:
+                        error_data = json.loads(error_text)
+                        error_message = error_data.get("error", {}).get(
+                            "message", "Unknown error"
+                        )
+                    except Exception:
+                        if isinstance(error_text, bytes):
+                            error_message = error_text.decode()
+                        else:
+                            error_message = str(error_text)
+
+                    if response.status_code == 429:
+                        raise await self._rate_limit_error(
+                            payload["model"], response, error_message
+                        )
+                    elif response.status_code >= 500:
+                        raise APIConnectionError(f"Server error: {error_message}")
+                    else:
+                        raise OpenRouterError(
+                            error_message, status_code=response.status_code
+                        )
+                await self._observe_rate_limits(payload["model"], response)
+
+                parser = SSEDeltaParser()
+                # Only the amount of content matters here; chunks are handed
+                # straight to the caller instead of being accumulated.
+                received_chars = 0
+                try:
+                    async for raw in response.aiter_bytes():
+                        for content in parser.feed(raw):
+                            received_chars += len(content)
+                            yield content
+                        if parser.done:
+                            break
+                except (asyncio.CancelledError, GeneratorExit):
+                    # The consumer went away mid-stream; leaving the `async
+                    # with` closes the upstream connection right away.
+                    cancelled_spend.record(payload, received_chars)
+                    raise
+
+                if not received_chars:
+                    raise OpenRouterError("No content received from stream")
+
+        except httpx.TimeoutException:
+            raise self._timeout_error()
+        except httpx.RequestError as e:
+            raise APIConnectionError(f"Connection error: {str(e)}")
 
     async def complete_json(
         self,
@@ -310,6 +613,9 @@ class OpenRouterClient:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
+        max_retries: Optional[int] = None,
+        dedupe: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
         **kwargs: Any
     ) -> Any:
         response = await self.complete(
@@ -317,15 +623,13 @@ class OpenRouterClient:
             system_prompt=system_prompt,
             temperature=temperature,
             max_tokens=max_tokens,
+            max_retries=max_retries,
+            dedupe=dedupe,
+            priority=priority,
             **kwargs
         )
 
-        try:
-            json_text = _extract_json_from_text(response)
-            return json.loads(json_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {response}")
-            raise OpenRouterError(f"Invalid JSON response: {str(e)}", detail=response)
+        return parse_json_response(response)
 
 
 openrouter_client = OpenRouterClient()
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Optional
+
+from app.config import settings
+from app.services.lexical_graph import lemma_candidates
+from app.services.llm_orchestrator import llm_orchestrator
+from app.services.response_cache import level_band, normalize_word
+from app.utils.admission import Priority
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'-]*[A-Za-z]")
+_SENTENCE_RE = re.compile(r"[^.!?]+[.!?]+")
+
+# Must match MAX_CONTEXT_LENGTH in extension/src/shared/constants.ts.
+MAX_CONTEXT_LENGTH = 500
+
+BUDGET_WINDOW_SECONDS = 60 * 60
+
+
+class FrequencyTable:
+    """
+    Rank of each headword in a frequency list (0 = most frequent).
+
+    Loaded on first use from a text file with one word per line; `#` lines
+    are comments. Inflected forms are ranked by their best base form.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ranks: Optional[dict[str, int]] = None
+
+    def _load(self) -> dict[str, int]:
+        with self._lock:
+            if self._ranks is None:
+                ranks: dict[str, int] = {}
+                try:
+                    with open(self.path, encoding="utf-8") as handle:
+                        for line in handle:
+                            word = normalize_word(line)
+                            if word and not word.startswith("#"):
+                                ranks.setdefault(word, len(ranks))
+                except OSError as exc:
+                    logger.warning("Word frequency list %s unavailable: %s", self.path, exc)
+                self._ranks = ranks
+            return self._ranks
+
+    def rank(self, word: str) -> Optional[int]:
+        ranks = self._load()
+        found = [ranks[form] for form in lemma_candidates(word) if form in ranks]
+        return min(found) if found else None
+
+
+word_frequency = FrequencyTable(settings.word_frequency_path)
+
+
+def sentence_containing(word: str, text: str) -> str:
+    """Python port of `getSentenceContaining` in extension/src/shared/utils.ts."""
+    sentences = _SENTENCE_RE.findall(text) or [text]
+    sentence = next((s for s in sentences if word in s), None)
+    return (sentence or "").strip() or word
+
+
+def extract_context(selected: str, text: str) -> str:
+    """Python port of `extractContext` in extension/src/shared/utils.ts."""
+    index = text.find(selected)
+    if index == -1:
+        return selected
+
+    half = MAX_CONTEXT_LENGTH // 2
+    start = max(0, index - half)
+    end = min(len(text), index + len(selected) + half)
+
+    context = text[start:end].strip()
+    if start > 0:
+        context = "..." + context
+    if end < len(text):
+        context = context + "..."
+    return context
+
+
+def lookup_context(word: str, page_text: str) -> str:
+    """The context the side panel sends when `word` is selected on the page."""
+    return extract_context(sentence_containing(word, page_text), page_text)
+
+
+def pick_difficult_words(
+    text: str,
+    english_level: str | None,
+    learning_history: list[str],
+    limit: int,
+    table: FrequencyTable = word_frequency,
+) -> list[str]:
+    """
+    Likely-difficult words of a page in reading order.
+
+    A word qualifies when its frequency rank is beyond the threshold for the
+    learner's level band (or it is not ranked at all). Short words, words
+    with apostrophes, words only ever seen capitalized (names) and words the
+    learner already looked up are skipped.
+    """
+    threshold = settings.prefetch_rank_thresholds.get(
+        level_band(english_level),
+        settings.prefetch_rank_thresholds.get("none", 0),
+    )
+    known = {form for word in learning_history for form in lemma_candidates(word)}
+
+    first_seen: dict[str, str] = {}
+    lowercase_seen: set[str] = set()
+    for match in _TOKEN_RE.finditer(text):
+        token = match.group()
+        key = token.lower()
+        if len(token) < 4 or "'" in token:
+            continue
+        first_seen.setdefault(key, token)
+        if token[0].islower():
+            lowercase_seen.add(key)
+
+    picked: list[str] = []
+    for key, token in first_seen.items():
+        if key not in lowercase_seen:
+            continue
+        if any(form in known for form in lemma_candidates(key)):
+            continue
+        rank = table.rank(key)
+        if rank is not None and rank < threshold:
+            continue
+        picked.append(token)
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+class PrefetchJob:
+    def __init__(self, user: str, words: list[str]):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.words = words
+        self.task: Optional[asyncio.Task[None]] = None
+
+
+class Prefetcher:
+    """
+    Background cache warming for the words of the page a user is reading.
+
+    Each user has at most one running job (a new page replaces the old
+    one) and a budget of words per hour, which is also charged to the
+    client address when one is given. Jobs call the regular layer methods
+    with single-word prompts at BACKGROUND admission priority, so their
+    results land in the response cache under the same keys a later lookup
+    uses, and they never hold up interactive requests.
+    """
+
+    def __init__(
+        self,
+        words_per_hour: int,
+        words_per_client_per_hour: int = 0,
+        max_tracked_budgets: int = 10_000,
+    ):
+        self.words_per_hour = words_per_hour
+        self.words_per_client_per_hour = words_per_client_per_hour
+        self._jobs: dict[str, PrefetchJob] = {}
+        self._by_user: dict[str, str] = {}
+        # Spend history per "user:<id>" / "client:<address>"; an entry
+        # expires an hour after its latest spend, when it no longer counts.
+        self._spent: TTLCache[str, deque[tuple[float, int]]] = TTLCache(
+            max_entries=max_tracked_budgets,
+            ttl_seconds=BUDGET_WINDOW_SECONDS,
+        )
+
+        self.started = 0
+        self.cancelled = 0
+        self.words_prefetched = 0
+
+    def _remaining(self, key: str, limit: int) -> int:
+        spent = self._spent.get(key)
+        if spent is None:
+            return limit
+        cutoff = time.monotonic() - BUDGET_WINDOW_SECONDS
+        while spent and spent[0][0] < cutoff:
+            spent.popleft()
+        return max(0, limit - sum(count for _, count in spent))
+
+    def _budget_keys(self, user: str, client: str | None) -> list[tuple[str, int]]:
+        keys = [(f"user:{user}", self.words_per_hour)]
+        if client is not None and self.words_per_client_per_hour > 0:
+            keys.append((f"client:{client}", self.words_per_client_per_hour))
+        return keys
+
+    def remaining_budget(self, user: str, client: str | None = None) -> int:
+        return min(self._remaining(key, limit) for key, limit in self._budget_keys(user, client))
+
+    def _charge(self, user: str, client: str | None, count: int) -> None:
+        now = time.monotonic()
+        for key, _ in self._budget_keys(user, client):
+            spent = self._spent.get(key) or deque()
+            spent.append((now, count))
+            self._spent.set(key, spent)
+
+    def start(
+        self,
+        user: str,
+        page_text: str,
+        words: list[str],
+        english_level: str | None,
+        budget: Optional[float] = None,
+        client: str | None = None,
+    ) -> PrefetchJob:
+        """Cancel the user's previous job and start warming `words` within budget."""
+        previous = self._by_user.get(user)
+        if previous is not None:
+            self.cancel(previous)
+
+        words = words[: self.remaining_budget(user, client)]
+        job = PrefetchJob(user, words)
+        if not words:
+            return job
+
+        self._charge(user, client, len(words))
+        self._jobs[job.id] = job
+        self._by_user[user] = job.id
+        self.started += 1
+        job.task = asyncio.create_task(self._run(job, page_text, english_level, budget))
+        job.task.add_done_callback(lambda _task: self._forget(job))
+        return job
+
+    def _forget(self, job: PrefetchJob) -> None:
+        self._jobs.pop(job.id, None)
+        if self._by_user.get(job.user) == job.id:
+            self._by_user.pop(job.user, None)
+
+    async def _run(
+        self,
+        job: PrefetchJob,
+        page_text: str,
+        english_level: str | None,
+        budget: Optional[float],
+    ) -> None:
+        # Words of the same sentence share a lookup context, so they go to
+        # the orchestrator together and can use the multi-word prompts.
+        groups: dict[str, list[str]] = {}
+        for word in job.words:
+            groups.setdefault(lookup_context(word, page_text), []).append(word)
+
+        try:
+            for context, words in groups.items():
+                async for item in llm_orchestrator.analyze_batch(
+                    words,
+                    context,
+                    english_level=english_level,
+                    budget=budget,
+                    # Words wait their turn behind each other; the budget is
+                    # for each word, not the whole page.
+                    budget_per_word=True,
+                    priority=Priority.BACKGROUND,
+                    # Multi-word answers are cached apart from the single-word
+                    # entries interactive lookups read.
+                    shared_prompts=False,
+                ):
+                    self.words_prefetched += 1
+                    if item.errors:
+                        logger.debug("Prefetch of '%s' incomplete: %s", item.word, item.errors)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Prefetch job %s failed: %s", job.id, exc)
+
+    def cancel(self, prefetch_id: str) -> bool:
+        job = self._jobs.get(prefetch_id)
+        if job is None or job.task is None:
+            return False
+        job.task.cancel()
+        self._forget(job)
+        self.cancelled += 1
+        return True
+
+    async def aclose(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": len(self._jobs),
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "words_prefetched": self.words_prefetched,
+            "tracked_budgets": len(self._spent),
+        }
+
+
+prefetcher = Prefetcher(
+    words_per_hour=settings.prefetch_words_per_user_per_hour,
+    words_per_client_per_hour=settings.prefetch_words_per_client_per_hour,
+    max_tracked_budgets=settings.prefetch_max_tracked_budgets,
+)
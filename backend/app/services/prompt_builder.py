@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from typing import List, Optional
 
 from app.prompt_config import PROMPT_CONFIG
@@ -100,6 +101,38 @@ class PromptBuilder:
 
         return system_prompt, user_prompt
 
+    @staticmethod
+    def build_layer2_batch_prompt(words: list[str], context: str) -> tuple[str, str]:
+        layer_cfg = PROMPT_CONFIG["layer2_batch"]
+        system_prompt = layer_cfg["system_prompt"]
+
+        user_prompt = layer_cfg["user_prompt_template"].format(
+            words=json.dumps(words, ensure_ascii=False),
+            context=context,
+        )
+
+        return system_prompt, user_prompt
+
+    @staticmethod
+    def build_layer3_batch_prompt(
+        words: list[str],
+        context: str,
+        english_level: str | None = None,
+    ) -> tuple[str, str]:
+        layer_cfg = PROMPT_CONFIG["layer3_batch"]
+        system_prompt = layer_cfg["system_prompt"]
+
+        # The batched prompt shares the single-word level notes.
+        level_note = PromptBuilder._build_level_note("layer3", english_level)
+
+        user_prompt = layer_cfg["user_prompt_template"].format(
+            words=json.dumps(words, ensure_ascii=False),
+            context=context,
+            level_note=level_note,
+        )
+
+        return system_prompt, user_prompt
+
     @staticmethod
     def build_layer4_prompt(
         word: str,
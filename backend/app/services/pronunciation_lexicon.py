@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+from app.config import settings
+from app.services.response_cache import normalize_word
+
+logger = logging.getLogger(__name__)
+
+# File layout (little endian):
+#   header   MAGIC, version, entry count, string table size
+#   entries  one record per word, sorted by its UTF-8 bytes:
+#            word offset, word length, IPA offset, IPA length
+#   strings  UTF-8 words and IPA transcriptions back to back
+MAGIC = b"LXP1"
+VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_ENTRY = struct.Struct("<IIII")
+
+
+def write_pronunciation_lexicon(path: str, entries: Iterable[tuple[str, str]]) -> int:
+    """
+    Compile `(word, ipa)` pairs into a lexicon file and return its size.
+
+    Words are normalized like pronunciation cache keys; the first
+    transcription of a word wins, so sources should list the preferred
+    variant first.
+    """
+    lexicon: dict[str, str] = {}
+    for word, ipa in entries:
+        word, ipa = normalize_word(word), ipa.strip()
+        if word and ipa and word not in lexicon:
+            lexicon[word] = ipa
+
+    strings = bytearray()
+    records = bytearray()
+    for word in sorted(lexicon, key=lambda w: w.encode("utf-8")):
+        encoded_word = word.encode("utf-8")
+        encoded_ipa = lexicon[word].encode("utf-8")
+        records += _ENTRY.pack(
+            len(strings),
+            len(encoded_word),
+            len(strings) + len(encoded_word),
+            len(encoded_ipa),
+        )
+        strings += encoded_word + encoded_ipa
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, len(lexicon), len(strings)))
+        handle.write(records)
+        handle.write(strings)
+    os.replace(tmp_path, path)
+    return len(lexicon)
+
+
+class PronunciationLexicon:
+    """
+    Bundled IPA lexicon, memory-mapped and binary-searched in place.
+
+    The file is opened on first lookup. A missing or incompatible file
+    leaves the lexicon empty, so every word falls through to the remote
+    dictionary API.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mmap: Optional[mmap.mmap] = None
+        self._count = 0
+        self._strings_at = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path:
+                return
+            try:
+                with open(self.path, "rb") as handle:
+                    mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as exc:
+                logger.warning("Pronunciation lexicon %s unavailable: %s", self.path, exc)
+                return
+
+            header = (b"", 0, 0, 0)
+            if len(mapping) >= _HEADER.size:
+                header = _HEADER.unpack_from(mapping, 0)
+            magic, version, count, strings = header
+            if (
+                magic != MAGIC
+                or version != VERSION
+                or len(mapping) != _HEADER.size + count * _ENTRY.size + strings
+            ):
+                logger.warning("Ignoring incompatible pronunciation lexicon %s", self.path)
+                mapping.close()
+                return
+
+            self._mmap = mapping
+            self._count = count
+            self._strings_at = _HEADER.size + count * _ENTRY.size
+            logger.info("Loaded pronunciation lexicon %s (%d words)", self.path, count)
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings_at + offset
+        return self._mmap[start : start + length]
+
+    def lookup(self, word: str) -> Optional[str]:
+        """Return the IPA transcription of `word`, or None when it is not bundled."""
+        self._load()
+        if self._mmap is None:
+            return None
+
+        target = normalize_word(word).encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            word_at, word_len, ipa_at, ipa_len = _ENTRY.unpack_from(
+                self._mmap, _HEADER.size + mid * _ENTRY.size
+            )
+            current = self._string(word_at, word_len)
+            if current == target:
+                self.hits += 1
+                return self._string(ipa_at, ipa_len).decode("utf-8")
+            if current < target:
+                low = mid + 1
+            else:
+                high = mid
+
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "available": self._mmap is not None,
+            "words": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = None
+            self._loaded = False
+
+
+pronunciation_lexicon = PronunciationLexicon(settings.pronunciation_lexicon_path)
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from app.config import settings
+from app.prompt_config import PROMPT_CONFIG
+from app.services.prompt_builder import PromptBuilder
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_word(word: str) -> str:
+    return (word or "").strip().lower()
+
+
+def normalize_context(context: str) -> str:
+    """Collapse all whitespace runs so re-selections of the same sentence match."""
+    return " ".join((context or "").split())
+
+
+def level_band(english_level: str | None) -> str:
+    """
+    Coarse level band used in cache keys.
+
+    Requests without a level hint get their own band because their prompts
+    omit the level note entirely.
+    """
+    if not english_level:
+        return "none"
+    return PromptBuilder._get_level_band(english_level)
+
+
+def prompt_version(*layer_keys: str) -> str:
+    """
+    Short digest of the prompt config blocks used by a layer.
+
+    Changing any prompt string yields a new version, which automatically
+    invalidates cached results generated from the old prompt.
+    """
+    payload = json.dumps(
+        [PROMPT_CONFIG.get(key, {}) for key in layer_keys],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def make_cache_key(
+    layer: str,
+    word: str,
+    context: str | None = None,
+    band: str | None = None,
+    prompt_keys: tuple[str, ...] = (),
+    **extra: Any,
+) -> str:
+    """
+    Build a normalized cache key for a layer result.
+
+    Level-sensitive layers pass `band=level_band(english_level)` so that
+    "B1" and "B1 (Intermediate)" share one cache entry. Any extra
+    keyword arguments (model ids, item limits, personalization digests) are
+    folded into the key verbatim.
+    """
+    parts: dict[str, Any] = {
+        "layer": layer,
+        "word": normalize_word(word),
+        "prompt": prompt_version(*(prompt_keys or (layer,))),
+    }
+    if context is not None:
+        parts["context"] = normalize_context(context)
+    if band is not None:
+        parts["band"] = band
+    parts.update(extra)
+
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{layer}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+class _SQLiteStore:
+    """
+    Small on-disk key/value store with per-entry expiry.
+
+    All methods are blocking and meant to be called via `asyncio.to_thread`;
+    a lock serializes access to the shared connection.
+    """
+
+    _PRUNE_EVERY_WRITES = 64
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " stored_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_stored_at ON entries (stored_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at <= time.time():
+            return None
+        return value, expires_at
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, stored_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()),
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= self._PRUNE_EVERY_WRITES:
+                self._prune(conn)
+            conn.commit()
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop expired rows, then the oldest rows beyond `max_entries`."""
+        self._writes_since_prune = 0
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY stored_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResponseCache:
+    """
+    Two-tier cache for JSON-serializable layer results.
+
+    Tier 1 is an in-process LRU bounded by entry count; tier 2 is an optional
+    SQLite file shared across restarts (and across workers on one host).
+    Disk hits are promoted into memory with their remaining TTL.
+    """
+
+    def __init__(
+        self,
+        memory_max_entries: int = 2048,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 50_000,
+        enabled_setting: str = "response_cache_enabled",
+    ):
+        self._enabled_setting = enabled_setting
+        self._memory: TTLCache[str, Any] = TTLCache(
+            max_entries=memory_max_entries,
+            ttl_seconds=60 * 60,
+        )
+        self._disk = _SQLiteStore(disk_path, disk_max_entries) if disk_path else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(getattr(settings, self._enabled_setting))
+
+    def stats(self) -> dict[str, Any]:
+        return self._memory.stats()
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        if self._disk is None:
+            return None
+
+        try:
+            row = await asyncio.to_thread(self._disk.get, key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Response cache disk read failed for %s: %s", key, exc)
+            return None
+        if row is None:
+            return None
+
+        raw, expires_at = row
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
+        self._memory.set(key, value, ttl_seconds=expires_at - time.time())
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        if not self.enabled or value is None:
+            return
+
+        expires_at = time.time() + ttl_seconds
+        self._memory.set(key, value, ttl_seconds=ttl_seconds)
+
+        if self._disk is None:
+            return
+
+        try:
+            raw = json.dumps(value, ensure_ascii=False)
+            await asyncio.to_thread(self._disk.set, key, raw, expires_at)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Response cache disk write failed for %s: %s", key, exc)
+
+    async def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.clear)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+
+response_cache = ResponseCache(
+    memory_max_entries=settings.response_cache_memory_max_entries,
+    disk_path=settings.response_cache_disk_path or None,
+    disk_max_entries=settings.response_cache_disk_max_entries,
+)
+
+# Layer 4 Stage A candidates are keyed by headword only and kept much longer
+# than layer results, so they get their own store: a warm-up run must not be
+# evicted by everyday layer traffic, and clearing one leaves the other intact.
+candidate_cache = ResponseCache(
+    memory_max_entries=settings.layer4_candidate_cache_memory_max_entries,
+    disk_path=settings.layer4_candidate_cache_disk_path or None,
+    disk_max_entries=settings.layer4_candidate_cache_disk_max_entries,
+    enabled_setting="layer4_candidate_cache_enabled",
+)
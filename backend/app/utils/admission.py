@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Optional
+
+from app.utils.error_handling import AdmissionRejectedError
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Admission priority for upstream LLM calls; lower values go first."""
+
+    LAYER1 = 0
+    INTERACTIVE = 1
+    LAZY = 2
+    BACKGROUND = 3
+    IMAGE = 4
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "model", "future")
+
+    def __init__(self, priority: Priority, seq: int, model: str, future: "asyncio.Future[None]"):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.future = future
+
+    @property
+    def sort_key(self) -> tuple[int, int]:
+        return (int(self.priority), self.seq)
+
+
+class AdmissionController:
+    """
+    Caps in-flight upstream calls globally and per model, admitting queued
+    calls by priority.
+
+    When capacity is available a call starts immediately. Otherwise it
+    queues; released slots go to the highest-priority waiter whose model
+    still has headroom.
+    Lower-priority work is shed first: when the queue is full the worst
+    waiter is rejected to make room for a more important arrival, and every
+    waiter gives up after its priority's maximum wait.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_in_flight_per_model: int = 16,
+        max_queue: int = 100,
+        max_wait: Optional[dict[Priority, float]] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_model = max_in_flight_per_model
+        self.max_queue = max_queue
+        self.max_wait = max_wait or {}
+
+        self._in_flight = 0
+        self._per_model: dict[str, int] = {}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self.shed: dict[str, int] = {priority.name: 0 for priority in Priority}
+
+    def _has_capacity(self, model: str) -> bool:
+        return (
+            self._in_flight < self.max_in_flight
+            and self._per_model.get(model, 0) < self.max_in_flight_per_model
+        )
+
+    def _take(self, model: str) -> None:
+        self._in_flight += 1
+        self._per_model[model] = self._per_model.get(model, 0) + 1
+
+    def release(self, model: str) -> None:
+        self._in_flight -= 1
+        remaining = self._per_model.get(model, 1) - 1
+        if remaining > 0:
+            self._per_model[model] = remaining
+        else:
+            self._per_model.pop(model, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for waiter in sorted(self._waiters, key=lambda w: w.sort_key):
+            if self._in_flight >= self.max_in_flight:
+                break
+            if waiter.future.done() or not self._has_capacity(waiter.model):
+                continue
+            self._take(waiter.model)
+            waiter.future.set_result(None)
+            self._waiters.remove(waiter)
+
+    def _shed(self, waiter: _Waiter) -> None:
+        self.shed[waiter.priority.name] += 1
+        if not waiter.future.done():
+            waiter.future.set_exception(
+                AdmissionRejectedError(
+                    f"Upstream capacity exhausted; shed {waiter.priority.name.lower()} request"
+                )
+            )
+
+    def _enqueue(self, model: str, priority: Priority) -> _Waiter:
+        waiter = _Waiter(
+            priority,
+            next(self._seq),
+            model,
+            asyncio.get_running_loop().create_future(),
+        )
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters, key=lambda w: w.sort_key)
+            if worst.priority <= priority:
+                # Nothing less important to drop; reject the newcomer.
+                self._shed(waiter)
+                return waiter
+            self._waiters.remove(worst)
+            self._shed(worst)
+
+        self._waiters.append(waiter)
+        return waiter
+
+    async def acquire(self, model: str, priority: Priority) -> None:
+        # Released slots are handed to waiters synchronously, so any free
+        # capacity here is capacity no queued call can use.
+        if self._has_capacity(model):
+            self._take(model)
+            return
+
+        waiter = self._enqueue(model, priority)
+        timeout = self.max_wait.get(priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                if waiter.future.exception() is None:
+                    # Granted just as the timeout fired; keep the slot.
+                    return
+            self._remove(waiter)
+            self._shed(waiter)
+            raise waiter.future.exception() or AdmissionRejectedError()
+        except asyncio.CancelledError:
+            if (
+                waiter.future.done()
+                and not waiter.future.cancelled()
+                and waiter.future.exception() is None
+            ):
+                # The slot was granted but the caller went away; hand it on.
+                self.release(model)
+            else:
+                self._remove(waiter)
+                if not waiter.future.done():
+                    waiter.future.cancel()
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority) -> AsyncIterator[None]:
+        await self.acquire(model, priority)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def stats(self) -> dict[str, Any]:
+        queued: dict[str, int] = {priority.name: 0 for priority in Priority}
+        for waiter in self._waiters:
+            queued[waiter.priority.name] += 1
+        return {
+            "in_flight": self._in_flight,
+            "in_flight_per_model": dict(self._per_model),
+            "queued": queued,
+            "shed": dict(self.shed),
+        }
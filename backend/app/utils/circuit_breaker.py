@@ -0,0 +1,169 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from app.utils.error_handling import (
+    AdmissionRejectedError,
+    APIConnectionError,
+    CircuitOpenError,
+    DeadlineExceededError,
+    OpenRouterError,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Failure-ratio circuit breaker for one upstream (base_url, model) pair.
+
+    * closed: calls go through; outcomes are recorded over a rolling window.
+      Once at least `min_requests` calls were seen and the failure ratio
+      reaches `failure_ratio`, the circuit opens.
+    * open: calls fail fast with `CircuitOpenError` for `open_seconds`.
+    * half_open: a single probe call is let through; success closes the
+      circuit, failure re-opens it.
+
+    Only transport-level failures (`APIConnectionError`: timeouts, connection
+    errors, 5xx) count as failures. Any other upstream response, including
+    4xx and 429, proves the provider is reachable. Calls cut short by the
+    request deadline or shed locally by admission control leave no verdict.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float = 0.5,
+        min_requests: int = 10,
+        window_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def before_call(self) -> None:
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {self.name}")
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info("Circuit for %s is half-open; sending a probe request", self.name)
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit half-open for {self.name}; probe in flight")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            logger.info("Circuit for %s closed after successful probe", self.name)
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._probe_in_flight = False
+            return
+        self._record(ok=True)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self._record(ok=False)
+
+    def release(self) -> None:
+        """Give up a call without a verdict (e.g. the caller was cancelled)."""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        self._prune(now)
+
+        total = len(self._outcomes)
+        if total < self.min_requests:
+            return
+        failures = sum(1 for _, outcome in self._outcomes if not outcome)
+        if failures / total >= self.failure_ratio:
+            self._open()
+
+    def _open(self) -> None:
+        logger.warning("Opening circuit for %s", self.name)
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """Guard one upstream call, recording its outcome."""
+        self.before_call()
+        try:
+            yield
+        except (DeadlineExceededError, AdmissionRejectedError):
+            # Our own budget or capacity ran out; that says nothing about
+            # upstream health.
+            self.release()
+            raise
+        except APIConnectionError:
+            self.record_failure()
+            raise
+        except OpenRouterError:
+            self.record_success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> dict[str, Any]:
+        self._prune(time.monotonic())
+        total = len(self._outcomes)
+        failures = sum(1 for _, outcome in self._outcomes if not outcome)
+        return {
+            "state": self.state,
+            "requests": total,
+            "failure_ratio": failures / total if total else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, **breaker_kwargs: Any):
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, base_url: str, model: str) -> CircuitBreaker:
+        key = (base_url, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(f"{model} @ {base_url}", **self._breaker_kwargs)
+            self._breakers[key] = breaker
+        return breaker
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {breaker.name: breaker.snapshot() for breaker in self._breakers.values()}
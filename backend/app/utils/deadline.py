@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from collections.abc import AsyncIterator, Awaitable, Iterator, Mapping
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional, TypeVar
+
+from app.utils.error_handling import DeadlineExceededError
+
+T = TypeVar("T")
+
+# Clients may shorten (never extend past the configured maximum) the budget
+# of a request by sending its timeout in seconds.
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Absolute `time.monotonic()` deadline of the current request. Tasks copy the
+# context they are created in, so layer tasks spawned by the orchestrator
+# inherit the deadline of the request that started them.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def attempt_timeout(default: float) -> float:
+    """
+    Timeout for one upstream attempt: the configured default, shortened to
+    what is left of the request budget. Raises once the budget is spent.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceededError()
+    return min(default, left)
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """
+    Start a budget of `seconds` in the current context. An existing, earlier
+    deadline is kept: nested scopes can only tighten the budget.
+    """
+    if seconds is None:
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    current = _deadline.get()
+    if current is None or deadline < current:
+        _deadline.set(deadline)
+
+
+def clear_deadline() -> None:
+    """
+    Drop the deadline of the current context. For tasks shared by several
+    requests (e.g. a single-flight upstream call), which must not be bound by
+    whichever request started them; each request bounds its own wait instead.
+    """
+    _deadline.set(None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    token = _deadline.set(_deadline.get())
+    set_deadline(seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def budget_for(
+    endpoint: str,
+    headers: Mapping[str, str],
+    defaults: Mapping[str, float],
+    maximum: float,
+) -> Optional[float]:
+    """
+    Budget in seconds for a request to `endpoint`: the client's
+    `X-Request-Timeout` header when valid, capped at `maximum`, otherwise
+    the endpoint default (None disables the deadline).
+    """
+    raw = headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            requested = float(raw)
+        except ValueError:
+            requested = None
+        if requested is not None and requested > 0:
+            return min(requested, maximum)
+    default = defaults.get(endpoint)
+    return min(default, maximum) if default else None
+
+
+@asynccontextmanager
+async def bounded(label: str) -> AsyncIterator[None]:
+    """
+    Cancel the enclosed work once the request deadline passes and raise
+    `DeadlineExceededError` naming `label` instead.
+
+    Only wrap code that runs entirely inside the current task (not a `yield`
+    of an async generator), since the timeout cancels the current task.
+    """
+    left = remaining()
+    if left is None:
+        yield
+        return
+    if left <= 0:
+        raise DeadlineExceededError(f"{label} exceeded the request deadline")
+    try:
+        async with asyncio.timeout(left):
+            yield
+    except TimeoutError:
+        raise DeadlineExceededError(f"{label} exceeded the request deadline") from None
+
+
+async def run_bounded(label: str, awaitable: Awaitable[T]) -> T:
+    left = remaining()
+    if left is not None and left <= 0:
+        # Never awaited: close a coroutine so it is not reported as such.
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceededError(f"{label} exceeded the request deadline")
+    async with bounded(label):
+        return await awaitable
@@ -28,6 +28,28 @@ class APIConnectionError(OpenRouterError):
         super().__init__(message, status_code=503)
 
 
+class CircuitOpenError(APIConnectionError):
+    """Raised without calling upstream while a circuit breaker is open."""
+
+
+class AdmissionRejectedError(RateLimitError):
+    """Raised when a queued upstream call is shed by the admission controller."""
+
+    def __init__(self, message: str = "Upstream capacity exhausted", retry_after: int = 1):
+        super().__init__(message, retry_after=retry_after)
+
+
+class QuotaExhaustedError(RateLimitError):
+    """Raised without calling upstream when the shared rate limit is exhausted."""
+
+
+class DeadlineExceededError(OpenRouterError):
+    """Raised when the request's end-to-end deadline leaves no time for a call."""
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, status_code=504)
+
+
 async def retry_with_exponential_backoff(
     func: Callable[..., Awaitable[T]],
     *args: Any,
@@ -35,6 +57,8 @@ async def retry_with_exponential_backoff(
     initial_delay: float = 1.0,
     exponential_base: float = 2.0,
     jitter: bool = True,
+    min_attempt_seconds: float = 1.0,
+    time_left: Callable[[], float | None] | None = None,
     **kwargs: Any,
 ) -> T:
     """
@@ -43,13 +67,29 @@ async def retry_with_exponential_backoff(
     `func` is an async callable; `*args`/`**kwargs` are forwarded to it on each attempt.
     The configuration parameters are passed as keyword-only to avoid interfering
     with positional arguments such as `self` on bound methods.
+
+    `time_left` reports the seconds left in the caller's budget (e.g.
+    `app.utils.deadline.remaining`, or None without a deadline). A retry is
+    skipped and the last error raised when that budget cannot cover the
+    backoff delay plus `min_attempt_seconds` for the next attempt.
     """
     delay = initial_delay
 
     for attempt in range(max_retries):
         try:
             return await func(*args, **kwargs)
+        except (
+            CircuitOpenError,
+            AdmissionRejectedError,
+            QuotaExhaustedError,
+            DeadlineExceededError,
+        ):
+            # The breaker already knows upstream is down, the worker or
+            # shared quota is saturated, or the request budget is spent;
+            # retrying would only hold the request open longer.
+            raise
         except RateLimitError as e:
+            last_error: Exception = e
             if attempt == max_retries - 1:
                 raise
             # Respect server-provided retry-after when present
@@ -59,18 +99,28 @@ async def retry_with_exponential_backoff(
                 f"(attempt {attempt + 1}/{max_retries})"
             )
         except APIConnectionError as e:
+            last_error = e
             if attempt == max_retries - 1:
                 raise
             logger.warning(
                 f"Connection error, retrying (attempt {attempt + 1}/{max_retries}): {e}"
             )
         except Exception as e:
+            last_error = e
             if attempt == max_retries - 1:
                 raise
             logger.error(
                 f"Unexpected error, retrying (attempt {attempt + 1}/{max_retries}): {e}"
             )
 
+        left = time_left() if time_left is not None else None
+        if left is not None and left < delay + min_attempt_seconds:
+            logger.warning(
+                f"Skipping retry: {left:.1f}s left in the request budget "
+                f"(attempt {attempt + 1}/{max_retries})"
+            )
+            raise last_error
+
         await asyncio.sleep(delay)
 
         if jitter:
@@ -83,7 +133,11 @@ async def retry_with_exponential_backoff(
     raise OpenRouterError("Max retries exceeded")
 
 
-def async_retry(max_retries: int = 3, initial_delay: float = 1.0):
+def async_retry(
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+    time_left: Callable[[], float | None] | None = None,
+):
     """
     Decorator to add retry-with-backoff behavior to async functions.
 
@@ -99,6 +153,7 @@ def async_retry(max_retries: int = 3, initial_delay: float = 1.0):
                 *args,
                 max_retries=max_retries,
                 initial_delay=initial_delay,
+                time_left=time_left,
                 **kwargs,
             )
 
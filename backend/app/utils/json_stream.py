@@ -0,0 +1,156 @@
+import json
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\r\n"
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser that yields the elements of a JSON array as soon as
+    each one is complete in a token stream.
+
+    With `key=None` the elements of a top-level array are yielded; with a key
+    the elements of that array-valued property of the top-level object are
+    yielded (e.g. `related_words` in the Layer 4 response). Text before the
+    first `{`/`[` (such as a Markdown fence) is skipped. The full text is kept
+    in `text`, so the caller can still parse the whole document at the end.
+
+    Chunks are scanned once and kept as a list of parts; only the text of the
+    element (or key string) currently being read is joined, so a long stream
+    is not re-copied on every token.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.done = False
+
+        self._parts: list[str] = []
+        self._length = 0
+        # Chunks from absolute offset `_window_start` on, still needed to
+        # slice out an unfinished element or string.
+        self._window: list[str] = []
+        self._window_start = 0
+        self._started = False
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._target_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def _slice(self, start: int, end: int) -> str:
+        if len(self._window) > 1:
+            self._window = ["".join(self._window)]
+        return self._window[0][start - self._window_start : end - self._window_start]
+
+    def _trim_window(self) -> None:
+        needed = [self._item_start, self._string_start if self._in_string else None]
+        keep = min((offset for offset in needed if offset is not None), default=self._length)
+        if keep >= self._length:
+            self._window = []
+            self._window_start = self._length
+        elif keep > self._window_start:
+            self._window = [self._slice(keep, self._length)]
+            self._window_start = keep
+
+    def _opens_target(self) -> bool:
+        if self.done or self._target_depth is not None:
+            return False
+        if self.key is None:
+            return not self._stack
+        return self._stack == ["{"] and self._current_key == self.key
+
+    def _emit(self, raw: str, out: list[Any]) -> None:
+        try:
+            out.append(json.loads(raw))
+        except json.JSONDecodeError:
+            logger.debug("Skipping unparsable streamed array element: %r", raw[:80])
+
+    def feed(self, chunk: str) -> list[Any]:
+        """Add a chunk of text and return the array elements it completed."""
+        start = self._length
+        self._parts.append(chunk)
+        self._window.append(chunk)
+        self._length += len(chunk)
+        items: list[Any] = []
+
+        for index, char in enumerate(chunk, start):
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._stack == ["{"]:
+                        raw = self._slice(self._string_start, index + 1)
+                        try:
+                            self._last_string = json.loads(raw)
+                        except json.JSONDecodeError:
+                            self._last_string = None
+                continue
+
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+
+            depth = len(self._stack)
+            if (
+                self._target_depth is not None
+                and depth == self._target_depth
+                and self._item_start is None
+                and char not in _WHITESPACE
+                and char not in ",]"
+            ):
+                self._item_start = index
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in "{[":
+                if char == "[" and self._opens_target():
+                    self._target_depth = depth + 1
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if self._target_depth is None:
+                    continue
+                if depth == self._target_depth - 1:
+                    # The target array itself closed; flush a trailing scalar.
+                    if self._item_start is not None:
+                        self._emit(self._slice(self._item_start, index), items)
+                        self._item_start = None
+                    self._target_depth = None
+                    self.done = True
+                elif depth == self._target_depth and self._item_start is not None:
+                    self._emit(self._slice(self._item_start, index + 1), items)
+                    self._item_start = None
+            elif char == ",":
+                if (
+                    self._target_depth is not None
+                    and depth == self._target_depth
+                    and self._item_start is not None
+                ):
+                    self._emit(self._slice(self._item_start, index), items)
+                    self._item_start = None
+            elif char == ":" and self._stack == ["{"]:
+                self._current_key = self._last_string
+
+        self._trim_window()
+        return items
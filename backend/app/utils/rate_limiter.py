@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections.abc import Callable, Mapping
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional, TypeVar
+
+from app.utils.error_handling import QuotaExhaustedError
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+# Bucket state: {"tokens": float, "updated": float, "blocked_until": float}.
+# Timestamps are wall-clock seconds so that state written by one worker
+# process is meaningful to the others.
+BucketState = dict[str, float]
+Update = Callable[[Optional[BucketState]], tuple[BucketState, R]]
+
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s)?\s*$")
+
+
+def _parse_reset(value: str, now: float) -> Optional[float]:
+    """
+    Parse an x-ratelimit-reset header into an absolute timestamp.
+
+    Providers disagree on the format: OpenRouter sends a Unix timestamp in
+    milliseconds, others send seconds since the epoch or a relative delay
+    such as "20", "1.5s" or "250ms".
+    """
+    match = _DURATION_RE.match(value)
+    if not match:
+        return None
+    number = float(match.group(1))
+    unit = match.group(2)
+    if unit == "ms":
+        return now + number / 1000
+    if unit == "s":
+        return now + number
+    if number > 1e12:
+        return number / 1000
+    if number > 1e9:
+        return number
+    return now + number
+
+
+def parse_retry_after(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header (delay or HTTP date)."""
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    now = time.time() if now is None else now
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_headers(
+    headers: Mapping[str, str],
+    now: Optional[float] = None,
+) -> tuple[Optional[int], Optional[float]]:
+    """Return `(remaining, reset_at)` from x-ratelimit-* headers, if present."""
+    now = time.time() if now is None else now
+    remaining_raw = headers.get("x-ratelimit-remaining") or headers.get(
+        "x-ratelimit-remaining-requests"
+    )
+    reset_raw = headers.get("x-ratelimit-reset") or headers.get("x-ratelimit-reset-requests")
+
+    remaining: Optional[int] = None
+    if remaining_raw:
+        try:
+            remaining = int(float(remaining_raw))
+        except ValueError:
+            remaining = None
+
+    reset_at = _parse_reset(reset_raw, now) if reset_raw else None
+    return remaining, reset_at
+
+
+def parse_retry_hint(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds a 429 asks callers to hold off: Retry-After, else the
+    x-ratelimit-* reset once nothing remains. None when upstream sent no hint.
+    """
+    now = time.time() if now is None else now
+    retry_after = parse_retry_after(headers, now)
+    if retry_after is not None:
+        return retry_after
+    remaining, reset_at = parse_rate_limit_headers(headers, now)
+    if remaining is not None and remaining <= 0 and reset_at is not None:
+        return max(0.0, reset_at - now)
+    return None
+
+
+def _new_state(capacity: float, now: float) -> BucketState:
+    return {"tokens": capacity, "updated": now, "blocked_until": 0.0}
+
+
+def _refill(state: BucketState, rate: float, capacity: float, now: float) -> None:
+    if rate > 0:
+        elapsed = max(0.0, now - state["updated"])
+        state["tokens"] = min(capacity, state["tokens"] + elapsed * rate)
+    state["updated"] = now
+
+
+class MemoryBucketStore:
+    """Bucket states for a single process."""
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._states: dict[str, BucketState] = {}
+
+    def update(self, key: str, fn: Update[R]) -> R:
+        state, result = fn(self._states.get(key))
+        self._states[key] = state
+        return result
+
+    def snapshot(self) -> dict[str, BucketState]:
+        return {key: dict(state) for key, state in self._states.items()}
+
+
+class FileBucketStore:
+    """
+    Bucket states shared by every process on one host.
+
+    All buckets live in one small JSON file; each update takes an exclusive
+    `flock` on it, so concurrent uvicorn workers draw from the same budget.
+    Methods block and are meant to be called via `asyncio.to_thread`.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        import fcntl  # POSIX only; callers fall back to the memory store.
+
+        self._fcntl = fcntl
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _read(self, handle: Any) -> dict[str, BucketState]:
+        handle.seek(0)
+        raw = handle.read()
+        if not raw:
+            return {}
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning("Discarding corrupt rate limit state file %s", self.path)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def update(self, key: str, fn: Update[R]) -> R:
+        with open(self.path, "a+", encoding="utf-8") as handle:
+            self._fcntl.flock(handle, self._fcntl.LOCK_EX)
+            try:
+                states = self._read(handle)
+                state, result = fn(states.get(key))
+                states[key] = state
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(states))
+                handle.flush()
+                return result
+            finally:
+                self._fcntl.flock(handle, self._fcntl.LOCK_UN)
+
+    def snapshot(self) -> dict[str, BucketState]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                self._fcntl.flock(handle, self._fcntl.LOCK_SH)
+                try:
+                    return self._read(handle)
+                finally:
+                    self._fcntl.flock(handle, self._fcntl.LOCK_UN)
+        except FileNotFoundError:
+            return {}
+
+
+def build_bucket_store(backend: str, path: str) -> MemoryBucketStore | FileBucketStore:
+    if backend == "file" and path:
+        try:
+            return FileBucketStore(path)
+        except ImportError:
+            logger.warning(
+                "File-backed rate limiting needs fcntl (POSIX); "
+                "falling back to per-process buckets."
+            )
+    return MemoryBucketStore()
+
+
+class RateLimiter:
+    """
+    Process-wide (or host-wide) token bucket per model for upstream calls.
+
+    Each model gets a bucket refilled at its configured requests-per-minute
+    quota with `burst` capacity; models without a quota are unlimited until
+    the provider pushes back. A 429 Retry-After, or x-ratelimit headers
+    reporting no remaining requests, block the bucket until the reset time,
+    so every caller waits instead of each one discovering the 429 itself.
+    Calls that would have to wait longer than `max_wait` fail fast with
+    `QuotaExhaustedError`.
+    """
+
+    def __init__(
+        self,
+        store: MemoryBucketStore | FileBucketStore | None = None,
+        requests_per_minute: Optional[dict[str, float]] = None,
+        burst: int = 10,
+        max_wait: float = 20.0,
+    ):
+        self.store = store or MemoryBucketStore()
+        self.requests_per_minute = requests_per_minute or {}
+        self.burst = burst
+        self.max_wait = max_wait
+
+        self.paced = 0
+        self.rejected = 0
+
+    def _limits(self, model: str) -> tuple[float, float]:
+        rpm = self.requests_per_minute.get(model, self.requests_per_minute.get("*", 0.0))
+        return (rpm / 60.0 if rpm > 0 else 0.0), float(max(1, self.burst))
+
+    async def _update(self, model: str, fn: Update[R]) -> R:
+        if self.store.blocking:
+            return await asyncio.to_thread(self.store.update, model, fn)
+        return self.store.update(model, fn)
+
+    def _reserve(self, model: str) -> Update[float]:
+        rate, capacity = self._limits(model)
+
+        def reserve(state: Optional[BucketState]) -> tuple[BucketState, float]:
+            now = time.time()
+            state = state or _new_state(capacity, now)
+            _refill(state, rate, capacity, now)
+            if now < state["blocked_until"]:
+                return state, state["blocked_until"] - now
+            if rate <= 0:
+                return state, 0.0
+            if state["tokens"] >= 1:
+                state["tokens"] -= 1
+                return state, 0.0
+            return state, (1 - state["tokens"]) / rate
+
+        return reserve
+
+    async def acquire(self, model: str) -> None:
+        """Wait for a token for `model`, or raise if the wait is too long."""
+        reserve = self._reserve(model)
+        paced = False
+        while True:
+            wait = await self._update(model, reserve)
+            if wait <= 0:
+                return
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise QuotaExhaustedError(
+                    f"Rate limit for {model} exhausted; retry in {wait:.0f}s",
+                    retry_after=max(1, math.ceil(wait)),
+                )
+            if not paced:
+                paced = True
+                self.paced += 1
+            await asyncio.sleep(wait)
+
+    async def block(self, model: str, seconds: float) -> None:
+        """Pause `model` for every caller, e.g. after a 429 Retry-After."""
+        if seconds <= 0:
+            return
+        rate, capacity = self._limits(model)
+
+        def apply(state: Optional[BucketState]) -> tuple[BucketState, None]:
+            now = time.time()
+            state = state or _new_state(capacity, now)
+            _refill(state, rate, capacity, now)
+            state["blocked_until"] = max(state["blocked_until"], now + seconds)
+            # Refill from empty afterwards so the released callers are paced
+            # instead of all retrying at the same instant.
+            state["tokens"] = 0.0
+            return state, None
+
+        logger.warning("Pausing upstream calls to %s for %.1fs", model, seconds)
+        await self._update(model, apply)
+
+    async def observe(self, model: str, headers: Mapping[str, str]) -> None:
+        """Feed x-ratelimit-* headers from an upstream response into the bucket."""
+        now = time.time()
+        remaining, reset_at = parse_rate_limit_headers(headers, now)
+        if remaining is None:
+            return
+        if remaining <= 0:
+            if reset_at is not None:
+                await self.block(model, reset_at - now)
+            return
+
+        rate, capacity = self._limits(model)
+        if rate <= 0:
+            return
+
+        def apply(state: Optional[BucketState]) -> tuple[BucketState, None]:
+            state = state or _new_state(capacity, now)
+            _refill(state, rate, capacity, now)
+            # The provider's count wins when it is stricter than ours.
+            state["tokens"] = min(state["tokens"], float(remaining))
+            return state, None
+
+        await self._update(model, apply)
+
+    async def stats(self) -> dict[str, Any]:
+        # The file store takes a shared flock; keep it off the event loop.
+        if self.store.blocking:
+            snapshot = await asyncio.to_thread(self.store.snapshot)
+        else:
+            snapshot = self.store.snapshot()
+        now = time.time()
+        return {
+            "paced": self.paced,
+            "rejected": self.rejected,
+            "blocked": {
+                model: round(state.get("blocked_until", 0.0) - now, 1)
+                for model, state in snapshot.items()
+                if state.get("blocked_until", 0.0) > now
+            },
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from typing import Any, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def payload_key(payload: dict[str, Any]) -> str:
+    """Stable digest of an upstream request payload (model, messages, sampling params)."""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Call(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """Chunks produced so far by one upstream stream, shared by all subscribers."""
+
+    def __init__(self) -> None:
+        self.chunks: list[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task[None]] = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        # Wake everyone waiting on the current event and arm a fresh one for
+        # the next change.
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical upstream calls into one.
+
+    `do` shares a single awaitable result between callers with the same key;
+    `stream` fans a single upstream stream out to several subscribers and
+    replays already-produced chunks to late joiners. Entries are dropped as
+    soon as the upstream call finishes, so this never serves stale results —
+    long-lived reuse is the response cache's job.
+
+    The upstream call is cancelled only when every caller has gone away.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[Any]] = {}
+        self._streams: dict[str, _Broadcast] = {}
+        self.shared_calls = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            task: asyncio.Task[T] = asyncio.ensure_future(factory())
+            call = _Call(task)
+            self._calls[key] = call
+
+            def _forget(_: "asyncio.Task[T]", call: _Call[T] = call) -> None:
+                if self._calls.get(key) is call:
+                    self._calls.pop(key, None)
+
+            task.add_done_callback(_forget)
+        else:
+            self.shared_calls += 1
+            logger.debug("Joining in-flight upstream call %s", key[:12])
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[T]],
+    ) -> AsyncGenerator[T, None]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, factory))
+        else:
+            self.shared_calls += 1
+            logger.debug(
+                "Joining in-flight upstream stream %s (%d chunks replayed)",
+                key[:12],
+                len(broadcast.chunks),
+            )
+
+        broadcast.subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = broadcast.changed
+                if index < len(broadcast.chunks):
+                    chunk = broadcast.chunks[index]
+                    index += 1
+                    yield chunk
+                    continue
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await changed.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                if self._streams.get(key) is broadcast:
+                    self._streams.pop(key, None)
+                if broadcast.task is not None:
+                    broadcast.task.cancel()
+
+    async def _pump(
+        self,
+        key: str,
+        broadcast: _Broadcast,
+        factory: Callable[[], AsyncIterator[Any]],
+    ) -> None:
+        try:
+            async for chunk in factory():
+                broadcast.chunks.append(chunk)
+                broadcast.notify()
+        except asyncio.CancelledError:
+            broadcast.error = asyncio.CancelledError()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            broadcast.error = exc
+        finally:
+            broadcast.done = True
+            if self._streams.get(key) is broadcast:
+                self._streams.pop(key, None)
+            broadcast.notify()
@@ -0,0 +1,124 @@
+import json
+import logging
+from json.decoder import scanstring
+from typing import Optional
+
+from app.utils.error_handling import OpenRouterError
+
+logger = logging.getLogger(__name__)
+
+_DATA_PREFIX = b"data:"
+_DONE = b"[DONE]"
+_DELTA_MARKER = '"delta":'
+_CONTENT_MARKER = '"content":'
+
+
+def _fast_delta_content(frame: str) -> Optional[str]:
+    """
+    Pull `choices[0].delta.content` out of a chat-completion chunk without
+    decoding the whole object.
+
+    Returns None when the frame does not have the expected shape, in which
+    case the caller falls back to a full JSON parse.
+    """
+    delta_at = frame.find(_DELTA_MARKER)
+    if delta_at == -1:
+        return None
+    content_at = frame.find(_CONTENT_MARKER, delta_at)
+    if content_at == -1:
+        return None
+
+    index = content_at + len(_CONTENT_MARKER)
+    length = len(frame)
+    while index < length and frame[index] in " \t":
+        index += 1
+    if index >= length:
+        return None
+
+    if frame[index] == '"':
+        # `scanstring` is the C-accelerated string decoder used by `json`.
+        value, _end = scanstring(frame, index + 1)
+        return value
+    if frame.startswith("null", index):
+        return ""
+    return None
+
+
+def _slow_delta_content(frame: str) -> str:
+    data = json.loads(frame)
+    if isinstance(data, dict) and data.get("error"):
+        error = data["error"]
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        raise OpenRouterError(f"Stream error: {message or 'Unknown error'}")
+
+    choices = data.get("choices") if isinstance(data, dict) else None
+    if not choices:
+        return ""
+    delta = choices[0].get("delta") or {}
+    return delta.get("content") or ""
+
+
+class SSEDeltaParser:
+    """
+    Incremental parser for OpenRouter's streaming chat-completion responses.
+
+    Raw bytes from `aiter_bytes()` are fed in as they arrive; complete lines
+    are split out of a single reusable buffer and only `data:` frames are
+    decoded. `feed` returns the non-empty content deltas found in the chunk
+    and sets `done` once the `[DONE]` sentinel is seen.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[str]:
+        if self.done:
+            return []
+
+        buffer = self._buffer
+        buffer += chunk
+
+        contents: list[str] = []
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline == -1:
+                break
+            line_end = newline
+            if line_end > start and buffer[line_end - 1] == 0x0D:  # "\r"
+                line_end -= 1
+
+            if buffer.startswith(_DATA_PREFIX, start):
+                content = self._parse_data(bytes(buffer[start + len(_DATA_PREFIX):line_end]))
+                if self.done:
+                    start = newline + 1
+                    break
+                if content:
+                    contents.append(content)
+
+            start = newline + 1
+
+        if start:
+            del buffer[:start]
+        return contents
+
+    def _parse_data(self, payload: bytes) -> str:
+        payload = payload.strip()
+        if not payload:
+            return ""
+        if payload == _DONE:
+            self.done = True
+            return ""
+
+        try:
+            frame = payload.decode("utf-8")
+            content = _fast_delta_content(frame)
+            if content is None:
+                content = _slow_delta_content(frame)
+        except (ValueError, AttributeError, IndexError):
+            # UnicodeDecodeError is a ValueError: a frame with broken UTF-8
+            # is skipped like any other malformed frame.
+            logger.warning("Failed to parse streaming data: %r", payload[:200])
+            return ""
+        return content
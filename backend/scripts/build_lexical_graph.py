@@ -0,0 +1,89 @@
+"""
+Compile the lexical relation index used for offline Layer 4 candidate recall.
+
+Run from the backend directory; the output path defaults to the configured
+`LEXICAL_GRAPH_PATH`:
+
+    poetry run python -m scripts.build_lexical_graph relations.tsv
+    poetry run python -m scripts.build_lexical_graph --wordnet
+
+The TSV source has one edge per line: `word<TAB>relationship<TAB>target`
+with an optional fourth `weight` column (0..1, default 1). Relationships are
+the Layer 4 labels (synonym, antonym, broader, narrower, collocate) or the
+WordNet names hypernym/hyponym. `--wordnet` reads WordNet through NLTK
+instead, which must be installed separately together with its corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+
+from app.config import settings
+from app.services.lexical_graph import write_lexical_graph
+
+Edge = tuple[str, str, str, float]
+
+
+def read_tsv(path: Path) -> Iterator[Edge]:
+    with path.open(encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) not in (3, 4):
+                logging.warning("%s:%d: expected 3 or 4 columns, skipping", path, number)
+                continue
+            try:
+                weight = float(fields[3]) if len(fields) == 4 else 1.0
+            except ValueError:
+                logging.warning("%s:%d: invalid weight, skipping", path, number)
+                continue
+            yield fields[0], fields[1], fields[2], weight
+
+
+def read_wordnet() -> Iterator[Edge]:
+    try:
+        from nltk.corpus import wordnet
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise SystemExit("--wordnet needs `pip install nltk` and the wordnet corpus") from exc
+
+    def name(lemma) -> str:
+        return lemma.name().replace("_", " ")
+
+    def weight(lemma, base: float) -> float:
+        # Prefer targets learners meet often (SemCor tag counts).
+        return base * min(1.0, 0.5 + lemma.count() / 20)
+
+    for synset in wordnet.all_synsets():
+        lemmas = synset.lemmas()
+        for lemma in lemmas:
+            word = name(lemma)
+            for other in lemmas:
+                if other is not lemma:
+                    yield word, "synonym", name(other), weight(other, 1.0)
+            for antonym in lemma.antonyms():
+                yield word, "antonym", name(antonym), weight(antonym, 1.0)
+            for hypernym in synset.hypernyms():
+                for target in hypernym.lemmas()[:2]:
+                    yield word, "broader", name(target), weight(target, 0.8)
+            for hyponym in synset.hyponyms()[:5]:
+                for target in hyponym.lemmas()[:1]:
+                    yield word, "narrower", name(target), weight(target, 0.6)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("relations", nargs="?", type=Path, help="TSV file of relation edges")
+    source.add_argument("--wordnet", action="store_true", help="read WordNet through NLTK")
+    parser.add_argument("--output", default=settings.lexical_graph_path)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    edges = read_wordnet() if args.wordnet else read_tsv(args.relations)
+    counts = write_lexical_graph(args.output, edges)
+    logging.info("Wrote %s: %d words, %d edges", args.output, counts["words"], counts["edges"])
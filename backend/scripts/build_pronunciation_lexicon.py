@@ -0,0 +1,108 @@
+"""
+Compile the bundled pronunciation lexicon from a source word list.
+
+Run from the backend directory; the output path defaults to the configured
+`PRONUNCIATION_LEXICON_PATH`, or `data/pronunciation_lexicon.bin` when unset.
+Set `PRONUNCIATION_LEXICON_PATH` to the output to enable the lexicon:
+
+    poetry run python -m scripts.build_pronunciation_lexicon cmudict.dict
+    poetry run python -m scripts.build_pronunciation_lexicon en_US.txt
+
+Two source formats are accepted and detected per line:
+  - `word<TAB>/ipa/` (ipa-dict style; comma-separated variants, first wins)
+  - CMUdict `WORD  W ER1 D` lines in ARPAbet, converted to IPA. Alternate
+    pronunciations such as `word(2)` are skipped.
+Lines starting with `#` or `;;;` are comments.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.services.pronunciation_lexicon import write_pronunciation_lexicon
+
+DEFAULT_OUTPUT = "data/pronunciation_lexicon.bin"
+
+ARPABET = {
+    "AA": "ɑ", "AE": "æ", "AO": "ɔ", "AW": "aʊ", "AY": "aɪ", "EH": "ɛ", "EY": "eɪ",
+    "IH": "ɪ", "IY": "i", "OW": "oʊ", "OY": "ɔɪ", "UH": "ʊ", "UW": "u",
+    "B": "b", "CH": "tʃ", "D": "d", "DH": "ð", "F": "f", "G": "ɡ", "HH": "h",
+    "JH": "dʒ", "K": "k", "L": "l", "M": "m", "N": "n", "NG": "ŋ", "P": "p",
+    "R": "ɹ", "S": "s", "SH": "ʃ", "T": "t", "TH": "θ", "V": "v", "W": "w",
+    "Y": "j", "Z": "z", "ZH": "ʒ",
+}  # fmt: skip
+STRESS_MARKS = {"1": "ˈ", "2": "ˌ"}
+
+_VARIANT_RE = re.compile(r"\(\d+\)$")
+
+
+def arpabet_to_ipa(phones: list[str]) -> Optional[str]:
+    """
+    Convert ARPAbet phones to a slash-delimited IPA string.
+
+    A stress mark goes at the start of the word for the first vowel and
+    otherwise before the single consonant preceding the stressed vowel. That
+    matches dictionary transcriptions for most words without a syllabifier.
+    """
+    symbols: list[str] = []
+    seen_vowel = False
+    for index, phone in enumerate(phones):
+        base = phone.rstrip("012")
+        stress = phone[len(base) :]
+        if base == "AH":
+            symbol = "ʌ" if stress in STRESS_MARKS else "ə"
+        elif base == "ER":
+            symbol = "ɝ" if stress in STRESS_MARKS else "ɚ"
+        elif base in ARPABET:
+            symbol = ARPABET[base]
+        else:
+            return None
+
+        mark = STRESS_MARKS.get(stress)
+        if mark and not seen_vowel:
+            symbols.insert(0, mark)
+        elif mark and index > 0 and not phones[index - 1][-1].isdigit():
+            symbols.insert(len(symbols) - 1, mark)
+        elif mark:
+            symbols.append(mark)
+        symbols.append(symbol)
+        seen_vowel = seen_vowel or bool(stress)
+    return f"/{''.join(symbols)}/"
+
+
+def read_source(path: Path) -> Iterator[tuple[str, str]]:
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line or line.startswith(("#", ";;;")):
+                continue
+            if "\t" in line:
+                word, ipa = line.split("\t", 1)
+                yield word, ipa.split(",")[0].strip()
+                continue
+
+            word, *phones = line.split()
+            if _VARIANT_RE.search(word) or not phones:
+                continue
+            ipa = arpabet_to_ipa(phones)
+            if ipa is None:
+                logging.warning("%s:%d: unknown ARPAbet phone, skipping", path, number)
+                continue
+            yield word, ipa
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", type=Path, help="ipa-dict TSV or CMUdict file")
+    parser.add_argument("--output", default=settings.pronunciation_lexicon_path or DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    count = write_pronunciation_lexicon(args.output, read_source(args.source))
+    logging.info("Wrote %s: %d words", args.output, count)
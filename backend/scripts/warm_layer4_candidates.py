@@ -0,0 +1,59 @@
+"""
+Pre-populate the Layer 4 candidate cache from a word list.
+
+Run from the backend directory with the same environment as the API, so the
+entries land in the configured `LAYER4_CANDIDATE_CACHE_DISK_PATH`:
+
+    poetry run python -m scripts.warm_layer4_candidates words.txt --concurrency 4
+
+The word list has one headword per line; blank lines and lines starting with
+`#` are ignored. Words that are already cached are skipped, so the job can be
+re-run after extending the list.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+from app.services.llm_orchestrator import llm_orchestrator
+from app.services.openrouter import openrouter_client
+from app.services.response_cache import candidate_cache
+
+
+def read_words(path: Path) -> list[str]:
+    words = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            words.append(line)
+    return words
+
+
+async def main(path: Path, concurrency: int) -> None:
+    words = read_words(path)
+    await openrouter_client.startup()
+    try:
+        counts = await llm_orchestrator.warm_layer4_candidates(words, concurrency=concurrency)
+    finally:
+        await openrouter_client.aclose()
+        candidate_cache.close()
+    logging.info(
+        "Warmed %d words: %d recalled, %d already cached, %d failed",
+        len(words),
+        counts["recalled"],
+        counts["cached"],
+        counts["failed"],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("words", type=Path, help="file with one headword per line")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    asyncio.run(main(args.words, args.concurrency))
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import pytest
+
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _disable_response_cache(monkeypatch):
+    """
+    Keep unit tests hermetic: the shared response cache would otherwise leak
+    results between tests and write to the on-disk store. Tests that exercise
+    the cache enable it explicitly on a private instance.
+    """
+    monkeypatch.setattr(settings, "response_cache_enabled", False)
+    monkeypatch.setattr(settings, "layer4_candidate_cache_enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_rate_limits(monkeypatch):
+    """A 429 simulated in one test must not pause upstream calls in the next."""
+    from app.services.openrouter import rate_limiter
+    from app.utils.rate_limiter import MemoryBucketStore
+
+    monkeypatch.setattr(rate_limiter, "store", MemoryBucketStore())
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.utils.admission import AdmissionController, Priority
+from app.utils.error_handling import AdmissionRejectedError, RateLimitError
+
+
+async def _hold(
+    controller: AdmissionController,
+    model: str,
+    priority: Priority,
+    order: list,
+    release: asyncio.Event,
+):
+    async with controller.slot(model, priority):
+        order.append(priority)
+        await release.wait()
+
+
+async def test_queued_calls_are_admitted_by_priority():
+    controller = AdmissionController(max_in_flight=1)
+    release = asyncio.Event()
+    order: list[Priority] = []
+
+    holder = asyncio.create_task(_hold(controller, "m", Priority.INTERACTIVE, order, release))
+    await asyncio.sleep(0)
+
+    waiters = [
+        asyncio.create_task(_hold(controller, "m", priority, order, release))
+        for priority in (Priority.IMAGE, Priority.LAZY, Priority.LAYER1)
+    ]
+    await asyncio.sleep(0)
+    assert controller.stats()["queued"]["IMAGE"] == 1
+
+    release.set()
+    await asyncio.gather(holder, *waiters)
+    assert order == [Priority.INTERACTIVE, Priority.LAYER1, Priority.LAZY, Priority.IMAGE]
+    assert controller.stats()["in_flight"] == 0
+
+
+async def test_per_model_cap_does_not_block_other_models():
+    controller = AdmissionController(max_in_flight=4, max_in_flight_per_model=1)
+
+    await controller.acquire("a", Priority.INTERACTIVE)
+    blocked = asyncio.create_task(controller.acquire("a", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    await asyncio.wait_for(controller.acquire("b", Priority.INTERACTIVE), timeout=1)
+
+    controller.release("a")
+    await asyncio.wait_for(blocked, timeout=1)
+    assert controller.stats()["in_flight_per_model"] == {"a": 1, "b": 1}
+
+
+async def test_full_queue_sheds_lowest_priority_waiter():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    await controller.acquire("m", Priority.INTERACTIVE)
+
+    image = asyncio.create_task(controller.acquire("m", Priority.IMAGE))
+    await asyncio.sleep(0)
+    layer1 = asyncio.create_task(controller.acquire("m", Priority.LAYER1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError):
+        await image
+    # Nothing less important is queued, so a background call is rejected outright.
+    with pytest.raises(RateLimitError):
+        await controller.acquire("m", Priority.BACKGROUND)
+
+    controller.release("m")
+    await asyncio.wait_for(layer1, timeout=1)
+    assert controller.stats()["shed"]["IMAGE"] == 1
+    assert controller.stats()["shed"]["BACKGROUND"] == 1
+
+
+async def test_waiter_is_shed_after_priority_max_wait():
+    controller = AdmissionController(max_in_flight=1, max_wait={Priority.LAZY: 0.01})
+    await controller.acquire("m", Priority.INTERACTIVE)
+
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire("m", Priority.LAZY)
+
+    stats = controller.stats()
+    assert stats["queued"]["LAZY"] == 0
+    assert stats["shed"]["LAZY"] == 1
+
+
+async def test_cancelled_waiter_leaves_queue():
+    controller = AdmissionController(max_in_flight=1)
+    await controller.acquire("m", Priority.INTERACTIVE)
+
+    waiter = asyncio.create_task(controller.acquire("m", Priority.LAZY))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    controller.release("m")
+    assert controller.stats()["in_flight"] == 0
+    assert sum(controller.stats()["queued"].values()) == 0
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import pytest
+
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.utils.error_handling import (
+    AdmissionRejectedError,
+    APIConnectionError,
+    CircuitOpenError,
+    OpenRouterError,
+    retry_with_exponential_backoff,
+)
+
+
+def _fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(APIConnectionError):
+        with breaker.call():
+            raise APIConnectionError("Server error: boom")
+
+
+def test_breaker_opens_after_failure_ratio_and_fails_fast():
+    breaker = CircuitBreaker("m", failure_ratio=0.5, min_requests=4, open_seconds=60)
+
+    with breaker.call():
+        pass
+    # Client errors prove the provider is reachable and do not count as failures.
+    with pytest.raises(OpenRouterError):
+        with breaker.call():
+            raise OpenRouterError("bad request", status_code=400)
+    _fail(breaker)
+    assert breaker.state == CLOSED
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        with breaker.call():
+            pytest.fail("must not reach upstream while open")
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker("m", failure_ratio=0.5, min_requests=1, open_seconds=0)
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    # open_seconds elapsed: the next call becomes the probe.
+    probe = breaker.call()
+    probe.__enter__()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    probe.__exit__(None, None, None)
+
+    assert breaker.state == CLOSED
+
+
+def test_locally_shed_probe_leaves_circuit_half_open():
+    breaker = CircuitBreaker("m", failure_ratio=0.5, min_requests=1, open_seconds=0)
+    _fail(breaker)
+
+    with pytest.raises(AdmissionRejectedError):
+        with breaker.call():
+            raise AdmissionRejectedError()
+    assert breaker.state == HALF_OPEN
+
+    # The probe slot was given back: the next call probes upstream.
+    with breaker.call():
+        pass
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_circuit():
+    breaker = CircuitBreaker("m", failure_ratio=0.5, min_requests=1, open_seconds=0)
+    _fail(breaker)
+    _fail(breaker)  # probe fails
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_retry_helper_does_not_retry_open_circuits():
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        raise CircuitOpenError("open")
+
+    with pytest.raises(CircuitOpenError):
+        await retry_with_exponential_backoff(call, max_retries=3, initial_delay=0)
+    assert calls == 1
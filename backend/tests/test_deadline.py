@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.models.request import AnalyzeRequest
+from app.utils.deadline import (
+    attempt_timeout,
+    budget_for,
+    deadline_scope,
+    remaining,
+    run_bounded,
+)
+from app.utils.error_handling import (
+    APIConnectionError,
+    DeadlineExceededError,
+    retry_with_exponential_backoff,
+)
+from tests.test_streaming import _TestOrchestrator
+
+
+def test_budget_from_header_or_endpoint_default():
+    defaults = {"analyze": 45.0}
+    assert budget_for("analyze", {}, defaults, 120.0) == 45.0
+    assert budget_for("analyze", {"X-Request-Timeout": "10"}, defaults, 120.0) == 10.0
+    assert budget_for("analyze", {"X-Request-Timeout": "600"}, defaults, 120.0) == 120.0
+    assert budget_for("analyze", {"X-Request-Timeout": "soon"}, defaults, 120.0) == 45.0
+    assert budget_for("other", {}, defaults, 120.0) is None
+
+
+def test_nested_scopes_only_tighten_the_budget():
+    assert remaining() is None
+    with deadline_scope(5):
+        with deadline_scope(60):
+            assert remaining() <= 5
+        assert attempt_timeout(60) <= 5
+    assert remaining() is None
+
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceededError):
+            attempt_timeout(60)
+
+
+async def test_retry_is_skipped_when_budget_cannot_cover_another_attempt():
+    calls = 0
+
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        raise APIConnectionError("Server error: boom")
+
+    with deadline_scope(0.5):
+        with pytest.raises(APIConnectionError):
+            await retry_with_exponential_backoff(
+                flaky,
+                max_retries=3,
+                initial_delay=1.0,
+                min_attempt_seconds=0.1,
+                time_left=remaining,
+            )
+    assert calls == 1
+
+
+class _SlowLayer2Orchestrator(_TestOrchestrator):
+    async def generate_layer2(self, word: str, context: str):
+        await asyncio.sleep(5)
+        return await super().generate_layer2(word, context)
+
+
+async def test_layer_missing_the_budget_emits_timeout_error():
+    orchestrator = _SlowLayer2Orchestrator()
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[2, 3])
+
+    events = [event async for event in orchestrator.analyze_streaming(request, budget=0.05)]
+    by_name = {event["event"]: event for event in events}
+
+    assert "layer3" in by_name
+    assert by_name["layer2_error"]["data"]["reason"] == "timeout"
+    assert events[-1]["event"] == "done"
+
+
+async def test_expired_budget_closes_the_unawaited_coroutine():
+    started = False
+
+    async def work():
+        nonlocal started
+        started = True
+
+    coroutine = work()
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceededError):
+            await run_bounded("Work", coroutine)
+
+    assert not started
+    # Closed rather than left pending (which warns "never awaited").
+    assert coroutine.cr_frame is None
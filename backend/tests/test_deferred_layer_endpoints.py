@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import json
+
 from fastapi.testclient import TestClient
 import pytest
 
+from app.config import settings
 from app.main import app
 from app.models.response import (
     CommonMistake,
+    Layer1Response,
+    Layer2Response,
     Layer3Response,
     Layer4Response,
+    LiveContext,
     RelatedWord,
 )
+from app.utils.admission import Priority
 from app.utils.error_handling import OpenRouterError
 
 
@@ -167,3 +174,77 @@ def test_lexical_map_text_endpoint_maps_openrouter_error(monkeypatch, client: Te
     assert response.status_code == 503
     assert response.json()["detail"] == "lex boom"
 
+
+
+def _patch_batch_layers(monkeypatch, seen_priorities: list) -> None:
+    from app.api.routes import analyze as analyze_routes
+
+    orchestrator = analyze_routes.llm_orchestrator
+    # Per-word layers only; multi-word prompts are covered with the orchestrator.
+    monkeypatch.setattr(settings, "analyze_batch_shared_prompts", False)
+
+    async def fake_layer1(word, context, english_level=None):
+        seen_priorities.append(orchestrator._priority_for("layer1"))
+        return Layer1Response(content=f"{word}: definition")
+
+    async def fake_layer2(word, context):
+        return Layer2Response(contexts=[LiveContext(source="news", text=f"{word} in the news")])
+
+    async def fake_layer3(word, context, english_level=None, max_items=2):
+        if word == "broken":
+            raise OpenRouterError("Layer 3 failed")
+        return Layer3Response(mistakes=[])
+
+    monkeypatch.setattr(orchestrator, "generate_layer1", fake_layer1)
+    monkeypatch.setattr(orchestrator, "generate_layer2", fake_layer2)
+    monkeypatch.setattr(orchestrator, "generate_layer3", fake_layer3)
+
+
+def test_analyze_batch_returns_results_in_request_order(monkeypatch, client: TestClient):
+    priorities: list = []
+    _patch_batch_layers(monkeypatch, priorities)
+
+    response = client.post(
+        "/api/analyze/batch",
+        json={
+            "context": "A broken record keeps repeating the same phrase.",
+            "words": ["record", "broken", "Record ", "phrase"],
+            "english_level": "B1",
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["word"] for item in results] == ["record", "broken", "phrase"]
+    assert results[0]["layer1"]["content"] == "record: definition"
+    assert results[0]["layer2"]["contexts"][0]["text"] == "record in the news"
+    assert results[0]["errors"] == {}
+    assert results[1]["layer3"] is None
+    assert results[1]["errors"] == {"layer3": {"error": "Layer 3 failed"}}
+    # Batch work queues behind interactive lookups.
+    assert set(priorities) == {Priority.LAZY}
+
+
+def test_analyze_batch_streams_ndjson(monkeypatch, client: TestClient):
+    _patch_batch_layers(monkeypatch, [])
+
+    response = client.post(
+        "/api/analyze/batch",
+        json={"context": "Some context.", "words": ["one", "two"], "layers": [2], "stream": True},
+    )
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["word"] for line in lines) == ["one", "two"]
+    assert all(line["layer1"] is None and line["layer2"] for line in lines)
+
+
+def test_analyze_batch_rejects_oversized_batches(monkeypatch, client: TestClient):
+    words = [f"w{i}" for i in range(settings.analyze_batch_max_words + 1)]
+    response = client.post("/api/analyze/batch", json={"context": "c", "words": words})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "too_long"
+
+    monkeypatch.setattr(settings, "analyze_batch_max_words", 1)
+    response = client.post("/api/analyze/batch", json={"context": "c", "words": ["a", "b"]})
+    assert response.status_code == 422
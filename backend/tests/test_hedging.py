@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.hedging import Hedger
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    hedger = Hedger(initial_delay=0.05, budget_ratio=1.0)
+    hedge_calls = 0
+
+    async def primary() -> str:
+        return "primary"
+
+    async def hedge() -> str:
+        nonlocal hedge_calls
+        hedge_calls += 1
+        return "hedge"
+
+    assert await hedger.run("layer2", primary, hedge) == "primary"
+    assert hedge_calls == 0
+    assert hedger.hedges == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    hedger = Hedger(initial_delay=0.01, budget_ratio=1.0)
+    primary_cancelled = asyncio.Event()
+
+    async def primary() -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+        return "primary"
+
+    async def hedge() -> str:
+        return "hedge"
+
+    assert await hedger.run("layer2", primary, hedge) == "hedge"
+    await asyncio.wait_for(primary_cancelled.wait(), timeout=1)
+    assert hedger.hedges == 1
+    assert hedger.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_falls_back_to_primary_result():
+    hedger = Hedger(initial_delay=0.01, budget_ratio=1.0)
+
+    async def primary() -> str:
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def hedge() -> str:
+        raise ValueError("invalid JSON")
+
+    assert await hedger.run("layer2", primary, hedge) == "primary"
+    assert hedger.primary_wins_after_hedge == 1
+
+
+@pytest.mark.asyncio
+async def test_hedges_respect_budget():
+    hedger = Hedger(initial_delay=0.001, budget_ratio=0.0)
+    hedge_calls = 0
+
+    async def primary() -> str:
+        await asyncio.sleep(0.02)
+        return "primary"
+
+    async def hedge() -> str:
+        nonlocal hedge_calls
+        hedge_calls += 1
+        return "hedge"
+
+    assert await hedger.run("layer2", primary, hedge) == "primary"
+    assert hedge_calls == 0
+    assert hedger.budget_denied == 1
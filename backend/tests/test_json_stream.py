@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.utils.json_stream import JSONArrayStreamParser
+
+
+def _feed(parser: JSONArrayStreamParser, text: str, size: int) -> list:
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start : start + size]))
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+def test_yields_elements_of_keyed_array_as_they_close(size):
+    document = {
+        "note": "related_words",
+        "related_words": [
+            {"word": 'tricky ]}"', "tags": [1, 2]},
+            {"word": "b"},
+            "plain, string",
+            7,
+        ],
+        "personalized": "x",
+    }
+    text = "```json\n" + json.dumps(document) + "\n```"
+
+    parser = JSONArrayStreamParser(key="related_words")
+    assert _feed(parser, text, size) == document["related_words"]
+    assert parser.done
+    assert parser.text == text
+
+
+def test_element_is_yielded_before_the_array_ends():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}]') == [{"b": 2}]
+    assert parser.feed(' trailing [{"c": 3}]') == []
+
+
+def test_only_the_unfinished_element_is_buffered():
+    parser = JSONArrayStreamParser(key="related_words")
+    text = json.dumps({"personalized": "p" * 5000, "related_words": [{"word": "a"}, {"word": "b"}]})
+
+    cut = text.index('{"word": "b"}') + 5
+    assert _feed(parser, text[:cut], 1) == [{"word": "a"}]
+    # Consumed text is dropped from the slicing window; only `{"wor` is kept.
+    assert "".join(parser._window) == '{"wor'
+
+    items = _feed(parser, text[cut:], 7)
+    assert items == [{"word": "b"}]
+    assert parser.text == text
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+
+from app.config import settings
+from app.services.lexical_graph import LexicalGraph, lemma_candidates, write_lexical_graph
+from app.services.llm_orchestrator import LLMOrchestrator
+
+EDGES = [
+    ("happy", "synonym", "glad", 0.9),
+    ("happy", "synonym", "cheerful", 0.7),
+    ("happy", "synonym", "content", 0.5),
+    ("happy", "antonym", "sad", 1.0),
+    ("happy", "hypernym", "emotional", 0.4),
+    ("Happy", "synonym", "GLAD", 0.2),
+    ("happy", "synonym", "happy", 1.0),
+    ("happy", "meronym", "smile", 1.0),
+    ("run", "synonym", "sprint", 1.0),
+]
+
+
+@pytest.fixture
+def graph(tmp_path) -> LexicalGraph:
+    path = str(tmp_path / "graph.bin")
+    counts = write_lexical_graph(path, EDGES)
+    # Duplicates, self-loops and unknown relationships are dropped.
+    assert counts == {"words": 8, "edges": 6}
+    instance = LexicalGraph(path)
+    yield instance
+    instance.close()
+
+
+def test_candidates_mix_relationships_by_weight(graph: LexicalGraph):
+    candidates = graph.candidates("Happy", limit=4)
+
+    assert [(c.word, c.relationship) for c in candidates] == [
+        ("glad", "synonym"),
+        ("emotional", "broader"),
+        ("sad", "antonym"),
+        ("cheerful", "synonym"),
+    ]
+    assert all(c.difference == "" and c.when_to_use == "" for c in candidates)
+
+
+def test_candidates_fall_back_to_base_form_and_miss_cleanly(graph: LexicalGraph):
+    assert "run" in lemma_candidates("running")
+    assert [c.word for c in graph.candidates("running", limit=5)] == ["sprint"]
+    # Headwords that only appear as targets have no edges of their own.
+    assert graph.candidates("glad", limit=5) == []
+    assert graph.candidates("unknown", limit=5) == []
+    assert graph.stats()["misses"] == 2
+
+
+def test_missing_or_corrupt_file_disables_the_index(tmp_path):
+    assert not LexicalGraph(str(tmp_path / "missing.bin")).available
+
+    corrupt = tmp_path / "corrupt.bin"
+    corrupt.write_bytes(b"LXG1 not really")
+    assert LexicalGraph(str(corrupt)).candidates("happy", limit=5) == []
+
+
+class _CandidateClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete_json(self, *args, **kwargs):
+        self.calls += 1
+        return [{"word": "llm", "relationship": "synonym"}]
+
+
+@pytest.mark.asyncio
+async def test_index_source_only_calls_the_model_for_unknown_words(monkeypatch, graph):
+    monkeypatch.setattr(settings, "layer4_candidate_source", "index")
+    monkeypatch.setattr(settings, "layer4_pipeline_min_candidates", 0)
+    orchestrator = LLMOrchestrator()
+    orchestrator.lexical_graph = graph
+    orchestrator.client = _CandidateClient()
+
+    known = await orchestrator.recall_layer4_candidates("happy", "I am happy.")
+    unknown = await orchestrator.recall_layer4_candidates("zeitgeist", "The zeitgeist shifted.")
+
+    assert known[0].word == "glad"
+    assert [c.word for c in unknown] == ["llm"]
+    assert orchestrator.client.calls == 1
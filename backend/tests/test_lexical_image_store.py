@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import base64
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.image_store import ImageStore
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\nfake-image"
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path) -> ImageStore:
+    from app.api.routes import lexical_map as lexical_map_routes
+
+    instance = ImageStore(str(tmp_path))
+    monkeypatch.setattr(lexical_map_routes, "image_store", instance)
+    lexical_map_routes._lexical_image_cache.clear()
+    yield instance
+    lexical_map_routes._lexical_image_cache.clear()
+
+
+def test_lexical_image_is_stored_once_and_served_by_url(monkeypatch, client, store):
+    from app.api.routes import lexical_map as lexical_map_routes
+
+    calls = 0
+
+    async def fake_generate_image(prompt: str, **kwargs) -> str:
+        nonlocal calls
+        calls += 1
+        return "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+
+    monkeypatch.setattr(
+        lexical_map_routes.openrouter_client, "generate_image", fake_generate_image
+    )
+
+    payload = {"base_word": "Tactic", "related_word": "strategy"}
+    response = client.post("/api/lexical-map/image", json=payload)
+    assert response.status_code == 200
+
+    image_url = response.json()["image_url"]
+    assert image_url.startswith("/api/lexical-map/images/")
+    assert image_url.endswith(".png")
+
+    image = client.get(image_url)
+    assert image.status_code == 200
+    assert image.content == PNG_BYTES
+    assert image.headers["content-type"] == "image/png"
+    assert "immutable" in image.headers["cache-control"]
+
+    etag = image.headers["etag"]
+    not_modified = client.get(image_url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    # A fresh process (empty memory cache) is served from the on-disk store.
+    lexical_map_routes._lexical_image_cache.clear()
+    again = client.post("/api/lexical-map/image", json=payload)
+    assert again.json()["image_url"] == image_url
+    assert calls == 1
+
+
+def test_lexical_image_route_rejects_unknown_filenames(client, store):
+    assert client.get("/api/lexical-map/images/../../etc/passwd").status_code == 404
+    assert client.get(f"/api/lexical-map/images/{'0' * 64}.png").status_code == 404
+
+
+
+async def test_store_evicts_least_recently_used_images_beyond_max_bytes(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=2 * len(PNG_BYTES))
+    data_url = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+    digests = [ImageStore.digest_for("base", f"word{i}", "m", "v") for i in range(3)]
+
+    for age, digest in enumerate(digests[:2]):
+        await store.save_data_url(digest, data_url)
+        os.utime(tmp_path / f"{digest}.png", (1000 + age, 1000 + age))
+    # Serving the older image makes the other one the least recently used.
+    assert store.find(digests[0]) == f"{digests[0]}.png"
+
+    await store.save_data_url(digests[2], data_url)
+
+    assert store.find(digests[0]) is not None
+    assert store.find(digests[1]) is None
+    assert store.find(digests[2]) is not None
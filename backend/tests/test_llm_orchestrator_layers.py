@@ -1,8 +1,18 @@
+import asyncio
+import json
+
 import pytest
 
 from app.config import settings
 from app.models.response import Layer2Response, Layer3Response, Layer4Response, RelatedWord
 from app.services.llm_orchestrator import LLMOrchestrator
+from app.services.model_health import ModelHealth
+from app.utils.error_handling import (
+    AdmissionRejectedError,
+    APIConnectionError,
+    DeadlineExceededError,
+    QuotaExhaustedError,
+)
 
 
 class _StubClient:
@@ -101,6 +111,8 @@ async def test_generate_layer4_caps_related_words_to_five_and_allows_fewer(monke
         "generate_layer4_candidates",
         fake_generate_layer4_candidates,
     )
+    # Run the stages back to back so the patched Stage A is used.
+    monkeypatch.setattr(settings, "layer4_pipeline_min_candidates", 0)
 
     # Response with more than 5 related words from the enrichment stage.
     many_related = {
@@ -250,3 +262,251 @@ async def test_enrich_layer4_from_candidates_uses_main_model_and_parses_response
     assert len(result.related_words) == 2
     assert result.related_words[0].word == "w1"
     assert result.personalized == "tip"
+
+
+class _FailingModelClient:
+    """Stub client that fails for one model id and records every attempt."""
+
+    def __init__(self, failing_model: str, json_response, error=None):
+        self.failing_model = failing_model
+        self._json_response = json_response
+        self._error = error or APIConnectionError("Server error: upstream down")
+        self.attempts: list[tuple[str, int | None]] = []
+
+    async def complete_json(self, *args, **kwargs):
+        self.attempts.append((kwargs["model"], kwargs.get("max_retries")))
+        if kwargs["model"] == self.failing_model:
+            raise self._error
+        return self._json_response
+
+
+@pytest.mark.asyncio
+async def test_generate_layer2_falls_back_to_next_model_without_retrying(monkeypatch):
+    monkeypatch.setattr(settings, "openrouter_model_id", "main-model", raising=False)
+    monkeypatch.setattr(settings, "openrouter_fast_model_id", "fast-model", raising=False)
+    monkeypatch.setattr(settings, "openrouter_model_fallbacks", {}, raising=False)
+
+    orchestrator = LLMOrchestrator()
+    orchestrator.model_health = ModelHealth()
+    orchestrator.client = _FailingModelClient(
+        "fast-model",
+        [
+            {"source": "twitter", "text": "t"},
+            {"source": "news", "text": "n"},
+            {"source": "academic", "text": "a"},
+        ],
+    )
+
+    result = await orchestrator.generate_layer2(word="test", context="A test sentence.")
+
+    assert len(result.contexts) == 3
+    # The primary model gets a single attempt; the last model in the chain
+    # keeps the default retry budget.
+    assert orchestrator.client.attempts == [("fast-model", 1), ("main-model", None)]
+    assert orchestrator.model_health.stats("fast-model")["error_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [DeadlineExceededError(), AdmissionRejectedError(), QuotaExhaustedError("quota")],
+)
+async def test_local_failures_neither_fall_back_nor_count_against_the_model(
+    monkeypatch, error
+):
+    monkeypatch.setattr(settings, "openrouter_model_id", "main-model", raising=False)
+    monkeypatch.setattr(settings, "openrouter_fast_model_id", "fast-model", raising=False)
+    monkeypatch.setattr(settings, "openrouter_model_fallbacks", {}, raising=False)
+
+    orchestrator = LLMOrchestrator()
+    orchestrator.model_health = ModelHealth()
+    orchestrator.client = _FailingModelClient("fast-model", [], error=error)
+
+    with pytest.raises(type(error)):
+        await orchestrator.generate_layer2(word="test", context="A test sentence.")
+
+    assert orchestrator.client.attempts == [("fast-model", 1)]
+    assert orchestrator.model_health.stats("fast-model")["samples"] == 0
+
+
+def test_model_chain_demotes_degraded_models(monkeypatch):
+    monkeypatch.setattr(settings, "openrouter_model_id", "main-model", raising=False)
+    monkeypatch.setattr(settings, "openrouter_fast_model_id", "fast-model", raising=False)
+    monkeypatch.setattr(
+        settings,
+        "openrouter_model_fallbacks",
+        {"layer2": ["backup-model", "main-model"]},
+        raising=False,
+    )
+
+    orchestrator = LLMOrchestrator()
+    orchestrator.model_health = ModelHealth(min_samples=3)
+    assert orchestrator._model_chain("layer2") == ["fast-model", "backup-model", "main-model"]
+
+    for _ in range(3):
+        orchestrator.model_health.record("fast-model", 1.0, ok=False)
+
+    assert orchestrator._model_chain("layer2") == ["backup-model", "main-model", "fast-model"]
+
+
+class _PipelineStubClient:
+    """Streams Stage A candidates and then hangs; Stage B answers via complete_json."""
+
+    def __init__(self):
+        self.stream_closed = False
+        self.enrich_prompt: str | None = None
+
+    async def stream(self, *args, **kwargs):
+        try:
+            yield "["
+            for i in range(3):
+                yield json.dumps({"word": f"c{i}", "relationship": "synonym"}) + ", "
+            await asyncio.sleep(30)
+            yield "]"
+        finally:
+            self.stream_closed = True
+
+    async def complete_json(self, *args, **kwargs):
+        self.enrich_prompt = kwargs.get("prompt")
+        return {
+            "related_words": [
+                {"word": "c0", "relationship": "synonym", "difference": "d", "when_to_use": "u"}
+            ],
+            "personalized": "tip",
+        }
+
+
+@pytest.mark.asyncio
+async def test_generate_layer4_starts_enrichment_once_enough_candidates_streamed(monkeypatch):
+    monkeypatch.setattr(settings, "layer4_pipeline_min_candidates", 3)
+
+    orchestrator = LLMOrchestrator()
+    client = _PipelineStubClient()
+    orchestrator.client = client
+
+    result = await asyncio.wait_for(
+        orchestrator.generate_layer4(word="test", context="This is a test sentence."),
+        timeout=1,
+    )
+
+    assert [w.word for w in result.related_words] == ["c0"]
+    # Stage B saw the three streamed candidates; the rest of Stage A was cancelled.
+    assert all(f'"c{i}"' in client.enrich_prompt for i in range(3))
+    assert client.stream_closed
+
+
+class _BatchStubClient:
+    """Answers multi-word prompts with a keyed object and single-word prompts with a list."""
+
+    def __init__(self, batch_answer: dict):
+        self.batch_answer = batch_answer
+        self.prompts: list[str] = []
+
+    async def complete_json(self, *args, **kwargs):
+        prompt = kwargs["prompt"]
+        self.prompts.append(prompt)
+        if prompt.startswith("Original context:"):
+            return self.batch_answer
+        return [{"source": s, "text": "single"} for s in ("twitter", "news", "academic")]
+
+
+def _contexts(text: str) -> list[dict]:
+    return [{"source": s, "text": text} for s in ("twitter", "news", "academic")]
+
+
+@pytest.mark.asyncio
+async def test_generate_layer2_batch_splits_keyed_answer_and_falls_back():
+    orchestrator = LLMOrchestrator()
+    client = _BatchStubClient(
+        {
+            "Fragile": _contexts("batched fragile"),
+            "stable": [{"source": "news", "text": "only one"}],
+        }
+    )
+    orchestrator.client = client
+
+    results = await orchestrator.generate_layer2_batch(
+        ["fragile", "stable", "robust", "FRAGILE"], "A fragile but stable peace."
+    )
+
+    assert list(results) == ["fragile", "stable", "robust"]
+    assert results["fragile"].contexts[0].text == "batched fragile"
+    # "stable" came back invalid and "robust" not at all: one call each.
+    assert results["stable"].contexts[0].text == "single"
+    assert results["robust"].contexts[0].text == "single"
+    assert len(client.prompts) == 3
+    assert '["fragile", "stable", "robust"]' in client.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_batched_answers_are_cached_apart_from_single_word_answers(monkeypatch):
+    from app import prompt_config
+    from app.services.response_cache import ResponseCache
+
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    orchestrator = LLMOrchestrator()
+    orchestrator.cache = ResponseCache(disk_path=None)
+    client = _BatchStubClient({"a": _contexts("batched a"), "b": _contexts("batched b")})
+    orchestrator.client = client
+
+    context = "Shared context."
+    await orchestrator.generate_layer2_batch(["a", "b"], context)
+    again = await orchestrator.generate_layer2_batch(["a", "b"], context)
+    assert again["b"].contexts[0].text == "batched b"
+    assert len(client.prompts) == 1
+
+    # A single-word request never gets the multi-word prompt's answer...
+    single = await orchestrator.generate_layer2("b", context)
+    assert single.contexts[0].text == "single"
+    assert len(client.prompts) == 2
+
+    # ...and editing the batched prompt invalidates its entries.
+    batch_config = dict(prompt_config.PROMPT_CONFIG["layer2_batch"])
+    batch_config["system_prompt"] += " Edited."
+    monkeypatch.setitem(prompt_config.PROMPT_CONFIG, "layer2_batch", batch_config)
+    # "b" still has its single-word answer; "a" alone is fetched one by one.
+    edited = await orchestrator.generate_layer2_batch(["a", "b"], context)
+    assert [edited[w].contexts[0].text for w in ("a", "b")] == ["single", "single"]
+    assert len(client.prompts) == 3
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_uses_one_multi_word_call(monkeypatch):
+    monkeypatch.setattr(settings, "analyze_batch_shared_prompts", True)
+    orchestrator = LLMOrchestrator()
+    client = _BatchStubClient({"one": _contexts("batched one"), "two": _contexts("batched two")})
+    orchestrator.client = client
+
+    items = [
+        item
+        async for item in orchestrator.analyze_batch(["one", "two", "three"], "Ctx.", layers=[2])
+    ]
+
+    texts = {item.word: item.layer2.contexts[0].text for item in items}
+    assert texts == {"one": "batched one", "two": "batched two", "three": "single"}
+    assert len(client.prompts) == 2
+
+
+class _SlowLayer1Orchestrator(LLMOrchestrator):
+    async def generate_layer1(self, word, context, english_level=None):
+        await asyncio.sleep(0.15)
+        return f"{word}: definition"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("budget_per_word, timed_out", [(False, ["two"]), (True, [])])
+async def test_analyze_batch_budget_per_word(monkeypatch, budget_per_word, timed_out):
+    monkeypatch.setattr(settings, "analyze_batch_concurrency", 1)
+    orchestrator = _SlowLayer1Orchestrator()
+
+    items = [
+        item
+        async for item in orchestrator.analyze_batch(
+            ["one", "two"], "Ctx.", layers=[1], budget=0.25, budget_per_word=budget_per_word
+        )
+    ]
+
+    # The second word waits for the first one; only a shared budget runs out.
+    failed = [item.word for item in items if item.errors]
+    assert failed == timed_out
+    assert all(item.errors["layer1"]["reason"] == "timeout" for item in items if item.errors)
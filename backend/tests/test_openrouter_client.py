@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.openrouter import OpenRouterClient
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_across_calls_and_recreated_after_close():
+    client = OpenRouterClient(api_key="test-key")
+
+    await client.startup()
+    first = client.http_client
+    # Repeated access should reuse the same pooled client.
+    assert client.http_client is first
+
+    await client.aclose()
+    assert first.is_closed
+
+    # A closed client is transparently replaced on next use.
+    second = client.http_client
+    assert second is not first
+    assert not second.is_closed
+
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_closing_a_stream_early_records_cancelled_spend(monkeypatch):
+    import httpx
+
+    from app.services import openrouter
+
+    spend = openrouter.CancelledSpend()
+    monkeypatch.setattr(openrouter, "cancelled_spend", spend)
+
+    async def body():
+        yield b'data: {"choices": [{"delta": {"content": "abcdefgh"}}]}\n\n'
+        await asyncio.sleep(30)
+
+    client = OpenRouterClient(api_key="test-key")
+    client._http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+    )
+
+    stream = client.stream("x" * 40, model="m", max_tokens=100)
+    assert await stream.__anext__() == "abcdefgh"
+    await stream.aclose()
+    # The shared upstream stream is cancelled once its last subscriber leaves.
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert spend.stats() == {
+        "requests": 1,
+        "prompt_tokens": 10,
+        "completion_tokens": 2,
+        "avoided_completion_tokens": 98,
+    }
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_a_flight_only_within_one_priority():
+    import httpx
+
+    from app.utils.admission import Priority
+
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = OpenRouterClient(api_key="test-key")
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    results = await asyncio.gather(
+        client.complete("same prompt", model="m", priority=Priority.BACKGROUND),
+        client.complete("same prompt", model="m", priority=Priority.INTERACTIVE),
+        client.complete("same prompt", model="m", priority=Priority.INTERACTIVE),
+    )
+
+    assert results == ["ok"] * 3
+    # The interactive callers share one call; the background one runs apart.
+    assert calls == 2
+    await client.aclose()
+
+
+
+@pytest.mark.asyncio
+async def test_shared_flight_is_not_bound_by_the_first_callers_deadline(monkeypatch):
+    import httpx
+
+    from app.config import settings
+    from app.utils.deadline import deadline_scope
+    from app.utils.error_handling import DeadlineExceededError
+
+    monkeypatch.setattr(settings, "retry_delay", 0.01)
+    monkeypatch.setattr(settings, "retry_min_attempt_seconds", 0.01)
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        if calls == 1:
+            raise httpx.ReadTimeout("slow upstream", request=request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = OpenRouterClient(api_key="test-key")
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def call(budget: float) -> str:
+        with deadline_scope(budget):
+            return await client.complete("same prompt", model="m")
+
+    impatient = asyncio.create_task(call(0.05))
+    await asyncio.sleep(0)
+    patient = asyncio.create_task(call(30))
+
+    with pytest.raises(DeadlineExceededError):
+        await impatient
+    # The second caller joined the first caller's flight but keeps its own
+    # budget: the timed-out attempt is retried for it instead of failing
+    # with the first caller's expired deadline.
+    assert await patient == "ok"
+    assert calls == 2
+    await client.aclose()
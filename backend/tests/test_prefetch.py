@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.response import AnalyzeBatchItem
+from app.services import prefetch as prefetch_service
+from app.services.prefetch import (
+    FrequencyTable,
+    Prefetcher,
+    extract_context,
+    lookup_context,
+    pick_difficult_words,
+)
+
+
+@pytest.fixture
+def table(tmp_path) -> FrequencyTable:
+    path = tmp_path / "frequency.txt"
+    words = ["the", "house", "walk", "quick", "run", "past", "lift"]
+    path.write_text("# most frequent first\n" + "\n".join(words) + "\n", encoding="utf-8")
+    return FrequencyTable(str(path))
+
+
+def test_frequency_table_ranks_inflected_forms(table):
+    assert table.rank("the") == 0
+    assert table.rank("Houses") == 1
+    assert table.rank("running") == 4
+    assert table.rank("ephemeral") is None
+
+
+def test_missing_frequency_list_ranks_nothing(tmp_path):
+    assert FrequencyTable(str(tmp_path / "missing.txt")).rank("the") is None
+
+
+def test_pick_difficult_words_skips_common_known_and_proper_words(monkeypatch, table):
+    monkeypatch.setattr(
+        prefetch_service.settings, "prefetch_rank_thresholds", {"none": 5, "beginner": 7}
+    )
+    text = (
+        "Walking past the house, Alice saw an ephemeral glimmer. "
+        "The quick haze didn't lift."
+    )
+
+    picked = pick_difficult_words(text, None, ["Glimmers"], limit=10, table=table)
+    assert picked == ["past", "ephemeral", "haze", "lift"]
+
+    assert pick_difficult_words(text, "A2", ["glimmer"], limit=10, table=table) == [
+        "ephemeral",
+        "haze",
+    ]
+    assert pick_difficult_words(text, None, [], limit=2, table=table) == ["past", "ephemeral"]
+
+
+def test_lookup_context_mirrors_the_extension():
+    # Like the side panel, the sentence is widened to the surrounding window.
+    page = "First sentence here. The word ephemeral lives here! Last one?"
+    assert lookup_context("ephemeral", page) == page
+    assert lookup_context("absent", page) == "absent"
+
+    filler = "Filler text goes on. " * 20
+    page = filler + "The word ephemeral lives here! " + filler
+    context = lookup_context("ephemeral", page)
+    assert context.startswith("...") and context.endswith("...")
+    assert "The word ephemeral lives here!" in context
+
+    long_page = "x" * 600 + " target " + "y" * 600
+    context = extract_context("target", long_page)
+    assert context.startswith("...") and context.endswith("...")
+    assert len(context) == len("...") * 2 + 2 * 250 + len("target")
+
+
+@pytest.fixture
+def analyze_calls(monkeypatch):
+    calls: list[tuple[list[str], str, object]] = []
+    release = asyncio.Event()
+
+    async def fake_analyze_batch(words, context, english_level=None, budget=None, **kwargs):
+        # Prefetch must warm the single-word cache entries at BACKGROUND priority.
+        assert kwargs["shared_prompts"] is False
+        assert kwargs["budget_per_word"] is True
+        calls.append((list(words), context, kwargs["priority"]))
+        await release.wait()
+        for word in words:
+            yield AnalyzeBatchItem(word=word)
+
+    monkeypatch.setattr(prefetch_service.llm_orchestrator, "analyze_batch", fake_analyze_batch)
+    return calls, release
+
+
+async def test_prefetcher_groups_words_by_sentence_at_background_priority(analyze_calls):
+    calls, release = analyze_calls
+    prefetcher = Prefetcher(words_per_hour=10)
+    filler = " Nothing to see." * 40
+    page = "An ephemeral, ubiquitous haze." + filler + " A lone glimmer."
+
+    job = prefetcher.start("user", page, ["ephemeral", "ubiquitous", "glimmer"], "B1")
+    release.set()
+    await job.task
+
+    assert [words for words, _, _ in calls] == [["ephemeral", "ubiquitous"], ["glimmer"]]
+    assert [context for _, context, _ in calls] == [
+        lookup_context("ephemeral", page),
+        lookup_context("glimmer", page),
+    ]
+    assert all(priority == prefetch_service.Priority.BACKGROUND for _, _, priority in calls)
+    assert prefetcher.stats() == {
+        "active": 0,
+        "started": 1,
+        "cancelled": 0,
+        "words_prefetched": 3,
+        "tracked_budgets": 1,
+    }
+
+
+async def test_prefetcher_enforces_hourly_budget(analyze_calls):
+    _, release = analyze_calls
+    release.set()
+    prefetcher = Prefetcher(words_per_hour=3)
+
+    first = prefetcher.start("user", "a b c.", ["alpha", "bravo"], None)
+    second = prefetcher.start("user", "a b c.", ["charlie", "delta"], None)
+    await second.task
+    third = prefetcher.start("user", "a b c.", ["echo"], None)
+
+    assert first.words == ["alpha", "bravo"]
+    assert second.words == ["charlie"]
+    assert third.words == [] and third.task is None
+    assert prefetcher.remaining_budget("user") == 0
+    assert prefetcher.remaining_budget("someone-else") == 3
+    # Reading a budget does not start tracking it.
+    assert prefetcher.stats()["tracked_budgets"] == 1
+
+
+async def test_client_budget_survives_new_user_ids(analyze_calls):
+    _, release = analyze_calls
+    release.set()
+    prefetcher = Prefetcher(words_per_hour=2, words_per_client_per_hour=3, max_tracked_budgets=4)
+
+    first = prefetcher.start("a", "x.", ["alpha", "bravo"], None, client="10.0.0.1")
+    second = prefetcher.start("b", "x.", ["charlie", "delta"], None, client="10.0.0.1")
+    await asyncio.gather(first.task, second.task)
+
+    assert second.words == ["charlie"]
+    assert prefetcher.remaining_budget("c", "10.0.0.1") == 0
+    assert prefetcher.remaining_budget("c", "10.0.0.2") == 2
+
+    # Tracked budgets are bounded; the least recently used are dropped.
+    jobs = [prefetcher.start(user, "x.", ["echo"], None) for user in "defg"]
+    await asyncio.gather(*(job.task for job in jobs))
+    assert prefetcher.stats()["tracked_budgets"] == 4
+    # The evicted address budget starts over (capped by the user budget).
+    assert prefetcher.remaining_budget("c", "10.0.0.1") == 2
+
+
+async def test_new_page_replaces_previous_job(analyze_calls):
+    _, release = analyze_calls
+    prefetcher = Prefetcher(words_per_hour=10)
+
+    first = prefetcher.start("user", "One page.", ["alpha"], None)
+    second = prefetcher.start("user", "Next page.", ["bravo"], None)
+    await asyncio.sleep(0)
+
+    assert first.task.cancelled() or first.task.cancelling()
+    assert prefetcher.cancel(first.id) is False
+    assert prefetcher.cancel(second.id) is True
+    assert prefetcher.stats()["cancelled"] == 2
+
+    release.set()
+    await prefetcher.aclose()
+
+
+def test_prefetch_route_starts_and_cancels_job(monkeypatch, analyze_calls, table):
+    monkeypatch.setattr(prefetch_service, "prefetcher", Prefetcher(words_per_hour=60))
+    monkeypatch.setattr("app.api.routes.prefetch.prefetcher", prefetch_service.prefetcher)
+    monkeypatch.setattr(
+        "app.api.routes.prefetch.pick_difficult_words",
+        lambda text, level, history, limit: pick_difficult_words(
+            text, level, history, limit, table=table
+        ),
+    )
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/prefetch",
+            json={"text": "The house had an ephemeral glow.", "user_id": "reader"},
+        )
+        assert response.status_code == 202
+        body = response.json()
+        assert body["words"] == ["ephemeral", "glow"]
+        assert body["budget_remaining"] == 58
+
+        assert client.delete(f"/api/prefetch/{body['prefetch_id']}").status_code == 204
+        assert client.delete(f"/api/prefetch/{body['prefetch_id']}").status_code == 404
+
+
+def test_prefetch_route_disabled(monkeypatch):
+    monkeypatch.setattr(prefetch_service.settings, "prefetch_enabled", False)
+    with TestClient(app) as client:
+        response = client.post("/api/prefetch", json={"text": "Anything at all."})
+    assert response.status_code == 503
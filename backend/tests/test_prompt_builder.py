@@ -140,3 +140,17 @@ def test_layer3_prompt_includes_level_guidance_for_beginner():
     assert "A1" in prompt
     # And beginner guidance should be present
     assert "simple A1–A2 vocabulary" in prompt or "简单" in prompt
+
+
+def test_layer3_batch_prompt_leads_with_shared_context_and_lists_words():
+    """Batched prompts start with the shared context and reuse the level notes."""
+    context = "The document was heavily redacted before publication."
+    _, prompt = PromptBuilder.build_layer3_batch_prompt(
+        words=["redacted", "publication"],
+        context=context,
+        english_level="A1",
+    )
+
+    assert prompt.startswith(f"Context sentence: {context}")
+    assert '["redacted", "publication"]' in prompt
+    assert "simple A1–A2 vocabulary" in prompt
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.routes import pronunciation as pronunciation_routes
+from app.config import settings
+from app.main import app
+from app.services.pronunciation_lexicon import PronunciationLexicon, write_pronunciation_lexicon
+
+
+@pytest.fixture
+def lexicon(tmp_path) -> PronunciationLexicon:
+    path = str(tmp_path / "lexicon.bin")
+    count = write_pronunciation_lexicon(
+        path,
+        [("Word", "/wɝd/"), ("about", "/əˈbaʊt/"), ("word", "/wɜːd/"), ("", "/x/")],
+    )
+    assert count == 2
+    instance = PronunciationLexicon(path)
+    yield instance
+    instance.close()
+
+
+@pytest.fixture
+def upstream(monkeypatch, lexicon):
+    """Route the fallback dictionary API through a mock transport."""
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        if request.url.path.endswith("/busy"):
+            return httpx.Response(429, headers={"Retry-After": "5"})
+        if request.url.path.endswith("/zeitgeist"):
+            return httpx.Response(200, json=[{"phonetics": [{"text": "/ˈtsaɪtɡaɪst/"}]}])
+        if request.url.path.endswith("/about"):
+            phonetics = [{"text": "/əˈbaʊt/"}, {"audio": "https://audio.example/about.mp3"}]
+            return httpx.Response(200, json=[{"phonetics": phonetics}])
+        return httpx.Response(404, json={"title": "No Definitions Found"})
+
+    monkeypatch.setattr(pronunciation_routes, "pronunciation_lexicon", lexicon)
+    monkeypatch.setattr(
+        pronunciation_routes,
+        "_dictionary_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(pronunciation_routes, "_backoff_until", 0.0)
+    pronunciation_routes._pronunciation_cache.clear()
+    pronunciation_routes._missing_cache.clear()
+    return calls
+
+
+def test_lexicon_binary_search(lexicon: PronunciationLexicon):
+    assert lexicon.lookup(" WORD ") == "/wɝd/"
+    assert lexicon.lookup("about") == "/əˈbaʊt/"
+    assert lexicon.lookup("abou") is None
+    assert lexicon.lookup("zzz") is None
+    assert lexicon.stats() == {"available": True, "words": 2, "hits": 2, "misses": 2}
+
+
+def test_missing_lexicon_misses_every_word(tmp_path):
+    assert PronunciationLexicon(str(tmp_path / "missing.bin")).lookup("word") is None
+
+
+def test_pronunciation_prefers_lexicon_and_falls_back_to_api(upstream):
+    client = TestClient(app)
+
+    # Lexicon IPA; the dictionary API has no entry, so there is no audio.
+    response = client.get("/api/pronunciation/Word")
+    assert response.json() == {"word": "Word", "ipa": "/wɝd/", "audio_url": None}
+
+    response = client.get("/api/pronunciation/zeitgeist")
+    assert response.json()["ipa"] == "/ˈtsaɪtɡaɪst/"
+    assert client.get("/api/pronunciation/qwxz").status_code == 404
+
+    assert upstream == ["Word", "zeitgeist", "qwxz"]
+
+
+def test_lexicon_hits_keep_the_dictionary_audio(monkeypatch, upstream):
+    client = TestClient(app)
+    expected = {
+        "word": "about",
+        "ipa": "/əˈbaʊt/",
+        "audio_url": "https://audio.example/about.mp3",
+    }
+
+    assert client.get("/api/pronunciation/about").json() == expected
+    # Later lookups, single or batched, reuse the cached audio URL.
+    assert client.get("/api/pronunciation/about").json() == expected
+    batch = client.post("/api/pronunciation/batch", json={"words": ["about"]}).json()
+    assert batch["results"][0]["pronunciation"] == expected
+    assert upstream == ["about"]
+
+    monkeypatch.setattr(settings, "pronunciation_lexicon_fetch_audio", False)
+    response = client.get("/api/pronunciation/word")
+    assert response.json()["audio_url"] is None
+    assert upstream == ["about"]
+
+
+def test_batch_dedupes_and_reports_errors_per_word(monkeypatch, upstream):
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/pronunciation/batch",
+        json={"words": ["Word", "word ", "zeitgeist", "qwxz", "  ", "about"]},
+    )
+
+    assert response.status_code == 200
+    results = {item["word"]: item for item in response.json()["results"]}
+    assert list(results) == ["word", "zeitgeist", "qwxz", "about"]
+    assert results["word"]["pronunciation"]["ipa"] == "/wɝd/"
+    assert results["zeitgeist"]["pronunciation"]["ipa"] == "/ˈtsaɪtɡaɪst/"
+    assert results["qwxz"]["status_code"] == 404
+    assert results["qwxz"]["pronunciation"] is None
+    assert upstream == ["zeitgeist", "qwxz"]
+
+    # The fetched word is now cached, so a second batch stays local.
+    client.post("/api/pronunciation/batch", json={"words": ["zeitgeist"]})
+    assert upstream == ["zeitgeist", "qwxz"]
+
+    # Oversized bodies are rejected while parsing, before any normalization.
+    words = ["a"] * (settings.pronunciation_batch_max_words + 1)
+    response = client.post("/api/pronunciation/batch", json={"words": words})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "too_long"
+
+    monkeypatch.setattr(settings, "pronunciation_batch_max_words", 2)
+    response = client.post("/api/pronunciation/batch", json={"words": ["a", "b", "c"]})
+    assert response.status_code == 422
+
+
+async def test_misses_are_cached_and_concurrent_lookups_coalesced(upstream):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as excinfo:
+            await pronunciation_routes._fetch_pronunciation("qwxz")
+        assert excinfo.value.status_code == 404
+
+    results = await asyncio.gather(
+        *(pronunciation_routes._fetch_pronunciation(w) for w in ("zeitgeist", "Zeitgeist"))
+    )
+
+    assert {r.ipa for r in results} == {"/ˈtsaɪtɡaɪst/"}
+    assert upstream == ["qwxz", "zeitgeist"]
+
+
+def test_upstream_429_pauses_all_lookups(upstream):
+    client = TestClient(app)
+    client.get("/api/pronunciation/zeitgeist")
+
+    response = client.get("/api/pronunciation/busy")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+    # During the backoff only cached and bundled words are answered.
+    assert client.get("/api/pronunciation/unseen").status_code == 429
+    assert client.get("/api/pronunciation/zeitgeist").status_code == 200
+    assert client.get("/api/pronunciation/word").status_code == 200
+    assert upstream == ["zeitgeist", "busy"]
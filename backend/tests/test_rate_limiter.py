@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import openrouter
+from app.services.openrouter import OpenRouterClient
+from app.utils.error_handling import QuotaExhaustedError, RateLimitError
+from app.utils.rate_limiter import (
+    FileBucketStore,
+    RateLimiter,
+    parse_rate_limit_headers,
+    parse_retry_after,
+    parse_retry_hint,
+)
+
+
+def test_header_parsing():
+    now = 1_700_000_000.0
+    assert parse_retry_after({"retry-after": "7"}, now) == 7.0
+    http_date = {"retry-after": "Tue, 14 Nov 2023 22:13:30 GMT"}
+    assert parse_retry_after(http_date, now) == pytest.approx(10.0)
+    assert parse_retry_after({}, now) is None
+
+    # OpenRouter: Unix timestamp in milliseconds.
+    assert parse_rate_limit_headers(
+        {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(int((now + 5) * 1000))}, now
+    ) == (0, pytest.approx(now + 5))
+    assert parse_rate_limit_headers({"x-ratelimit-reset-requests": "250ms"}, now) == (
+        None,
+        pytest.approx(now + 0.25),
+    )
+
+    # Only an explicit hint pauses the model for everyone.
+    assert parse_retry_hint({"retry-after": "7"}, now) == 7.0
+    assert parse_retry_hint(
+        {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(int((now + 5) * 1000))}, now
+    ) == pytest.approx(5.0)
+    assert parse_retry_hint({"x-ratelimit-remaining": "3"}, now) is None
+    assert parse_retry_hint({}, now) is None
+
+
+async def test_quota_paces_callers_once_burst_is_spent():
+    limiter = RateLimiter(requests_per_minute={"m": 600}, burst=2, max_wait=1.0)
+
+    started = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire("m")
+    # Two burst tokens, then one refill at 10 req/s.
+    assert time.monotonic() - started >= 0.08
+    assert (await limiter.stats())["paced"] == 1
+
+    # Models without a quota are not limited.
+    for _ in range(20):
+        await limiter.acquire("other")
+
+
+async def test_block_is_shared_and_long_waits_fail_fast():
+    limiter = RateLimiter(max_wait=1.0)
+    await limiter.block("m", 30)
+
+    with pytest.raises(QuotaExhaustedError) as excinfo:
+        await limiter.acquire("m")
+    assert excinfo.value.retry_after == 30
+    assert set((await limiter.stats())["blocked"]) == {"m"}
+
+    await limiter.observe("n", {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "45"})
+    with pytest.raises(RateLimitError):
+        await limiter.acquire("n")
+
+
+async def test_file_store_shares_budget_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.json")
+    first = RateLimiter(store=FileBucketStore(path), max_wait=1.0)
+    second = RateLimiter(store=FileBucketStore(path), max_wait=1.0)
+
+    await first.block("m", 30)
+    with pytest.raises(QuotaExhaustedError):
+        await second.acquire("m")
+    assert set((await second.stats())["blocked"]) == {"m"}
+
+
+async def test_upstream_429_pauses_other_callers(monkeypatch):
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(
+            429, headers={"Retry-After": "30"}, json={"error": {"message": "slow down"}}
+        )
+
+    monkeypatch.setattr(openrouter.rate_limiter, "max_wait", 1.0)
+    client = OpenRouterClient(api_key="test-key")
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(RateLimitError):
+        await client.complete("hi", model="m", max_retries=1)
+    # The next caller is rejected locally instead of hitting upstream again.
+    with pytest.raises(QuotaExhaustedError):
+        await client.complete("hi again", model="m", max_retries=1)
+    assert calls == 1
+
+    await client.aclose()
+
+
+async def test_bare_upstream_429_does_not_pause_other_callers(monkeypatch):
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(429, json={"error": {"message": "slow down"}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    monkeypatch.setattr(openrouter.rate_limiter, "max_wait", 1.0)
+    client = OpenRouterClient(api_key="test-key")
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(RateLimitError) as excinfo:
+        await client.complete("hi", model="m", max_retries=1)
+    assert excinfo.value.retry_after <= settings.rate_limit_max_wait_seconds
+    # Without a retry hint the model is not blocked for everyone else.
+    assert await client.complete("hi again", model="m", max_retries=1) == "ok"
+    assert "m" not in (await openrouter.rate_limiter.stats())["blocked"]
+
+    await client.aclose()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.config import settings
+from app.models.response import Layer2Response
+from app.services.llm_orchestrator import LLMOrchestrator
+from app.services.response_cache import ResponseCache, level_band, make_cache_key
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path) -> ResponseCache:
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    instance = ResponseCache(
+        memory_max_entries=2,
+        disk_path=str(tmp_path / "cache.sqlite3"),
+    )
+    yield instance
+    instance.close()
+
+
+def test_make_cache_key_normalizes_word_context_and_level():
+    key_a = make_cache_key(
+        "layer3",
+        "Precarious",
+        "The  situation\nremains precarious.",
+        band=level_band("B1"),
+    )
+    key_b = make_cache_key(
+        "layer3",
+        " precarious ",
+        "The situation remains precarious.",
+        band=level_band("b2 (upper intermediate)"),
+    )
+    key_c = make_cache_key(
+        "layer3",
+        "precarious",
+        "The situation remains precarious.",
+        band=level_band("C1"),
+    )
+
+    assert key_a == key_b
+    assert key_a != key_c
+    # Requests without a level hint use a different prompt, so a different key.
+    assert level_band(None) != level_band("gibberish")
+
+
+@pytest.mark.asyncio
+async def test_response_cache_evicts_memory_lru_and_falls_back_to_disk(cache: ResponseCache):
+    await cache.set("a", {"v": 1}, ttl_seconds=60)
+    await cache.set("b", {"v": 2}, ttl_seconds=60)
+    await cache.set("c", {"v": 3}, ttl_seconds=60)
+
+    # "a" was evicted from memory but is still served (and promoted) from disk.
+    assert "a" not in cache._memory
+    assert await cache.get("a") == {"v": 1}
+    assert "a" in cache._memory
+
+
+@pytest.mark.asyncio
+async def test_response_cache_honours_ttl(cache: ResponseCache):
+    await cache.set("expired", {"v": 1}, ttl_seconds=-1)
+    assert await cache.get("expired") is None
+
+
+class _CountingClient:
+    def __init__(self, json_response):
+        self._json_response = json_response
+        self.calls = 0
+
+    async def complete_json(self, *args, **kwargs):
+        self.calls += 1
+        return self._json_response
+
+
+@pytest.mark.asyncio
+async def test_generate_layer2_is_served_from_cache(cache: ResponseCache):
+    orchestrator = LLMOrchestrator()
+    orchestrator.cache = cache
+    orchestrator.client = _CountingClient(
+        [
+            {"source": "twitter", "text": "t"},
+            {"source": "news", "text": "n"},
+            {"source": "academic", "text": "a"},
+        ]
+    )
+
+    first = await orchestrator.generate_layer2("Test", "A  test sentence.")
+    second = await orchestrator.generate_layer2("test", "A test sentence.")
+
+    assert isinstance(second, Layer2Response)
+    assert second == first
+    assert orchestrator.client.calls == 1
+
+
+@pytest.fixture
+def candidate_cache(monkeypatch, tmp_path) -> ResponseCache:
+    monkeypatch.setattr(settings, "layer4_candidate_cache_enabled", True)
+    monkeypatch.setattr(settings, "layer4_pipeline_min_candidates", 0)
+    instance = ResponseCache(
+        disk_path=str(tmp_path / "candidates.sqlite3"),
+        enabled_setting="layer4_candidate_cache_enabled",
+    )
+    yield instance
+    instance.close()
+
+
+@pytest.mark.asyncio
+async def test_layer4_candidates_are_shared_across_contexts(candidate_cache: ResponseCache):
+    orchestrator = LLMOrchestrator()
+    orchestrator.candidate_cache = candidate_cache
+    orchestrator.client = _CountingClient([{"word": "trial", "relationship": "synonym"}])
+
+    first = await orchestrator.recall_layer4_candidates("Test", "A test sentence.")
+    second = await orchestrator.recall_layer4_candidates("test", "An entirely different one.")
+
+    assert [c.word for c in second] == [c.word for c in first] == ["trial"]
+    assert orchestrator.client.calls == 1
+    # The layer result cache is a separate switch and stays off here.
+    assert not orchestrator.cache.enabled
+
+
+class _StreamingCandidatesClient:
+    """Streams `count` Stage A candidates and records how often it was asked."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.streams = 0
+
+    async def stream(self, *args, **kwargs):
+        self.streams += 1
+        yield "["
+        for i in range(self.count):
+            yield json.dumps({"word": f"w{i}", "relationship": "synonym"}) + ", "
+        yield "]"
+
+
+@pytest.mark.asyncio
+async def test_pipelined_recall_only_caches_complete_candidate_lists(
+    monkeypatch, candidate_cache: ResponseCache
+):
+    monkeypatch.setattr(settings, "layer4_pipeline_min_candidates", 3)
+    orchestrator = LLMOrchestrator()
+    orchestrator.candidate_cache = candidate_cache
+
+    orchestrator.client = _StreamingCandidatesClient(5)
+    cut = await orchestrator.recall_layer4_candidates("test", "A test sentence.")
+    assert [c.word for c in cut] == ["w0", "w1", "w2"]
+    await orchestrator.recall_layer4_candidates("test", "Another test sentence.")
+    assert orchestrator.client.streams == 2
+
+    # A stream that ends before the threshold was read in full and is kept.
+    orchestrator.client = _StreamingCandidatesClient(2)
+    await orchestrator.recall_layer4_candidates("exam", "An exam sentence.")
+    again = await orchestrator.recall_layer4_candidates("exam", "Another exam sentence.")
+    assert [c.word for c in again] == ["w0", "w1"]
+    assert orchestrator.client.streams == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_layer4_candidates_skips_cached_words(candidate_cache: ResponseCache):
+    orchestrator = LLMOrchestrator()
+    orchestrator.candidate_cache = candidate_cache
+    orchestrator.client = _CountingClient([{"word": "trial", "relationship": "synonym"}])
+
+    counts = await orchestrator.warm_layer4_candidates(["test", "Test ", "exam", ""])
+    assert counts == {"cached": 0, "recalled": 2, "failed": 0}
+
+    counts = await orchestrator.warm_layer4_candidates(["test", "quiz"])
+    assert counts == {"cached": 1, "recalled": 1, "failed": 0}
+    assert orchestrator.client.calls == 3
+
+    await orchestrator.recall_layer4_candidates("exam", "Any sentence.")
+    assert orchestrator.client.calls == 3
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight, payload_key
+
+
+def test_payload_key_ignores_dict_ordering():
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.7}
+    b = {"temperature": 0.7, "messages": [{"role": "user", "content": "hi"}], "model": "m"}
+    assert payload_key(a) == payload_key(b)
+    assert payload_key(a) != payload_key({**a, "temperature": 0.2})
+
+
+@pytest.mark.asyncio
+async def test_do_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.shared_calls == 4
+
+    # Once finished, the next call goes upstream again.
+    assert await flight.do("k", upstream) == "result"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_do_propagates_errors_to_every_caller():
+    flight = SingleFlight()
+
+    async def upstream() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("k", upstream),
+        flight.do("k", upstream),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_stream_fans_out_and_replays_chunks_to_late_joiners():
+    flight = SingleFlight()
+    upstream_calls = 0
+    first_chunk_sent = asyncio.Event()
+
+    async def upstream():
+        nonlocal upstream_calls
+        upstream_calls += 1
+        yield "a"
+        first_chunk_sent.set()
+        await asyncio.sleep(0.02)
+        yield "b"
+        yield "c"
+
+    async def consume() -> list[str]:
+        return [chunk async for chunk in flight.stream("k", upstream)]
+
+    early = asyncio.create_task(consume())
+    await first_chunk_sent.wait()
+    late = asyncio.create_task(consume())
+
+    assert await early == ["a", "b", "c"]
+    assert await late == ["a", "b", "c"]
+    assert upstream_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_cancels_upstream_when_all_subscribers_leave():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            cancelled.set()
+
+    stream = flight.stream("k", upstream)
+    assert await stream.__anext__() == "a"
+    await stream.aclose()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
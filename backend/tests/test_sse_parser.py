@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.utils.error_handling import OpenRouterError
+from app.utils.sse_parser import SSEDeltaParser
+
+
+def _frame(content, **extra) -> bytes:
+    payload = {
+        "id": "gen-1",
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, **extra}],
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+def test_parser_extracts_delta_content_across_arbitrary_byte_boundaries():
+    stream = (
+        b": OPENROUTER PROCESSING\n\n"
+        + _frame("Hello")
+        + _frame(', "world" — café\n')
+        + _frame(None)
+        + b"data: [DONE]\n\n"
+    )
+
+    for step in (1, 3, 7, len(stream)):
+        parser = SSEDeltaParser()
+        contents: list[str] = []
+        for i in range(0, len(stream), step):
+            contents.extend(parser.feed(stream[i : i + step]))
+
+        assert contents == ["Hello", ', "world" — café\n']
+        assert parser.done
+
+
+def test_parser_handles_compact_crlf_frames_and_skips_malformed_ones():
+    parser = SSEDeltaParser()
+    compact = {"choices": [{"delta": {"content": "x"}}]}
+    frame = ("data:" + json.dumps(compact, separators=(",", ":")) + "\r\n").encode()
+
+    assert parser.feed(frame) == ["x"]
+    # Frames without delta content go through the full JSON path.
+    assert parser.feed(b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n') == []
+    assert parser.feed(b"data: {not json}\r\n") == []
+    # Broken UTF-8 is skipped too, and the stream carries on.
+    assert parser.feed(b"data: \xff\xfe\n" + frame) == ["x"]
+
+
+def test_parser_raises_on_mid_stream_error_frames():
+    parser = SSEDeltaParser()
+    with pytest.raises(OpenRouterError):
+        parser.feed(b'data: {"error": {"message": "provider overloaded"}}\n')
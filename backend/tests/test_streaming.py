@@ -214,3 +214,212 @@ async def test_analyze_streaming_emits_layers_in_completion_order():
 
     # Final event should still be the done sentinel.
     assert event_names[-1] == "done"
+
+
+class _SlowLayer1Orchestrator(_TestOrchestrator):
+    def __init__(self) -> None:
+        super().__init__()
+        self.layer2_started_during_layer1 = False
+        self._layer1_finished = False
+
+    async def generate_layer1_stream(
+        self,
+        word: str,
+        context: str,
+        english_level: str | None = None,
+    ):
+        yield "first "
+        await asyncio.sleep(0.05)
+        yield "second"
+        self._layer1_finished = True
+
+    async def generate_layer2(self, word: str, context: str) -> Layer2Response:
+        self.layer2_started_during_layer1 = not self._layer1_finished
+        return await super().generate_layer2(word, context)
+
+
+@pytest.mark.asyncio
+async def test_analyze_streaming_buffers_parallel_layers_until_layer1_completes(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "analyze_parallel_layers", True)
+    monkeypatch.setattr(settings, "analyze_event_ordering", "buffer")
+
+    orchestrator = _SlowLayer1Orchestrator()
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[2])
+
+    events = [event async for event in orchestrator.analyze_streaming(request)]
+    event_names = [event["event"] for event in events]
+
+    # Layer 2 ran concurrently with Layer 1 but was held back on the stream.
+    assert orchestrator.layer2_started_during_layer1
+    assert event_names == [
+        "layer1_chunk",
+        "layer1_chunk",
+        "layer1_complete",
+        "layer2",
+        "done",
+    ]
+    assert events[2]["data"] == {"content": "first second"}
+
+
+@pytest.mark.asyncio
+async def test_analyze_streaming_interleaves_parallel_layers_after_first_chunk(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "analyze_parallel_layers", True)
+    monkeypatch.setattr(settings, "analyze_event_ordering", "interleave")
+
+    orchestrator = _SlowLayer1Orchestrator()
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[2])
+
+    events = [event async for event in orchestrator.analyze_streaming(request)]
+    event_names = [event["event"] for event in events]
+
+    assert event_names[0] == "layer1_chunk"
+    # Layer 2 finished while Layer 1 was still streaming.
+    assert event_names.index("layer2") < event_names.index("layer1_complete")
+    assert event_names[-1] == "done"
+
+
+@pytest.mark.asyncio
+async def test_analyze_streaming_sequential_mode_waits_for_layer1(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "analyze_parallel_layers", False)
+
+    orchestrator = _SlowLayer1Orchestrator()
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[2])
+
+    events = [event async for event in orchestrator.analyze_streaming(request)]
+
+    assert not orchestrator.layer2_started_during_layer1
+    assert [event["event"] for event in events][-2:] == ["layer2", "done"]
+
+
+class _HangingLayersOrchestrator(_TestOrchestrator):
+    def __init__(self) -> None:
+        super().__init__()
+        self.cancelled: list[str] = []
+
+    async def _hang(self, name: str):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+
+    async def generate_layer2(self, word: str, context: str) -> Layer2Response:
+        return await self._hang("layer2")
+
+    async def generate_layer3(self, word: str, context: str, english_level: str | None = None):
+        return await self._hang("layer3")
+
+    async def generate_layer4_personalized_stream(self, *args, **kwargs):
+        await self._hang("personalized")
+        yield "never"
+
+
+@pytest.mark.asyncio
+async def test_analyze_streaming_cancels_layer_tasks_when_client_goes_away():
+    orchestrator = _HangingLayersOrchestrator()
+    request = AnalyzeRequest(word="test", context="This is a test sentence.")
+
+    events = orchestrator.analyze_streaming(request)
+    assert (await events.__anext__())["event"] == "layer1_chunk"
+    assert (await events.__anext__())["event"] == "layer1_complete"
+
+    # The SSE response closes the generator once the client disconnects.
+    await events.aclose()
+    await asyncio.sleep(0)
+
+    assert sorted(orchestrator.cancelled) == ["layer2", "layer3", "personalized"]
+
+
+class _StreamingStubClient:
+    """Streams a canned JSON document in small chunks, like an upstream model."""
+
+    def __init__(self, document: str, chunk_size: int = 7):
+        self._document = document
+        self._chunk_size = chunk_size
+
+    async def stream(self, *args, **kwargs):
+        for start in range(0, len(self._document), self._chunk_size):
+            yield self._document[start : start + self._chunk_size]
+            await asyncio.sleep(0)
+
+
+class _StreamedLayer4Orchestrator(_TestOrchestrator):
+    generate_layer4 = LLMOrchestrator.generate_layer4
+
+    async def generate_layer4_candidates(self, word: str, context: str):
+        return [RelatedWord(word="a", relationship="synonym", difference="", when_to_use="")]
+
+    async def stream_layer4_candidates(self, word: str, context: str, enough: int):
+        return await self.generate_layer4_candidates(word, context), True
+
+
+@pytest.mark.asyncio
+async def test_analyze_streaming_emits_layer4_items_before_aggregate():
+    document = json.dumps(
+        {
+            "related_words": [
+                {"word": "alpha", "relationship": "synonym", "difference": "d", "when_to_use": "w"},
+                {"word": "beta", "relationship": "antonym", "difference": "d", "when_to_use": "w"},
+            ],
+            "personalized": "note",
+        }
+    )
+    orchestrator = _StreamedLayer4Orchestrator()
+    orchestrator.client = _StreamingStubClient(f"```json\n{document}\n```")
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[4])
+
+    events = [event async for event in orchestrator.analyze_streaming(request)]
+    names = [event["event"] for event in events]
+
+    items = [event["data"] for event in events if event["event"] == "layer4_item"]
+    assert [item["index"] for item in items] == [0, 1]
+    assert [item["item"]["word"] for item in items] == ["alpha", "beta"]
+    assert names.index("layer4_item") > names.index("layer1_complete")
+    assert names.index("layer4") > max(i for i, n in enumerate(names) if n == "layer4_item")
+
+    layer4 = next(event["data"] for event in events if event["event"] == "layer4")
+    assert [word["word"] for word in layer4["related_words"]] == ["alpha", "beta"]
+    assert layer4["personalized"] == "note"
+
+
+class _StreamedListLayersOrchestrator(_TestOrchestrator):
+    generate_layer2 = LLMOrchestrator.generate_layer2
+    generate_layer3 = LLMOrchestrator.generate_layer3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("layer", "document", "field", "expected"),
+    [
+        (
+            2,
+            [{"source": s, "text": "t", "icon": "x"} for s in ("twitter", "news", "academic")],
+            "source",
+            ["twitter", "news", "academic"],
+        ),
+        (
+            3,
+            [{"wrong": w, "why": "why", "correct": "c"} for w in ("w1", "w2", "w3")],
+            "wrong",
+            ["w1", "w2"],
+        ),
+    ],
+)
+async def test_analyze_streaming_emits_layer2_and_layer3_items(layer, document, field, expected):
+    orchestrator = _StreamedListLayersOrchestrator()
+    orchestrator.client = _StreamingStubClient(json.dumps(document))
+    request = AnalyzeRequest(word="test", context="This is a test sentence.", layers=[layer])
+
+    events = [event async for event in orchestrator.analyze_streaming(request)]
+    names = [event["event"] for event in events]
+
+    items = [event["data"] for event in events if event["event"] == f"layer{layer}_item"]
+    assert [item["item"][field] for item in items] == expected
+    assert [item["index"] for item in items] == list(range(len(expected)))
+    assert names.index(f"layer{layer}") > names.index(f"layer{layer}_item")
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used_entries():
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_enforces_byte_budget_and_skips_oversized_values():
+    cache: TTLCache[str, str] = TTLCache(
+        max_entries=10,
+        ttl_seconds=60,
+        max_bytes=10,
+        sizeof=len,
+    )
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    cache.set("c", "zzzz")
+
+    assert cache.total_bytes <= 10
+    assert "a" not in cache
+    assert cache.get("c") == "zzzz"
+
+    cache.set("huge", "x" * 11)
+    assert cache.get("huge") is None
+    assert cache.get("c") == "zzzz"
+
+
+def test_ttl_cache_expires_lazily_and_on_sweep():
+    cache: TTLCache[str, int] = TTLCache(max_entries=10, ttl_seconds=60)
+    cache.set("stale", 1, ttl_seconds=-1)
+    cache.set("other_stale", 2, ttl_seconds=-1)
+    cache.set("fresh", 3)
+
+    assert cache.get("stale") is None
+    assert cache.sweep() == 1
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert stats["expirations"] == 2
+    assert stats["hits"] == 0
+    assert stats["misses"] == 1
@@ -124,6 +124,10 @@ async function fetchLexicalImage(
   }
 
   const json: LexicalImageResponse = await resp.json();
+  // Stored images come back as a path on the API; data URLs pass through.
+  if (json.image_url) {
+    json.image_url = new URL(json.image_url, API_URL).toString();
+  }
   return json;
 }
 